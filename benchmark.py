@@ -0,0 +1,819 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+benchmarks of the notebook toolbox on large synthetic notebooks
+
+Usage:
+
+    python benchmark.py iter_cells --cells 200 --image-side 512
+    python benchmark.py save --cells 200 --image-side 512
+    python benchmark.py header --cells 20 --image-side 128
+    python benchmark.py mapped --cells 2000 --image-side 128
+    python benchmark.py cache --cells 2000 --image-side 64
+    python benchmark.py json --cells 2000 --image-side 64
+    python benchmark.py images --cells 100 --image-side 512
+    python benchmark.py dedup --cells 200 --images 4
+    python benchmark.py emit --cells 100000
+    python benchmark.py reserialize --cells 100000
+    python benchmark.py py_percent --cells 1000000
+    python benchmark.py sync --notebooks 2000 --cells 100
+    python benchmark.py starboard_html --cells 200000
+    python benchmark.py outline --cells 50000 --page 50
+    python benchmark.py pipeline --cells 200000
+    python benchmark.py views --cells 100000 --views 300
+    python benchmark.py lookups --cells 100000 --lookups 1000
+    python benchmark.py search --notebooks 2000 --cells 100
+    python benchmark.py outputs --cells 20000
+    python benchmark.py streams --cells 400 --lines 5000
+    python benchmark.py errors --notebooks 500 --cells 100
+    python benchmark.py strip --notebooks 40 --cells 20 --image-side 512
+    python benchmark.py sizes --cells 200 --image-side 512
+    python benchmark.py export --cells 100 --image-side 512
+"""
+
+# Python Standard Library
+import argparse
+import base64
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Third-Party Libraries
+import numpy as np
+import PIL.Image  # pillow
+
+import convert
+import errors
+import notebook_v0 as n0
+import notebook_v1 as n1
+import notebook_v2 as n2
+import search
+import sizes
+import strip
+import sync
+
+
+def make_png(side: int, seed: int = 0) -> str:
+    r"""Return a base64-encoded PNG image of random noise (which PNG cannot compress)."""
+    pixels = np.random.default_rng(seed).integers(0, 256, (side, side, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    PIL.Image.fromarray(pixels).save(buffer, format="png")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def make_notebook(filename: str, cells: int, image_side: int = 256, images: int = 4):
+    r"""Write a synthetic notebook with `cells` code cells, each one with a stream output and a PNG output.
+
+    Only `images` distinct images are generated; they are cycled over the cells.
+    The notebook is written cell by cell, so that its size is not limited by the memory.
+    """
+    pngs = [make_png(image_side, seed) for seed in range(images)]
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write('{"cells": [')
+        for index in range(cells):
+            cell = {
+                "cell_type": "code",
+                "execution_count": index + 1,
+                "id": f"{index:08x}",
+                "metadata": {},
+                "outputs": [
+                    {"name": "stdout", "output_type": "stream", "text": [f"cell {index}\n"]},
+                    {
+                        "data": {"image/png": pngs[index % images], "text/plain": ["<Figure>"]},
+                        "metadata": {},
+                        "output_type": "display_data",
+                    },
+                ],
+                "source": [f"plot({index})"],
+            }
+            f.write(("," if index else "") + json.dumps(cell))
+        f.write('], "metadata": {}, "nbformat": 4, "nbformat_minor": 5}')
+
+
+# Chaque tâche est exécutée dans un processus neuf, pour que le pic de mémoire mesuré soit le sien.
+TASKS = {
+    "noop": lambda filename: None,
+    "load_ipynb": lambda filename: n0.get_stream(n0.load_ipynb(filename)),
+    "iter_cells": lambda filename: n0.get_stream(n0.iter_cells(filename)),
+    "save_loaded": lambda filename: _clear_and_save(n0.load_ipynb(filename, cache=False), filename + ".out"),
+    "save_streamed": lambda filename: _clear_and_save(
+        {"cells": n0.iter_cells(filename), **n0.load_header(filename)}, filename + ".out"
+    ),
+    "starboard_joined": lambda filename: _write(n0.starboard_html(n0.to_starboard(n0.load_ipynb(filename, cache=False))), filename),
+    "starboard_loaded": lambda filename: n0.StarboardTemplate().render_files([(filename, filename + ".html")], stream=False),
+    "starboard_streamed": lambda filename: n0.StarboardTemplate().render_files([(filename, filename + ".html")]),
+    "pipeline_steps": lambda filename: n2.pipeline(
+        n2.Markdownizer(n2.MarkdownLesser(n2.NotebookLoader(filename, cache=False).load()).remove_markdown_cells()).markdownize()
+    ).to_file(filename + ".out"),
+    "pipeline_fused": lambda filename: n2.pipeline(n2.NotebookLoader(filename)).remove_markdown().markdownize().to_file(filename + ".out"),
+    "py_percent_load": lambda filename: len(n2.PyPercentLoader(filename).load().cells),
+    "py_percent_iter": lambda filename: sum(1 for cell in n2.PyPercentLoader(filename)),
+    "stream_joined": lambda filename: len(n0.get_stream(n0.iter_cells(filename))),
+    "stream_iter": lambda filename: sum(len(chunk) for _, _, chunk in n0.iter_stream(n0.iter_cells(filename))),
+    "stream_tail": lambda filename: len(n0.get_stream(n0.iter_cells(filename), tail=100)),
+    "strip_round_trip": lambda filename: _round_trip(filename, filename + ".out"),
+    "strip_streamed": lambda filename: n0.strip_outputs(filename, filename + ".out"),
+    "sizes_loaded": lambda filename: sum(1 for _ in n0.iter_cell_sizes(n0.load_ipynb(filename, cache=False))),
+    "sizes_streamed": lambda filename: len(sizes.profile_file(filename)[3]),
+}
+
+
+def _round_trip(source: str, destination: str):
+    ipynb = n0.load_ipynb(source, cache=False)
+    n0.clear_outputs(ipynb)
+    n0.save_ipynb(ipynb, destination)
+
+
+def _clear_and_save(ipynb: dict, filename: str):
+    def cleared(cells):
+        for cell in cells:
+            if cell["cell_type"] == "code":
+                cell["execution_count"], cell["outputs"] = None, []
+            yield cell
+    n0.save_ipynb({**ipynb, "cells": cleared(ipynb["cells"])}, filename)
+
+
+def _write(text: str, filename: str):
+    with open(filename + ".html", "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def run_task(task: str, filename: str) -> dict:
+    r"""Run a task in a fresh Python process and return its duration (s) and peak RSS (MiB)."""
+    output = subprocess.run(
+        [sys.executable, __file__, "_task", task, filename],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def _task(args):
+    start = time.perf_counter()
+    TASKS[args.task](args.filename)
+    duration = time.perf_counter() - start
+    # ru_maxrss est en kio sous Linux (mais en octets sous macOS).
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+    print(json.dumps({"duration": duration, "peak_rss": peak}))
+
+
+def report(filename: str, tasks: list):
+    size = os.path.getsize(filename) / 2 ** 20
+    print(f"notebook: {size:.1f} MiB")
+    for task in tasks:
+        result = run_task(task, filename)
+        print(f"{task:>20}: {result['duration']:8.3f} s {result['peak_rss']:10.1f} MiB peak RSS")
+
+
+def bench_iter_cells(args):
+    r"""Peak RSS of `get_stream` on a loaded notebook vs a streamed one."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "large.ipynb")
+        make_notebook(filename, args.cells, args.image_side)
+        report(filename, ["noop", "load_ipynb", "iter_cells"])
+
+
+def bench_save(args):
+    r"""Peak RSS of a load -> clear outputs -> save pipeline, with a loaded notebook vs a streamed one."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "large.ipynb")
+        make_notebook(filename, args.cells, args.image_side)
+        report(filename, ["noop", "save_loaded", "save_streamed"])
+
+
+def bench_py_percent(args):
+    r"""Time and peak RSS of loading a large py-percent script as a whole vs iterating its cells."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "large.py")
+        with open(filename, "w", encoding="utf-8") as f:
+            n0.to_percent(iter_synthetic_cells(args.cells, args.lines), f)
+        report(filename, ["noop", "py_percent_load", "py_percent_iter"])
+
+
+def bench_sync(args):
+    r"""Time of a full conversion of a tree of notebooks vs a synchronization after modifying one of them."""
+    with tempfile.TemporaryDirectory() as directory:
+        notebooks, mirror = os.path.join(directory, "notebooks"), os.path.join(directory, "mirror")
+        os.makedirs(notebooks)
+        for index in range(args.notebooks):
+            n0.save_ipynb(make_ipynb(args.cells), os.path.join(notebooks, f"{index:05d}.ipynb"))
+        print(f"{args.notebooks} notebooks of {args.cells} cells:")
+        options = dict(workers=args.workers, cache=False, verbose=False)
+        print(f"{'convert':>20}: {convert.convert([notebooks], 'percent', mirror, **options)['duration']:8.3f} s")
+        print(f"{'first sync':>20}: {sync.sync([notebooks], 'percent', mirror, **options)['duration']:8.3f} s")
+        print(f"{'no change':>20}: {sync.sync([notebooks], 'percent', mirror, **options)['duration']:8.3f} s")
+        n0.save_ipynb(make_ipynb(args.cells + 1), os.path.join(notebooks, "00000.ipynb"))
+        os.remove(os.path.join(notebooks, "00001.ipynb"))
+        stats = sync.sync([notebooks], "percent", mirror, **options)
+        print(f"{'1 changed, 1 deleted':>20}: {stats['duration']:8.3f} s    ({stats['converted']} converted, {stats['deleted']} deleted)")
+
+
+def bench_starboard_html(args):
+    r"""Peak RSS of the Starboard HTML export of a large notebook, built as a whole, streamed from a loaded notebook, or streamed from its file."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "large.ipynb")
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write('{"cells": [')
+            for index, cell in enumerate(iter_synthetic_cells(args.cells, args.lines)):
+                f.write(("," if index else "") + json.dumps(cell))
+            f.write('], "metadata": {}, "nbformat": 4, "nbformat_minor": 5}')
+        report(filename, ["noop", "starboard_joined", "starboard_loaded", "starboard_streamed"])
+
+
+def bench_outline(args):
+    r"""Time of the outline of a large notebook: whole, one page of cells, truncated or collapsed."""
+    nb = n1.Notebook(make_ipynb(args.cells, args.lines))
+    outliner = n1.Outliner(nb)
+    middle = args.cells // 2
+    print(f"{args.cells} cells of {args.lines} lines:")
+    for name, options in [
+        ("whole", {}),
+        (f"{args.page} cells", dict(offset=middle, limit=args.page)),
+        (f"{args.page} cells, 2 lines", dict(offset=middle, limit=args.page, max_lines=2)),
+        (f"{args.page} cells, collapsed", dict(offset=middle, limit=args.page, collapsed=True)),
+    ]:
+        duration = best_time(lambda: outliner.outline(**options))
+        print(f"{name:>24}: {duration * 1000:10.3f} ms, {len(outliner.outline(**options)) / 1024:10.1f} kio")
+
+
+def bench_pipeline(args):
+    r"""Time of MarkdownLesser then Markdownizer, step by step vs fused, and peak RSS from file to file."""
+    # Les mesures de mémoire d'abord : un processus fils hérite du pic de mémoire de son parent.
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "large.ipynb")
+        n0.save_ipynb({"cells": iter_synthetic_cells(args.cells), "metadata": {}, "nbformat": 4, "nbformat_minor": 5}, filename)
+        report(filename, ["noop", "pipeline_steps", "pipeline_fused"])
+    nb = n2.Notebook("4.5", [n2.to_cell(cell) for cell in iter_synthetic_cells(args.cells)])
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        for name, function in [
+            ("step by step", lambda: n2.pipeline(n2.Markdownizer(n2.MarkdownLesser(nb).remove_markdown_cells()).markdownize()).to_percent(devnull)),
+            ("fused", lambda: n2.pipeline(nb).remove_markdown().markdownize().to_percent(devnull)),
+        ]:
+            print(f"{name:>20}: {best_time(function, repeat=3) * 1000:10.2f} ms")
+
+
+def bench_views(args):
+    r"""Memory and time of many derived notebooks (slices, code cells, id subsets), as list copies vs views."""
+    nb = n2.Notebook("4.5", [n2.to_cell(cell) for cell in iter_synthetic_cells(args.cells)])
+    ids = [cell.id for cell in nb.cells[::10]]
+    id_set = set(ids)
+    copies = [
+        lambda: n2.Notebook(nb.version, nb.cells[1000:]),
+        lambda: n2.Notebook(nb.version, [cell for cell in nb if isinstance(cell, n2.CodeCell)]),
+        lambda: n2.Notebook(nb.version, [cell for cell in nb if cell.id in id_set]),
+    ]
+    views = [lambda: nb.view(1000), lambda: nb.view_by_type(n2.CodeCell), lambda: nb.view_by_ids(ids)]
+    print(f"{args.views} derived notebooks of {args.cells} cells:")
+    for name, functions in [("list copies", copies), ("views", views)]:
+        start = time.perf_counter()
+        derived = [functions[index % 3]() for index in range(args.views)]
+        duration = time.perf_counter() - start
+        # Les cellules sont partagées dans les deux cas : seules les listes (ou les positions des vues) comptent.
+        size = sum(sys.getsizeof(getattr(nb.cells, "indices", nb.cells)) for nb in derived)
+        print(f"{name:>20}: {duration * 1000:10.2f} ms, {size / 2 ** 20:8.1f} MiB")
+        del derived
+
+
+def bench_lookups(args):
+    r"""Lookups of cells by id, type and execution count: linear scans vs the indexes of `n1.IndexedCells`."""
+    cells = [n2.to_cell({**cell, "execution_count": index // 2 + 1}) for index, cell in enumerate(iter_synthetic_cells(args.cells))]
+    nb = n2.Notebook("4.5", n1.IndexedCells(cells))
+    generator = np.random.default_rng(0)
+    ids = [f"{index:08x}" for index in generator.integers(args.cells, size=args.lookups)]
+    counts = [int(count) for count in generator.integers(1, args.cells // 2, size=args.lookups)]
+
+    def scans():
+        for cell_id, count in zip(ids, counts):
+            next(cell for cell in nb.cells if cell.id == cell_id)
+            [cell for cell in nb.cells if getattr(cell, "execution_count", None) == count]
+        [index for index, cell in enumerate(nb.cells) if isinstance(cell, n2.CodeCell)]
+
+    def lookups():
+        for cell_id, count in zip(ids, counts):
+            nb.by_id(cell_id)
+            nb.by_execution_count(count)
+        nb.positions(n2.CodeCell)
+
+    def updates():
+        # Une insertion et une suppression au milieu, suivies d'une recherche : les index sont mis à jour, pas reconstruits.
+        for _ in range(100):
+            nb.cells.insert(args.cells // 2, n2.CodeCell("c0ffee00", [], 1))
+            nb.by_id("c0ffee00")
+            del nb.cells[args.cells // 2]
+
+    def rebuilds():
+        for _ in range(100):
+            nb.cells.reindex()
+            nb.by_id(ids[0])
+
+    nb.by_id(ids[0])
+    print(f"{args.lookups} lookups by id and execution count in {args.cells} cells:")
+    print(f"{'scans':>20}: {best_time(scans, repeat=1) * 1000:10.2f} ms")
+    print(f"{'indexes':>20}: {best_time(lookups) * 1000:10.2f} ms")
+    print("100 insertions and removals in the middle, each followed by a lookup:")
+    print(f"{'incremental':>20}: {best_time(updates, repeat=3) * 1000:10.2f} ms")
+    print(f"{'rebuilt':>20}: {best_time(rebuilds, repeat=3) * 1000:10.2f} ms")
+
+
+def bench_search(args):
+    r"""Time of a search in a tree of notebooks, by parsing every file vs through the inverted index of `search.Index`."""
+    with tempfile.TemporaryDirectory() as directory:
+        notebooks = os.path.join(directory, "notebooks")
+        os.makedirs(notebooks)
+        for index in range(args.notebooks):
+            n0.save_ipynb(make_ipynb(args.cells), os.path.join(notebooks, f"{index:05d}.ipynb"))
+        text = f"last line cell {args.cells // 2}"
+        terms = search.tokenize(text)
+
+        def grep():
+            return [
+                (source, cell["id"])
+                for source, _ in convert.find_notebooks([notebooks])
+                for cell in n0.get_cells(n0.load_ipynb(source, cache=False))
+                if terms <= search.cell_terms(cell)
+            ]
+
+        print(f"{args.notebooks} notebooks of {args.cells} cells:")
+        start = time.perf_counter()
+        matches = grep()
+        print(f"{'parse every file':>20}: {time.perf_counter() - start:8.3f} s    ({len(matches)} cells)")
+        with search.Index(os.path.join(directory, search.INDEX_NAME)) as index:
+            options = dict(workers=args.workers, cache=False, verbose=False)
+            print(f"{'first index':>20}: {index.update([notebooks], **options)['duration']:8.3f} s")
+            print(f"{'no change':>20}: {index.update([notebooks], **options)['duration']:8.3f} s")
+            n0.save_ipynb(make_ipynb(args.cells + 1), os.path.join(notebooks, "00000.ipynb"))
+            stats = index.update([notebooks], **options)
+            print(f"{'1 changed':>20}: {stats['duration']:8.3f} s    ({stats['indexed']} indexed)")
+            duration = best_time(index.query, text)
+            print(f"{'query':>20}: {duration:8.3f} s    ({len(index.query(text))} cells)")
+            rare = f"last line cell {args.cells}" # Seul le notebook modifié a une cellule de ce numéro.
+            duration = best_time(index.query, rare)
+            print(f"{'selective query':>20}: {duration:8.3f} s    ({len(index.query(rare))} cells)")
+        print(f"{'index size':>20}: {os.path.getsize(os.path.join(directory, search.INDEX_NAME)) / 2 ** 20:8.1f} MiB")
+
+
+def bench_outputs(args):
+    r"""Time of repeated `get_stream`, `get_exceptions` and `iter_png_data` queries, by walking the cells vs on an `n0.OutputTable`."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "outputs.ipynb")
+        make_notebook(filename, args.cells, image_side=16)
+        ipynb = n0.load_ipynb(filename, cache=False)
+    for cell in ipynb["cells"][::10]:
+        cell["outputs"].append({"output_type": "error", "ename": "ValueError", "evalue": "oops", "traceback": ["..."]})
+
+    def queries(table):
+        return n0.get_stream(table), n0.get_exceptions(table), list(n0.iter_png_data(table))
+
+    def walk(): # Sur un dict, les requêtes parcourent les cellules à chaque appel.
+        return queries(ipynb)
+
+    table = n0.OutputTable(ipynb)
+    print(f"{args.cells} cells, {len(table)} payloads:")
+    print(f"{'cell walk':>20}: {best_time(walk) * 1000:10.3f} ms")
+    print(f"{'table build':>20}: {best_time(n0.OutputTable, ipynb) * 1000:10.3f} ms")
+    start = time.perf_counter()
+    queries(table)
+    print(f"{'first queries':>20}: {(time.perf_counter() - start) * 1000:10.3f} ms")
+    print(f"{'repeated queries':>20}: {best_time(queries, table) * 1000:10.3f} ms")
+    print(f"{'repeated get_stream':>20}: {best_time(n0.get_stream, table) * 1e6:10.1f} µs")
+
+
+def bench_streams(args):
+    r"""Peak RSS of the text of the stream outputs of a streamed notebook, joined, iterated by chunks, or its last 100 lines."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "training.ipynb")
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write('{"cells": [')
+            for index in range(args.cells):
+                text = [f"epoch {index}, step {step}: loss = {1 / (step + 1):.6f}\n" for step in range(args.lines)]
+                cell = {"cell_type": "code", "execution_count": index + 1, "id": f"{index:08x}", "metadata": {},
+                        "outputs": [{"name": "stdout", "output_type": "stream", "text": text}], "source": ["train()"]}
+                f.write(("," if index else "") + json.dumps(cell))
+            f.write('], "metadata": {}, "nbformat": 4, "nbformat_minor": 5}')
+        report(filename, ["noop", "stream_joined", "stream_iter", "stream_tail"])
+
+
+def bench_errors(args):
+    r"""Time of the aggregation of the exceptions of a tree of executed notebooks: loading each one vs scanning them in parallel."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "template.ipynb")
+        make_notebook(filename, args.cells, args.image_side)
+        clean = n0.load_ipynb(filename, cache=False)
+        failed = n0.load_ipynb(filename, cache=False)
+        for index, cell in enumerate(failed["cells"][::10]):
+            cell["outputs"].append({"output_type": "error", "ename": "KeyError", "evalue": f"'key {index}'", "traceback": ["..."] * 20})
+        notebooks = os.path.join(directory, "notebooks")
+        os.makedirs(notebooks)
+        # Seule une partie des notebooks a levé des exceptions (dans une cellule sur 10).
+        for index in range(args.notebooks):
+            ipynb = failed if index < args.notebooks * args.error_rate else clean
+            n0.save_ipynb(ipynb, os.path.join(notebooks, f"{index:05d}.ipynb"))
+        size = sum(os.path.getsize(os.path.join(notebooks, name)) for name in os.listdir(notebooks))
+        print(f"{args.notebooks} notebooks of {args.cells} cells ({size / 2 ** 20:.1f} MiB), {args.error_rate:.0%} with errors:")
+
+        def load_all():
+            return sum(len(n0.get_exceptions(n0.load_ipynb(source, cache=False))) for source, _ in convert.find_notebooks([notebooks]))
+
+        for name, function in [
+            ("load_ipynb", load_all),
+            ("scan, 1 process", lambda: errors.aggregate([notebooks], workers=1, verbose=False)),
+            ("scan, process pool", lambda: errors.aggregate([notebooks], workers=args.workers, verbose=False)),
+        ]:
+            print(f"{name:>20}: {best_time(function, repeat=1):8.3f} s")
+
+
+def bench_strip(args):
+    r"""Throughput and peak RSS of the removal of the outputs of notebooks: load/clear/save round trip vs `n0.strip_outputs`."""
+    with tempfile.TemporaryDirectory() as directory:
+        template = os.path.join(directory, "template.ipynb")
+        make_notebook(template, args.cells, args.image_side)
+        report(template, ["noop", "strip_round_trip", "strip_streamed"])
+        notebooks = os.path.join(directory, "notebooks")
+        os.makedirs(notebooks)
+
+        def copies():
+            for index in range(args.notebooks):
+                shutil.copyfile(template, os.path.join(notebooks, f"{index:05d}.ipynb"))
+            return [source for source, _ in convert.find_notebooks([notebooks])]
+
+        size = os.path.getsize(template) * args.notebooks / 2 ** 20
+        print(f"{args.notebooks} notebooks ({size:.1f} MiB):")
+        start = time.perf_counter()
+        for source in copies():
+            _round_trip(source, source)
+        duration = time.perf_counter() - start
+        print(f"{'round trip':>20}: {duration:8.3f} s {size / duration:10.1f} MiB/s")
+        copies()
+        stats = strip.strip([notebooks], workers=args.workers, verbose=False)
+        print(f"{'strip_outputs':>20}: {stats['duration']:8.3f} s {size / stats['duration']:10.1f} MiB/s    ({stats['modified']} modified)")
+        stats = strip.strip([notebooks], workers=args.workers, verbose=False)
+        print(f"{'already clean':>20}: {stats['duration']:8.3f} s {stats['files'] / stats['duration']:10.1f} files/s   ({stats['modified']} modified)")
+
+
+def bench_sizes(args):
+    r"""Peak RSS of the profile of the sizes of the cells of a notebook: loaded vs streamed (see `sizes.profile_file`)."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "large.ipynb")
+        make_notebook(filename, args.cells, args.image_side)
+        report(filename, ["noop", "sizes_loaded", "sizes_streamed"])
+
+
+def bench_export(args):
+    r"""Time of the export of the images of a notebook to PNG files: `get_images` then PIL encoding vs `export_images`."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "notebook.ipynb")
+        make_notebook(filename, args.cells, args.image_side, images=args.cells)
+        print(f"notebook: {os.path.getsize(filename) / 2 ** 20:.1f} MiB, {args.cells} images, {os.cpu_count()} CPUs")
+        ipynb = n0.load_ipynb(filename, cache=False)
+        runs = iter(range(1 << 30)) # Chaque mesure écrit dans un nouveau dossier.
+
+        def encoded():
+            output = os.path.join(directory, f"{next(runs)}")
+            os.makedirs(output)
+            for index, image in enumerate(n0.get_images(ipynb, cache=None)):
+                PIL.Image.fromarray(image).save(os.path.join(output, f"{index}.png"))
+
+        for name, function in [
+            ("decode + encode", encoded),
+            ("export_images", lambda: n0.export_images(ipynb, os.path.join(directory, f"{next(runs)}"))),
+            ("already exported", lambda: n0.export_images(ipynb, os.path.join(directory, "exported"))),
+        ]:
+            print(f"{name:>20}: {best_time(function, repeat=3) * 1000:10.2f} ms")
+
+
+def best_time(function, *args, repeat: int = 5) -> float:
+    r"""Return the best duration (s) of `repeat` calls of `function(*args)`."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def bench_header(args):
+    r"""Notebooks per minute for `get_format_version` + `get_metadata` with a full load vs a header-only load."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "notebook.ipynb")
+        make_notebook(filename, args.cells, args.image_side)
+        print(f"notebook: {os.path.getsize(filename) / 2 ** 20:.1f} MiB")
+        for name, load in [("load_ipynb", n0.load_ipynb), ("load_header", n0.load_header)]:
+            def fingerprint():
+                ipynb = load(filename)
+                return n0.get_format_version(ipynb), n0.get_metadata(ipynb)
+            duration = best_time(fingerprint)
+            print(f"{name:>20}: {duration * 1000:8.2f} ms {60 / duration:12.0f} notebooks/min")
+
+
+def bench_mapped(args):
+    r"""Time to get one cell of a notebook with `NotebookLoader.load` vs a `MappedNotebook` (with and without sidecar index)."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "notebook.ipynb")
+        index_filename = filename + ".index"
+        make_notebook(filename, args.cells, args.image_side)
+        print(f"notebook: {os.path.getsize(filename) / 2 ** 20:.1f} MiB, {args.cells} cells")
+        middle = args.cells // 2
+
+        def load():
+            return n2.NotebookLoader(filename).load().cells[middle]
+
+        def map_and_index():
+            if os.path.exists(index_filename):
+                os.remove(index_filename)
+            with n2.MappedNotebook(filename, index_filename) as nb:
+                return nb[middle]
+
+        def map_from_sidecar():
+            with n2.MappedNotebook(filename, index_filename) as nb:
+                return nb[middle]
+
+        for name, function in [("load", load), ("map (build index)", map_and_index), ("map (sidecar)", map_from_sidecar)]:
+            print(f"{name:>20}: {best_time(function) * 1000:10.2f} ms")
+
+
+def bench_cache(args):
+    r"""Time of `load_ipynb` without cache vs a cold and a warm `ParseCache`."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "notebook.ipynb")
+        make_notebook(filename, args.cells, args.image_side)
+        os.utime(filename, (time.time() - 60, time.time() - 60)) # Sinon le fichier est trop récent pour le cache.
+        print(f"notebook: {os.path.getsize(filename) / 2 ** 20:.1f} MiB, {args.cells} cells")
+
+        def cold():
+            n0.load_ipynb(filename, cache=n0.ParseCache(tempfile.mkdtemp(dir=directory)))
+
+        cache = n0.ParseCache(os.path.join(directory, "warm"))
+        for name, function in [
+            ("no cache", lambda: n0.load_ipynb(filename, cache=False)),
+            ("cold cache", cold),
+            ("warm cache", lambda: n0.load_ipynb(filename, cache=cache)),
+        ]:
+            print(f"{name:>20}: {best_time(function) * 1000:10.2f} ms")
+        print(f"warm cache: {cache.hits} hits, {cache.misses} misses")
+
+
+def bench_json(args):
+    r"""Time of `load_ipynb` with each installed JSON backend, and of `save_ipynb`."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "notebook.ipynb")
+        output = os.path.join(directory, "output.ipynb")
+        make_notebook(filename, args.cells, args.image_side)
+        print(f"notebook: {os.path.getsize(filename) / 2 ** 20:.1f} MiB, {args.cells} cells")
+        ipynb = n0.load_ipynb(filename, cache=False)
+
+        for name in n0.JSON_BACKENDS:
+            print(f"{name:>20}: load {best_time(n0.load_ipynb, filename, False, name) * 1000:10.2f} ms")
+        print(f"{'save_ipynb':>20}: {best_time(n0.save_ipynb, ipynb, output) * 1000:10.2f} ms")
+
+
+def bench_images(args):
+    r"""Time of `get_images` on one thread, on a pool of threads, with thumbnails, and of a few `get_lazy_images`."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "notebook.ipynb")
+        make_notebook(filename, args.cells, args.image_side, images=args.cells)
+        print(f"notebook: {os.path.getsize(filename) / 2 ** 20:.1f} MiB, {args.cells} images, {os.cpu_count()} CPUs")
+        ipynb = n0.load_ipynb(filename, cache=False)
+        thumbnail = (args.image_side // 4, args.image_side // 4)
+        for name, function in [
+            ("1 thread", lambda: n0.get_images(ipynb, workers=1, cache=None)),
+            ("thread pool", lambda: n0.get_images(ipynb, cache=None)),
+            ("thumbnails", lambda: n0.get_images(ipynb, size=thumbnail, cache=None)),
+            ("lazy, 5 accessed", lambda: [image.array for image in n0.get_lazy_images(ipynb, cache=None)[:5]]),
+        ]:
+            print(f"{name:>20}: {best_time(function, repeat=3) * 1000:10.2f} ms")
+
+
+def bench_dedup(args):
+    r"""Time and memory of `get_images` on a notebook repeating a few images, with and without the image cache."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "notebook.ipynb")
+        make_notebook(filename, args.cells, args.image_side, args.images)
+        ipynb = n0.load_ipynb(filename, cache=False)
+        print(f"notebook: {args.cells} images, {args.images} distinct")
+        for name, cache in [("no cache", lambda: None), ("image cache", n0.ImageCache)]:
+            caches = []
+            def function():
+                caches.append(cache())
+                return n0.get_images(ipynb, cache=caches[-1])
+            duration = best_time(function, repeat=3)
+            images = function()
+            size = sum({id(image): image.nbytes for image in images}.values())
+            print(f"{name:>20}: {duration * 1000:10.2f} ms, {size / 2 ** 20:8.1f} MiB of arrays    {caches[-1] or ''}")
+
+
+def iter_synthetic_cells(cells: int, lines: int = 5):
+    r"""Iterate `cells` synthetic cells alternating markdown and code cells of `lines` lines, without outputs."""
+    for index in range(cells):
+        yield {
+            "cell_type": "markdown" if index % 2 else "code",
+            "execution_count": None,
+            "id": f"{index:08x}",
+            "metadata": {},
+            "outputs": [],
+            "source": [f"line {line} of cell {index}\n" for line in range(lines - 1)] + ["last line"],
+        }
+
+
+def make_ipynb(cells: int, lines: int = 5) -> dict:
+    r"""Return a synthetic notebook (dict) of `cells` cells (see `iter_synthetic_cells`)."""
+    return {
+        "cells": list(iter_synthetic_cells(cells, lines)),
+        "metadata": {},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+
+
+def _concatenated_percent(ipynb: dict) -> str:
+    # L'ancienne implémentation de `to_percent`, par concaténation, pour comparaison.
+    text = ""
+    for cell in ipynb["cells"]:
+        markdown = cell["cell_type"] == "markdown"
+        text += "# %% [markdown]\n" if markdown else "# %%\n"
+        for line in cell["source"]:
+            text += "# " if markdown else ""
+            text += line
+        text += "\n\n"
+    return text[:-1]
+
+
+def bench_emit(args):
+    r"""Time per cell of the text emitters (to a string and to a file), for growing numbers of cells."""
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        for cells in [args.cells // 4, args.cells // 2, args.cells]:
+            ipynb = make_ipynb(cells)
+            nb = n1.Notebook(ipynb)
+            print(f"{cells} cells:")
+            for name, function in [
+                ("concatenation", lambda: _concatenated_percent(ipynb)),
+                ("to_percent", lambda: n0.to_percent(ipynb)),
+                ("to_percent (file)", lambda: n0.to_percent(ipynb, devnull)),
+                ("to_starboard", lambda: n0.to_starboard(ipynb)),
+                ("to_py_percent", lambda: n1.PyPercentSerializer(nb).to_py_percent()),
+                ("outline", lambda: n1.Outliner(nb).outline()),
+            ]:
+                print(f"{name:>20}: {best_time(function, repeat=3) / cells * 1e6:8.3f} µs/cell")
+
+
+def bench_reserialize(args):
+    r"""Time of re-serializing a large notebook to JSON after modifying one cell, with and without the serializer cache."""
+    nb = n1.Notebook(make_ipynb(args.cells))
+    serializer = n1.Serializer(nb)
+    print(f"{args.cells} cells:")
+    print(f"{'first dumps':>20}: {best_time(lambda: n1.Serializer(nb).dumps(), repeat=3) * 1000:10.2f} ms")
+    def modify_and_dump():
+        nb.cells[len(nb.cells) // 2].source = ["modified"]
+        return serializer.dumps()
+    serializer.dumps()
+    print(f"{'1 cell modified':>20}: {best_time(modify_and_dump, repeat=3) * 1000:10.2f} ms    "
+          f"({len(serializer.reused)} reused, {len(serializer.rebuilt)} rebuilt)")
+    print(f"{'nothing modified':>20}: {best_time(serializer.dumps, repeat=3) * 1000:10.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    task_parser = subparsers.add_parser("_task") # Usage interne (voir `run_task`).
+    task_parser.add_argument("task", choices=TASKS)
+    task_parser.add_argument("filename")
+    task_parser.set_defaults(func=_task)
+
+    iter_cells_parser = subparsers.add_parser("iter_cells", help=bench_iter_cells.__doc__)
+    iter_cells_parser.add_argument("--cells", type=int, default=200)
+    iter_cells_parser.add_argument("--image-side", type=int, default=512)
+    iter_cells_parser.set_defaults(func=bench_iter_cells)
+
+    save_parser = subparsers.add_parser("save", help=bench_save.__doc__)
+    save_parser.add_argument("--cells", type=int, default=200)
+    save_parser.add_argument("--image-side", type=int, default=512)
+    save_parser.set_defaults(func=bench_save)
+
+    header_parser = subparsers.add_parser("header", help=bench_header.__doc__)
+    header_parser.add_argument("--cells", type=int, default=20)
+    header_parser.add_argument("--image-side", type=int, default=128)
+    header_parser.set_defaults(func=bench_header)
+
+    mapped_parser = subparsers.add_parser("mapped", help=bench_mapped.__doc__)
+    mapped_parser.add_argument("--cells", type=int, default=2000)
+    mapped_parser.add_argument("--image-side", type=int, default=128)
+    mapped_parser.set_defaults(func=bench_mapped)
+
+    cache_parser = subparsers.add_parser("cache", help=bench_cache.__doc__)
+    cache_parser.add_argument("--cells", type=int, default=2000)
+    cache_parser.add_argument("--image-side", type=int, default=64)
+    cache_parser.set_defaults(func=bench_cache)
+
+    json_parser = subparsers.add_parser("json", help=bench_json.__doc__)
+    json_parser.add_argument("--cells", type=int, default=2000)
+    json_parser.add_argument("--image-side", type=int, default=64)
+    json_parser.set_defaults(func=bench_json)
+
+    images_parser = subparsers.add_parser("images", help=bench_images.__doc__)
+    images_parser.add_argument("--cells", type=int, default=100)
+    images_parser.add_argument("--image-side", type=int, default=512)
+    images_parser.set_defaults(func=bench_images)
+
+    dedup_parser = subparsers.add_parser("dedup", help=bench_dedup.__doc__)
+    dedup_parser.add_argument("--cells", type=int, default=200)
+    dedup_parser.add_argument("--image-side", type=int, default=512)
+    dedup_parser.add_argument("--images", type=int, default=4)
+    dedup_parser.set_defaults(func=bench_dedup)
+
+    emit_parser = subparsers.add_parser("emit", help=bench_emit.__doc__)
+    emit_parser.add_argument("--cells", type=int, default=100000)
+    emit_parser.set_defaults(func=bench_emit)
+
+    reserialize_parser = subparsers.add_parser("reserialize", help=bench_reserialize.__doc__)
+    reserialize_parser.add_argument("--cells", type=int, default=100000)
+    reserialize_parser.set_defaults(func=bench_reserialize)
+
+    py_percent_parser = subparsers.add_parser("py_percent", help=bench_py_percent.__doc__)
+    py_percent_parser.add_argument("--cells", type=int, default=1000000)
+    py_percent_parser.add_argument("--lines", type=int, default=5)
+    py_percent_parser.set_defaults(func=bench_py_percent)
+
+    sync_parser = subparsers.add_parser("sync", help=bench_sync.__doc__)
+    sync_parser.add_argument("--notebooks", type=int, default=2000)
+    sync_parser.add_argument("--cells", type=int, default=100)
+    sync_parser.add_argument("--workers", type=int)
+    sync_parser.set_defaults(func=bench_sync)
+
+    starboard_html_parser = subparsers.add_parser("starboard_html", help=bench_starboard_html.__doc__)
+    starboard_html_parser.add_argument("--cells", type=int, default=200000)
+    starboard_html_parser.add_argument("--lines", type=int, default=20)
+    starboard_html_parser.set_defaults(func=bench_starboard_html)
+
+    outline_parser = subparsers.add_parser("outline", help=bench_outline.__doc__)
+    outline_parser.add_argument("--cells", type=int, default=50000)
+    outline_parser.add_argument("--lines", type=int, default=20)
+    outline_parser.add_argument("--page", type=int, default=50)
+    outline_parser.set_defaults(func=bench_outline)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help=bench_pipeline.__doc__)
+    pipeline_parser.add_argument("--cells", type=int, default=200000)
+    pipeline_parser.set_defaults(func=bench_pipeline)
+
+    views_parser = subparsers.add_parser("views", help=bench_views.__doc__)
+    views_parser.add_argument("--cells", type=int, default=100000)
+    views_parser.add_argument("--views", type=int, default=300)
+    views_parser.set_defaults(func=bench_views)
+
+    lookups_parser = subparsers.add_parser("lookups", help=bench_lookups.__doc__)
+    lookups_parser.add_argument("--cells", type=int, default=100000)
+    lookups_parser.add_argument("--lookups", type=int, default=1000)
+    lookups_parser.set_defaults(func=bench_lookups)
+
+    search_parser = subparsers.add_parser("search", help=bench_search.__doc__)
+    search_parser.add_argument("--notebooks", type=int, default=2000)
+    search_parser.add_argument("--cells", type=int, default=100)
+    search_parser.add_argument("--workers", type=int)
+    search_parser.set_defaults(func=bench_search)
+
+    outputs_parser = subparsers.add_parser("outputs", help=bench_outputs.__doc__)
+    outputs_parser.add_argument("--cells", type=int, default=20000)
+    outputs_parser.set_defaults(func=bench_outputs)
+
+    streams_parser = subparsers.add_parser("streams", help=bench_streams.__doc__)
+    streams_parser.add_argument("--cells", type=int, default=400)
+    streams_parser.add_argument("--lines", type=int, default=5000)
+    streams_parser.set_defaults(func=bench_streams)
+
+    errors_parser = subparsers.add_parser("errors", help=bench_errors.__doc__)
+    errors_parser.add_argument("--notebooks", type=int, default=500)
+    errors_parser.add_argument("--cells", type=int, default=100)
+    errors_parser.add_argument("--image-side", type=int, default=64)
+    errors_parser.add_argument("--error-rate", type=float, default=0.1)
+    errors_parser.add_argument("--workers", type=int)
+    errors_parser.set_defaults(func=bench_errors)
+
+    strip_parser = subparsers.add_parser("strip", help=bench_strip.__doc__)
+    strip_parser.add_argument("--notebooks", type=int, default=40)
+    strip_parser.add_argument("--cells", type=int, default=20)
+    strip_parser.add_argument("--image-side", type=int, default=512)
+    strip_parser.add_argument("--workers", type=int, default=1)
+    strip_parser.set_defaults(func=bench_strip)
+
+    sizes_parser = subparsers.add_parser("sizes", help=bench_sizes.__doc__)
+    sizes_parser.add_argument("--cells", type=int, default=200)
+    sizes_parser.add_argument("--image-side", type=int, default=512)
+    sizes_parser.set_defaults(func=bench_sizes)
+
+    export_parser = subparsers.add_parser("export", help=bench_export.__doc__)
+    export_parser.add_argument("--cells", type=int, default=100)
+    export_parser.add_argument("--image-side", type=int, default=512)
+    export_parser.set_defaults(func=bench_export)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
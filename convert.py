@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bulk conversion of jupyter notebooks, in parallel
+
+Usage:
+
+    python convert.py samples percent --output-dir converted --workers 4
+    python convert.py "notebooks/**/*.ipynb" ipynb --chunksize 16
+"""
+
+# Python Standard Library
+import argparse
+import concurrent.futures
+import functools
+import glob
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import notebook_v0 as n0
+import notebook_v1 as n1
+
+
+def _cleared_ipynb(ipynb: dict) -> list:
+    n0.clear_outputs(ipynb)
+    return [json.dumps(ipynb)]
+
+
+# Pour chaque format : l'extension des fichiers produits et la fonction de conversion (dict -> morceaux de texte).
+FORMATS = {
+    "percent": (".py", n0.iter_percent),
+    "py-percent": (".py", lambda ipynb: n1.PyPercentSerializer(n1.Notebook(ipynb)).iter_py_percent()),
+    "starboard": (".starboard", n0.iter_starboard),
+    "starboard-html": (".html", n0.default_starboard_template.iter_html),
+    "outline": (".txt", lambda ipynb: n1.Outliner(n1.Notebook(ipynb)).iter_outline()),
+    "ipynb": (".ipynb", _cleared_ipynb),
+}
+
+
+def find_notebooks(paths: list) -> list:
+    r"""Return the .ipynb files found in the given files, directories (recursively) or glob patterns, with their root.
+
+    Usage:
+
+        >>> find_notebooks(["samples/minimal.ipynb"])
+        [('samples/minimal.ipynb', 'samples')]
+    """
+    notebooks = []
+    for path in paths:
+        if os.path.isdir(path):
+            notebooks += [(str(filename), path) for filename in sorted(Path(path).rglob("*.ipynb"))]
+        elif os.path.isfile(path):
+            notebooks.append((path, os.path.dirname(path)))
+        else:
+            # Pour un motif, la racine est le dossier qui précède le premier caractère spécial.
+            root = os.path.dirname(path[:min([path.index(c) for c in "*?[" if c in path], default=len(path))])
+            notebooks += [(filename, root) for filename in sorted(glob.glob(path, recursive=True))]
+    return notebooks
+
+
+def destination(source: str, root: str, format: str, output_dir=None) -> str:
+    r"""Return the name of the file converted from the notebook `source` (found in `root`).
+
+    The converted files keep their path relative to their root; they are
+    written in `output_dir`, or next to the notebooks if it is None.
+
+    Usage:
+
+        >>> destination("samples/hello-world.ipynb", "samples", "percent", "converted")
+        'converted/hello-world.py'
+    """
+    path = Path(source).with_suffix(FORMATS[format][0])
+    if output_dir is not None:
+        path = Path(output_dir) / path.relative_to(root or ".")
+    return str(path)
+
+
+def check_jobs(jobs: list) -> list:
+    r"""Check that no conversion job would overwrite its notebook or the converted file of another notebook.
+
+    Args:
+        jobs (list): the (source, destination) file names.
+
+    Returns:
+        list: the jobs, without duplicates (a notebook found twice, with the same destination).
+
+    Raises:
+        ValueError: if a destination is its source (e.g. the `ipynb` format
+            without an output directory), or the destination of another source.
+
+    Usage:
+
+        >>> check_jobs([("a.ipynb", "out/a.py"), ("a.ipynb", "out/a.py")])
+        [('a.ipynb', 'out/a.py')]
+        >>> check_jobs([("a.ipynb", "a.ipynb")])
+        Traceback (most recent call last):
+        ...
+        ValueError: a.ipynb would be overwritten by its own conversion (use an output directory)
+        >>> check_jobs([("x/a.ipynb", "out/a.py"), ("y/a.ipynb", "out/a.py")])
+        Traceback (most recent call last):
+        ...
+        ValueError: x/a.ipynb and y/a.ipynb would both be converted to out/a.py
+    """
+    jobs = list(dict.fromkeys(jobs))
+    sources = {} # destination (chemin absolu) -> notebook converti vers cette destination
+    for source, destination in jobs:
+        target = os.path.abspath(destination)
+        if target == os.path.abspath(source):
+            raise ValueError(f"{source} would be overwritten by its own conversion (use an output directory)")
+        other = sources.setdefault(target, source)
+        if other != source:
+            raise ValueError(f"{other} and {source} would both be converted to {destination}")
+    return jobs
+
+
+def convert_file(job: tuple, format: str, cache: bool = True) -> tuple:
+    r"""Convert a notebook file to the given format.
+
+    Args:
+        job (tuple): the (source, destination) file names.
+        format (str): one of the FORMATS.
+        cache (bool): whether to load the notebook through the default parse cache.
+
+    Returns:
+        tuple: the source file name, its size and the error message (None on success).
+    """
+    source, destination = job
+    try:
+        size = os.path.getsize(source)
+        chunks = FORMATS[format][1](n0.load_ipynb(source, cache=cache))
+        os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+        with n0.atomic_write(destination, encoding="utf-8") as f:
+            f.writelines(chunks)
+    except Exception as error: # Une erreur ne doit pas interrompre la conversion des autres notebooks.
+        return source, 0, f"{type(error).__name__}: {error}"
+    return source, size, None
+
+
+def convert(paths: list, format: str, output_dir=None, workers=None, chunksize=None, cache=True, verbose=True) -> dict:
+    r"""Convert in parallel all the notebooks found in `paths` (see `find_notebooks`) to the given format.
+
+    The converted files are written in `output_dir` (see `destination`);
+    the conversion is refused before it starts if a notebook would be
+    overwritten (see `check_jobs`).
+
+    Returns:
+        dict: the conversion statistics (number of files, failures, bytes, duration).
+
+    Raises:
+        ValueError: if a notebook or a converted file would be overwritten.
+    """
+    jobs = check_jobs([(source, destination(source, root, format, output_dir)) for source, root in find_notebooks(paths)])
+    workers = workers or os.cpu_count()
+    # Par défaut, chaque processus reçoit environ 4 lots : assez pour équilibrer la charge, peu pour limiter les échanges.
+    chunksize = chunksize or max(1, len(jobs) // (4 * workers))
+    stats = {"files": len(jobs), "failures": 0, "bytes": 0}
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        results = executor.map(functools.partial(convert_file, format=format, cache=cache), jobs, chunksize=chunksize)
+        for source, size, error in results:
+            stats["bytes"] += size
+            if error is not None:
+                stats["failures"] += 1
+                print(f"FAILED {source}: {error}", file=sys.stderr)
+    stats["duration"] = time.perf_counter() - start
+    if verbose:
+        duration = max(stats["duration"], 1e-9)
+        print(
+            f"converted {stats['files'] - stats['failures']}/{stats['files']} notebooks "
+            f"({stats['bytes'] / 2 ** 20:.1f} MiB) in {stats['duration']:.2f} s: "
+            f"{stats['files'] / duration:.1f} notebooks/s, {stats['bytes'] / 2 ** 20 / duration:.1f} MiB/s, "
+            f"{stats['failures']} failures ({workers} workers, chunks of {chunksize})"
+        )
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="notebook files, directories or glob patterns")
+    parser.add_argument("format", choices=FORMATS)
+    parser.add_argument("--output-dir", help="where to write the converted files (default: next to the notebooks)")
+    parser.add_argument("--workers", type=int, help="number of processes (default: number of CPUs)")
+    parser.add_argument("--chunksize", type=int, help="number of notebooks sent to a process at a time")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="do not use the parse cache")
+    args = parser.parse_args(argv)
+    try:
+        stats = convert(args.paths, args.format, args.output_dir, args.workers, args.chunksize, args.cache)
+    except ValueError as error:
+        parser.error(str(error))
+    return 1 if stats["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from convert import *
+
+
+class BulkConversion(unittest.TestCase):
+    def test_convert_directory(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            stats = convert(["samples"], "percent", output_dir, workers=2, chunksize=2, verbose=False)
+            self.assertEqual(0, stats["failures"])
+            self.assertEqual(stats["files"], len(os.listdir(output_dir)))
+            with open(os.path.join(output_dir, "hello-world.py"), encoding="utf-8") as f:
+                self.assertEqual(n0.to_percent(n0.load_ipynb("samples/hello-world.ipynb")), f.read())
+
+    def test_failures_are_reported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            broken = os.path.join(directory, "broken.ipynb")
+            with open(broken, "w") as f:
+                f.write('{"cells": [{"cell_type": "code", ')
+            output_dir = os.path.join(directory, "output")
+            with patch("sys.stderr"):
+                stats = convert(["samples/hello-world.ipynb", broken], "outline", output_dir, workers=2, verbose=False)
+            self.assertEqual(2, stats["files"])
+            self.assertEqual(1, stats["failures"])
+            self.assertEqual(["hello-world.txt"], os.listdir(output_dir))
+
+    def test_sources_are_not_overwritten(self):
+        with self.assertRaisesRegex(ValueError, "overwritten"):
+            convert(["samples/hello-world.ipynb"], "ipynb", workers=1, verbose=False)
+        with patch("sys.stderr"), self.assertRaises(SystemExit):
+            main(["samples/hello-world.ipynb", "ipynb"])
+
+    def test_colliding_destinations(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ["x", "y"]:
+                os.makedirs(os.path.join(directory, name))
+                shutil.copy("samples/hello-world.ipynb", os.path.join(directory, name))
+            roots = [os.path.join(directory, "x"), os.path.join(directory, "y")]
+            output_dir = os.path.join(directory, "output")
+            with self.assertRaisesRegex(ValueError, "both"):
+                convert(roots, "percent", output_dir, workers=1, verbose=False)
+            self.assertFalse(os.path.exists(output_dir))
+
+    def test_cleared_ipynb(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            self.assertEqual(0, main(["samples/*.ipynb", "ipynb", "--output-dir", output_dir, "--workers", "1"]))
+            ipynb = n0.load_ipynb(os.path.join(output_dir, "hello-world.ipynb"), cache=False)
+            self.assertEqual([], ipynb["cells"][1]["outputs"])
+
+
+if __name__ == "__main__":
+    unittest.main()
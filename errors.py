@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+aggregation of the exceptions raised in a corpus of executed jupyter notebooks, in parallel
+
+Usage:
+
+    python errors.py notebooks --output errors.json --workers 4
+    python errors.py "notebooks/**/*.ipynb" --top 20
+"""
+
+# Python Standard Library
+import argparse
+import concurrent.futures
+import io
+import json
+import mmap
+import os
+import re
+import sys
+import time
+
+import convert
+import notebook_v0 as n0
+
+_ENAME = b'"ename"'
+
+# Ce qui varie d'une occurrence à l'autre d'une même erreur : adresses, nombres et chaînes citées.
+_VARIABLE_PARTS = [
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<hex>"),
+    (re.compile(r"'[^'\n]*'|\"[^\"\n]*\""), "<str>"),
+    (re.compile(r"(?<![\w.])[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b"), "<num>"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def normalize_evalue(evalue: str) -> str:
+    r"""Return the message of an exception without the parts which vary between its occurrences.
+
+    Usage:
+
+        >>> normalize_evalue("name 'x' is not defined")
+        'name <str> is not defined'
+        >>> normalize_evalue("index 12 is out of bounds for axis 0 with size 3")
+        'index <num> is out of bounds for axis <num> with size <num>'
+        >>> normalize_evalue("<object at 0x7f3a2c>  is\nbroken ")
+        '<object at <hex>> is broken'
+    """
+    for pattern, replacement in _VARIABLE_PARTS:
+        evalue = pattern.sub(replacement, evalue)
+    return evalue.strip()
+
+
+def _cell_errors(raw: bytes, index: int) -> list:
+    # Les erreurs d'une cellule (JSON brut) : seules les sorties d'erreur ont un `ename`, c'est tout ce qu'on décode.
+    scanner = n0.JsonScanner(io.BytesIO(raw))
+    cell_id, errors = None, []
+    for key in scanner.iter_object():
+        if key == "id":
+            cell_id = scanner.read_value()
+        elif key == "outputs":
+            for _ in scanner.iter_array():
+                output = {}
+                for output_key in scanner.iter_object():
+                    if output_key in ("ename", "evalue"):
+                        output[output_key] = scanner.read_value()
+                    else:
+                        scanner.skip_value()
+                if "ename" in output:
+                    errors.append((output["ename"], output.get("evalue", "")))
+        else:
+            scanner.skip_value()
+    cell_id = cell_id or f"{index:08x}"
+    return [(cell_id, ename, evalue) for ename, evalue in errors]
+
+
+def scan_errors(filename: str) -> tuple:
+    r"""Return the exceptions of a notebook file, as (cell id, ename, evalue) triples.
+
+    Nothing is decoded but the cell ids and the `ename` and `evalue` of the
+    error outputs: a notebook without any "ename" key is dismissed with a
+    byte search, and the cells of the others are scanned (see `n0.JsonScanner`)
+    without decoding them, unless they contain an "ename" key. The cells
+    without an id (before nbformat 4.5) are named after their position.
+
+    Returns:
+        tuple: the file name, the exceptions and the error message (None on success).
+
+    Usage:
+
+        >>> scan_errors("samples/errors.ipynb")[1] # doctest: +NORMALIZE_WHITESPACE
+        [('00000000', 'TypeError', "unsupported operand type(s) for +: 'int' and 'str'"),
+         ('00000001', 'Warning', '🌧️  light rain')]
+    """
+    errors = []
+    try:
+        with open(filename, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError("empty file")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                if content.find(_ENAME) < 0: # Le cas courant : aucune erreur dans le notebook.
+                    return filename, [], None
+            scanner = n0.JsonScanner(f)
+            for key in scanner.iter_object():
+                if key != "cells":
+                    scanner.skip_value()
+                    continue
+                for index, _ in enumerate(scanner.iter_array()):
+                    raw = scanner.read_raw()
+                    if _ENAME in raw:
+                        errors += _cell_errors(raw, index)
+    except Exception as error: # Une erreur ne doit pas interrompre l'analyse des autres notebooks.
+        return filename, [], f"{type(error).__name__}: {error}"
+    return filename, errors, None
+
+
+def aggregate(paths: list, workers=None, chunksize=None, verbose=True) -> dict:
+    r"""Group the exceptions of the notebooks found in `paths` (see `convert.find_notebooks`), scanned in parallel.
+
+    The exceptions are grouped by name and normalized message (see
+    `normalize_evalue`); the groups are sorted by decreasing count.
+
+    Returns:
+        dict: the notebooks (file names), the number of failures, the duration
+        and the groups, each with its ename, normalized evalue, an example of
+        (raw) evalue, its count and its cells, as (notebook index, cell id) pairs.
+
+    Usage:
+
+        >>> report = aggregate(["samples/errors.ipynb", "samples/hello-world.ipynb"], workers=1, verbose=False)
+        >>> [(group["ename"], group["count"], group["cells"]) for group in report["groups"]]
+        [('TypeError', 1, [[0, '00000000']]), ('Warning', 1, [[0, '00000001']])]
+    """
+    start = time.perf_counter()
+    notebooks = [source for source, _ in convert.find_notebooks(paths)]
+    groups, failures = {}, 0
+    for notebook, (source, errors, error) in enumerate(_scan(notebooks, workers, chunksize)):
+        if error is not None:
+            failures += 1
+            print(f"FAILED {source}: {error}", file=sys.stderr)
+        for cell_id, ename, evalue in errors:
+            key = (ename, normalize_evalue(evalue))
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {"ename": ename, "evalue": key[1], "example": evalue, "count": 0, "cells": []}
+            group["count"] += 1
+            group["cells"].append([notebook, cell_id])
+    report = {
+        "notebooks": notebooks,
+        "failures": failures,
+        "duration": time.perf_counter() - start,
+        "groups": sorted(groups.values(), key=lambda group: (-group["count"], group["ename"], group["evalue"])),
+    }
+    if verbose:
+        print(
+            f"{sum(group['count'] for group in report['groups'])} exceptions in {len(report['groups'])} groups, "
+            f"{len(notebooks)} notebooks, {failures} failures in {report['duration']:.2f} s"
+        )
+    return report
+
+
+def _scan(notebooks: list, workers=None, chunksize=None):
+    # Les résultats arrivent dans l'ordre des notebooks, pour que le rapport ne dépende pas du nombre de processus.
+    if len(notebooks) <= 1 or workers == 1:
+        yield from map(scan_errors, notebooks)
+        return
+    workers = workers or os.cpu_count()
+    chunksize = chunksize or max(1, len(notebooks) // (4 * workers))
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        yield from executor.map(scan_errors, notebooks, chunksize=chunksize)
+
+
+def save_report(report: dict, filename: str):
+    r"""Save an aggregation report as compact JSON (atomically, see `n0.atomic_write`).
+
+    The notebooks are stored once; the cells refer to them by their index.
+    """
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    with n0.atomic_write(filename, encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_report(filename: str) -> dict:
+    r"""Load an aggregation report saved by `save_report`."""
+    with open(filename, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="notebook files, directories or glob patterns")
+    parser.add_argument("--output", help="the result file (compact JSON)")
+    parser.add_argument("--top", type=int, default=10, help="number of groups to print (default: 10)")
+    parser.add_argument("--workers", type=int, help="number of processes (default: number of CPUs)")
+    parser.add_argument("--chunksize", type=int, help="number of notebooks sent to a process at a time")
+    args = parser.parse_args(argv)
+    report = aggregate(args.paths, args.workers, args.chunksize)
+    if args.output is not None:
+        save_report(report, args.output)
+    for group in report["groups"][:args.top]:
+        notebooks = len({notebook for notebook, _ in group["cells"]})
+        print(f"{group['count']:8d} {group['ename']}: {group['evalue']} ({notebooks} notebooks)")
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
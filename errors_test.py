@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from errors import *
+
+
+def error(ename, evalue):
+    return {"output_type": "error", "ename": ename, "evalue": evalue, "traceback": [f"{ename}: {evalue}"]}
+
+
+class Aggregation(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        for index in range(6):
+            outputs = [
+                {"output_type": "stream", "name": "stdout", "text": ["ok\n"]},
+                {"output_type": "display_data", "data": {"image/png": "iVBORw0KGgo="}, "metadata": {}},
+                error("IndexError", f"index {index} is out of bounds"),
+            ]
+            cells = [
+                {"cell_type": "markdown", "id": "a0000000", "metadata": {}, "source": []},
+                {"cell_type": "code", "id": "b0000000", "execution_count": 1, "metadata": {}, "outputs": outputs, "source": []},
+            ]
+            if index % 2:
+                cells.append({"cell_type": "code", "id": "c0000000", "execution_count": 2, "metadata": {},
+                              "outputs": [error("NameError", f"name 'x{index}' is not defined")], "source": []})
+            ipynb = {"cells": cells, "metadata": {}, "nbformat": 4, "nbformat_minor": 5}
+            n0.save_ipynb(ipynb, os.path.join(self.directory.name, f"{index}.ipynb"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_groups(self):
+        report = aggregate([self.directory.name], workers=1, verbose=False)
+        self.assertEqual(0, report["failures"])
+        self.assertEqual(
+            [("IndexError", "index <num> is out of bounds", 6), ("NameError", "name <str> is not defined", 3)],
+            [(group["ename"], group["evalue"], group["count"]) for group in report["groups"]],
+        )
+        self.assertEqual("name 'x1' is not defined", report["groups"][1]["example"])
+        self.assertEqual(
+            [os.path.join(self.directory.name, f"{index}.ipynb") for index in [1, 3, 5]],
+            [report["notebooks"][notebook] for notebook, cell_id in report["groups"][1]["cells"]],
+        )
+        self.assertEqual({"c0000000"}, {cell_id for _, cell_id in report["groups"][1]["cells"]})
+
+    def test_parallel_scan(self):
+        sequential = aggregate([self.directory.name], workers=1, verbose=False)
+        parallel = aggregate([self.directory.name], workers=2, chunksize=2, verbose=False)
+        self.assertEqual(sequential["groups"], parallel["groups"])
+
+    def test_only_errors_are_decoded(self):
+        values, original = [], n0.JsonScanner.read_value
+        def read_value(scanner):
+            values.append(original(scanner))
+            return values[-1]
+        with patch.object(n0.JsonScanner, "read_value", read_value):
+            _, errors, _ = scan_errors(os.path.join(self.directory.name, "1.ipynb"))
+        self.assertEqual(2, len(errors))
+        # Les clefs sont décodées, mais des valeurs, seuls les identifiants, `ename` et `evalue` le sont.
+        for value in ["iVBORw0KGgo=", ["ok\n"], ["IndexError: index 1 is out of bounds"], {}, []]:
+            self.assertNotIn(value, values)
+        self.assertIn("name 'x1' is not defined", values)
+
+    def test_failures(self):
+        with open(os.path.join(self.directory.name, "broken.ipynb"), "w") as f:
+            f.write('{"cells": [{"outputs": [{"ename": "ValueError", "evalue": ')
+        with patch("sys.stderr"):
+            report = aggregate([self.directory.name], workers=1, verbose=False)
+        self.assertEqual(1, report["failures"])
+        self.assertEqual(9, sum(group["count"] for group in report["groups"]))
+
+    def test_save_report(self):
+        report = aggregate([self.directory.name], workers=1, verbose=False)
+        filename = os.path.join(self.directory.name, "reports", "errors.json")
+        save_report(report, filename)
+        self.assertEqual(report, load_report(filename))
+
+
+if __name__ == "__main__":
+    unittest.main()
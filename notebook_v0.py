@@ -7,9 +7,20 @@ starter code for your evaluation assignment
 
 # Python Standard Library
 import base64
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
 import io
 import json
+import marshal
+import mmap
+import os
 import pprint
+import re
+import tempfile
+import threading
+import time
 from typing_extensions import Concatenate
 
 # Third-Party Libraries
@@ -17,10 +28,19 @@ import numpy as np
 import PIL.Image  # pillow
 
 
-def load_ipynb(filename: str) -> dict:
+def load_ipynb(filename: str, cache=True, backend=None) -> dict:
     r"""
     Load a jupyter notebook .ipynb file (JSON) as a Python dict.
 
+    The parsed notebook may go through an on-disk cache (see `ParseCache`):
+    `cache` is either a ParseCache instance, True for the default cache or
+    False to always parse the file. There is a default cache only if the
+    NOTEBOOK_CACHE_DIR environment variable names its directory (see
+    `get_default_cache`): otherwise, the file is always parsed.
+
+    The file is parsed with the given JSON backend (see `get_json_backend`;
+    by default, the standard library `json` module).
+
     Usage:
 
         >>> ipynb = load_ipynb("samples/minimal.ipynb")
@@ -51,15 +71,618 @@ def load_ipynb(filename: str) -> dict:
          'nbformat': 4,
          'nbformat_minor': 5}
     """
-    # On ouvre le fichier puis on le convertit en dict python avec la fonction json.load()->dict
-    with open(filename) as f: 
-        return json.load(f)
+    if cache is True:
+        cache = get_default_cache()
+    if cache:
+        return cache.load(filename, backend)
+    # On ouvre le fichier puis on le convertit en dict python avec la fonction loads du backend choisi.
+    with open(filename, "rb") as f:
+        return get_json_backend(backend).loads(f.read())
+
+
+# JSON backends
+# ------------------------------------------------------------------------------
+class JsonBackend:
+    r"""
+    A JSON library used to load notebooks.
+
+    The notebooks are always saved with the standard library `json` module:
+    the other libraries do not give the same text as `json.dumps`.
+
+    Args:
+        name (str): the name of the backend.
+        loads (callable): parses JSON text (bytes) into a Python object.
+    """
+    def __init__(self, name: str, loads):
+        self.name = name
+        self._loads = loads
+
+    def loads(self, text: bytes):
+        r"""
+        Parse JSON text (bytes) into a Python object.
+
+        The text that the library rejects but the standard library accepts
+        (NaN, integers of more than 64 bits, ...) is parsed again by the latter.
+
+        Usage:
+
+            >>> get_json_backend("json").loads(b'{"x": NaN}')
+            {'x': nan}
+        """
+        try:
+            return self._loads(text)
+        except ValueError:
+            if self._loads is json.loads:
+                raise
+            return json.loads(text)
+
+    def __repr__(self):
+        return f"JsonBackend({self.name!r})"
+
+
+JSON_BACKENDS = {}
+# Par défaut, on prend le premier backend installé de cette liste : la bibliothèque standard, les autres
+# (plus rapides, mais plus stricts) doivent être choisis explicitement.
+JSON_BACKEND_PREFERENCE = ["json"]
+
+
+def register_json_backend(name: str, loads):
+    r"""Register a JSON backend under the given name (see `JsonBackend`)."""
+    JSON_BACKENDS[name] = JsonBackend(name, loads)
+
+
+register_json_backend("json", json.loads)
+try:
+    import orjson
+except ImportError:
+    pass
+else:
+    register_json_backend("orjson", orjson.loads)
+try:
+    import ujson
+except ImportError:
+    pass
+else:
+    register_json_backend("ujson", ujson.loads)
+
+
+def get_json_backend(backend=None) -> JsonBackend:
+    r"""
+    Return a JSON backend, given as an instance or by name.
+
+    When no backend is given, the NOTEBOOK_JSON_BACKEND environment variable
+    is used, and then the first installed backend of JSON_BACKEND_PREFERENCE:
+    the standard library `json` module, unless this list is changed. The
+    faster libraries (orjson, ujson) are used only when chosen this way.
+
+    Usage:
+
+        >>> get_json_backend("json")
+        JsonBackend('json')
+    """
+    if isinstance(backend, JsonBackend):
+        return backend
+    name = backend or os.environ.get("NOTEBOOK_JSON_BACKEND")
+    if not name:
+        name = next(name for name in JSON_BACKEND_PREFERENCE if name in JSON_BACKENDS)
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"unknown or uninstalled JSON backend: {name!r} (available: {', '.join(JSON_BACKENDS)})")
+    return JSON_BACKENDS[name]
+
+
+# Streaming
+# ------------------------------------------------------------------------------
+CHUNK_SIZE = 1 << 16 # Taille (en octets) des blocs lus dans le fichier.
+
+# Les caractères structurants du JSON sont tous ASCII, et aucun octet d'un caractère UTF-8 multi-octets
+# n'est ASCII : on peut donc chercher ces caractères directement dans les octets, sans décoder le texte.
+# Une chaîne courte et sans échappement est reconnue d'un coup ; les autres sont parcourues avec `find`.
+_STRUCTURE = re.compile(rb'"[^"\\]{0,1024}"|["\[\]{}]')
+_SCALAR_END = re.compile(rb'[\s,\]}]')
+_WHITESPACE = re.compile(rb'\s*')
+
+
+class JsonScanner:
+    r"""
+    Incremental reader of the JSON values stored in a binary file.
+
+    Only the bytes of the value being read are kept in memory; the values that
+    are skipped are scanned chunk by chunk and then forgotten.
+
+    Args:
+        file: a binary file (any object with a `read(size)` method).
+        chunk_size (int): the number of bytes read at a time.
+
+    Usage:
+
+        >>> with open("samples/hello-world.ipynb", "rb") as f:
+        ...     scanner = JsonScanner(f)
+        ...     for key in scanner.iter_object():
+        ...         if key == "nbformat":
+        ...             print(scanner.read_value())
+        ...         else:
+        ...             scanner.skip_value()
+        4
+    """
+    def __init__(self, file, chunk_size: int = CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buf = bytearray() # Octets lus mais pas encore consommés (à partir de `pos`).
+        self.pos = 0
+        self.offset = 0 # Position dans le fichier du premier octet de `buf`.
+        self.eof = False
+
+    def tell(self) -> int:
+        r"""Return the position (in bytes) of the next unread byte in the file."""
+        return self.offset + self.pos
+
+    def _read_more(self):
+        # On oublie les octets déjà consommés (avant `pos`), puis on lit un nouveau bloc.
+        chunk = self.file.read(self.chunk_size)
+        del self.buf[:self.pos]
+        self.offset += self.pos
+        self.pos = 0
+        self.buf += chunk
+        self.eof = not chunk
+
+    def peek(self) -> bytes:
+        r"""Skip the whitespace and return the next byte (b"" at the end of the file)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return bytes(self.buf[self.pos:self.pos + 1])
+            if self.eof:
+                return b""
+            self._read_more()
+
+    def expect(self, char: bytes):
+        r"""Consume the next (non-whitespace) byte, which must be `char`."""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char.decode()!r} but found {found.decode('latin-1')!r} at byte {self.tell()}")
+        self.pos += 1
+
+    def _scan(self, keep: bool):
+        # On avance jusqu'à la fin de la valeur suivante, en comptant les crochets et accolades
+        # hors des chaînes de caractères. Si `keep` est faux, les octets parcourus sont oubliés
+        # au fur et à mesure : la mémoire utilisée ne dépend pas de la taille de la valeur.
+        first = self.peek()
+        if not first:
+            raise ValueError(f"unexpected end of file at byte {self.tell()}")
+        start = i = self.pos
+        scalar = first not in b'[{"'
+        depth, in_string, quote = 0, False, -1
+        while True:
+            if scalar: # Nombre, true, false ou null.
+                match = _SCALAR_END.search(self.buf, i)
+                if match or self.eof:
+                    end = match.start() if match else len(self.buf)
+                    break
+                i = len(self.buf)
+            elif in_string:
+                # `find` est bien plus rapide qu'une expression régulière sur les longues chaînes (images en base64).
+                if quote < i: # On ne recherche le guillemet suivant que si le précédent a été dépassé.
+                    quote = self.buf.find(b'"', i)
+                backslash = self.buf.find(b'\\', i, quote if quote >= 0 else len(self.buf))
+                if backslash >= 0 and backslash + 1 < len(self.buf): # Caractère échappé : on le saute.
+                    i = backslash + 2
+                    continue
+                if backslash < 0 and quote >= 0:
+                    i, in_string = quote + 1, False
+                    if depth == 0:
+                        end = i
+                        break
+                    continue
+                i = backslash if backslash >= 0 else len(self.buf)
+            else:
+                match = _STRUCTURE.search(self.buf, i)
+                if match:
+                    i, char = match.end(), self.buf[match.start()]
+                    if char == 0x22: # Guillemet.
+                        if i - match.start() == 1:
+                            in_string = True
+                        elif depth == 0:
+                            end = i
+                            break
+                    elif char in b'[{':
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            end = i
+                            break
+                    continue
+                i = len(self.buf)
+            # Il faut lire la suite du fichier pour trouver la fin de la valeur.
+            if self.eof:
+                raise ValueError(f"unexpected end of file at byte {self.offset + len(self.buf)}")
+            self.pos = start if keep else i
+            dropped = self.pos
+            self._read_more()
+            start, i, quote = start - dropped, i - dropped, quote - dropped
+        self.pos = end
+        return start, end
+
+    def read_raw(self) -> bytes:
+        r"""Consume the next JSON value and return its (undecoded) bytes."""
+        start, end = self._scan(keep=True)
+        return bytes(self.buf[start:end])
+
+    def read_value(self):
+        r"""Consume the next JSON value and return it decoded."""
+        start, end = self._scan(keep=True)
+        return json.loads(self.buf[start:end])
+
+    def skip_value(self):
+        r"""Consume the next JSON value without keeping it in memory."""
+        self._scan(keep=False)
+
+    def _next_item(self, closing: bytes) -> bool:
+        # Après un élément, on trouve soit une virgule (un autre élément suit), soit la fin du conteneur.
+        char = self.peek()
+        self.pos += 1
+        if char == b",":
+            return True
+        if char == closing:
+            return False
+        raise ValueError(f"expected ',' or {closing.decode()!r} but found {char.decode('latin-1')!r} at byte {self.tell() - 1}")
+
+    def iter_object(self):
+        r"""
+        Iterate over the keys of the JSON object found at the current position.
+
+        The value of each key must be consumed (with `read_value`, `skip_value`,
+        `iter_object`, ...) before the next key is requested.
+        """
+        self.expect(b"{")
+        if self.peek() == b"}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(b":")
+            yield key
+            if not self._next_item(b"}"):
+                return
+
+    def iter_array(self):
+        r"""
+        Iterate over the indices of the JSON array found at the current position.
+
+        Each item must be consumed before the next index is requested.
+        """
+        self.expect(b"[")
+        if self.peek() == b"]":
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            if not self._next_item(b"]"):
+                return
+            index += 1
+
+
+def iter_cells(filename: str):
+    r"""
+    Iterate over the cells (dicts) of a jupyter notebook .ipynb file.
+
+    The file is parsed one cell at a time, so the memory used is bounded by
+    the size of the largest cell, not by the size of the notebook.
+
+    Usage:
+
+        >>> for cell in iter_cells("samples/hello-world.ipynb"):
+        ...     print(cell["cell_type"], cell["id"])
+        markdown a9541506
+        code b777420a
+        markdown a23ab5ac
+
+        >>> print(get_stream(iter_cells("samples/streams.ipynb"))) # doctest: +NORMALIZE_WHITESPACE
+        👋 Hello world! 🌍
+    """
+    with open(filename, "rb") as f:
+        scanner = JsonScanner(f)
+        for key in scanner.iter_object():
+            if key == "cells":
+                for _ in scanner.iter_array():
+                    yield scanner.read_value()
+                return # Le reste du fichier (métadonnées, version) ne nous intéresse pas.
+            scanner.skip_value()
+
+
+HEADER_TAIL_SIZE = 1 << 16 # Nombre d'octets lus à la fin du fichier pour y trouver l'en-tête.
+_HEADER_START = re.compile(rb'\]\s*,\s*"')
+
+
+def _load_header_from_tail(f):
+    # Les cellules sont la seule entrée du notebook dont la valeur est une liste, et Jupyter les écrit en
+    # premier : l'en-tête est donc, en général, tout ce qui suit le `],` qui les termine. On le cherche à la
+    # fin du fichier, sans lire les cellules. Renvoie None si cette disposition n'est pas reconnue.
+    size = f.seek(0, os.SEEK_END)
+    f.seek(max(0, size - HEADER_TAIL_SIZE))
+    tail = f.read()
+    for match in reversed(list(_HEADER_START.finditer(tail))):
+        try:
+            header = json.loads(b"{" + tail[match.end() - 1:])
+        except ValueError:
+            continue # Ce `],` n'est pas au premier niveau (il est dans les métadonnées par exemple).
+        if {"metadata", "nbformat", "nbformat_minor"} <= header.keys():
+            return header
+        return None
+    return None
+
+
+def load_header(filename: str) -> dict:
+    r"""
+    Load the top-level entries of a jupyter notebook .ipynb file, except the cells.
+
+    The header is first looked for at the end of the file, where Jupyter
+    writes it, so that the cells are not even read. Otherwise the file is
+    scanned and the cells are skipped over without being decoded. Either way,
+    this is much faster than `load_ipynb` when only the format version or the
+    metadata are needed.
+
+    Usage:
+
+        >>> header = load_header("samples/metadata.ipynb")
+        >>> sorted(header)
+        ['metadata', 'nbformat', 'nbformat_minor']
+        >>> get_format_version(header)
+        '4.5'
+        >>> get_metadata(header)["kernelspec"]["name"]
+        'python3'
+    """
+    with open(filename, "rb") as f:
+        header = _load_header_from_tail(f)
+        if header is not None:
+            return header
+        f.seek(0)
+        header = {}
+        scanner = JsonScanner(f)
+        for key in scanner.iter_object():
+            if key == "cells":
+                scanner.skip_value() # On parcourt les cellules sans construire d'objet Python.
+            else:
+                header[key] = scanner.read_value()
+    return header
+
+
+# Cache
+# ------------------------------------------------------------------------------
+CACHE_MAX_SIZE = 1 << 30 # Taille maximale (en octets) du cache par défaut.
+RACY_DELAY = 2.0 # Un fichier modifié depuis moins longtemps (en s) peut encore changer sans que sa date ne change.
+
+
+def trusted_mtime(stat):
+    r"""
+    Return the modification time (in ns) of a file from its `os.stat` result, or None if it cannot be trusted yet.
+
+    A file modified less than `RACY_DELAY` seconds ago may change again
+    without its modification time changing: it must be read again next time.
+
+    Usage:
+
+        >>> stat = os.stat("samples/minimal.ipynb")
+        >>> trusted_mtime(stat) == stat.st_mtime_ns
+        True
+    """
+    return stat.st_mtime_ns if time.time() - stat.st_mtime >= RACY_DELAY else None
+
+
+class ParseCache:
+    r"""
+    On-disk cache of parsed notebooks, stored in the (fast) marshal binary format.
+
+    The parsed notebooks are stored under the hash of their content. The hash
+    of a file is itself stored under its path, modification time and size, so
+    that a file which has not changed is not even read. When the cache grows
+    over `max_size` bytes, the least recently used entries are evicted.
+
+    The cache is best-effort: if its directory cannot be read or written
+    (missing permissions, full disk...), the notebooks are simply parsed.
+
+    Args:
+        directory (str): the directory where the cache is stored.
+        max_size (int): the maximum size of the cache, in bytes.
+
+    Attributes:
+        hits (int): the number of notebooks found in the cache.
+        misses (int): the number of notebooks that had to be parsed.
+
+    Usage:
+
+        >>> import tempfile
+        >>> cache = ParseCache(tempfile.mkdtemp())
+        >>> ipynb = load_ipynb("samples/hello-world.ipynb", cache=cache)
+        >>> ipynb == load_ipynb("samples/hello-world.ipynb", cache=cache)
+        True
+        >>> cache.hits, cache.misses
+        (1, 1)
+    """
+    def __init__(self, directory: str, max_size: int = CACHE_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._size = None # Estimation de la taille du cache (None : inconnue, à mesurer).
+
+    def load(self, filename: str, backend=None) -> dict:
+        r"""Load a jupyter notebook .ipynb file through the cache, parsing it with the given JSON backend if needed."""
+        stat = os.stat(filename)
+        key = f"{os.path.abspath(filename)}\0{stat.st_mtime_ns}\0{stat.st_size}"
+        key = hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + ".hash"
+        # 1 : le fichier n'a pas changé depuis la dernière fois, on connaît déjà le hash de son contenu.
+        digest = self._read(key)
+        if digest is not None:
+            ipynb = self._get(digest.decode())
+            if ipynb is not None:
+                self.hits += 1
+                return ipynb
+        # 2 : sinon, on lit le fichier pour calculer ce hash ; le contenu est peut-être déjà dans le cache.
+        with open(filename, "rb") as f:
+            raw = f.read()
+        digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        ipynb = self._get(digest)
+        if ipynb is None:
+            self.misses += 1
+            ipynb = get_json_backend(backend).loads(raw)
+            self._write(digest + ".marshal", marshal.dumps(ipynb))
+        else:
+            self.hits += 1
+        if trusted_mtime(stat) is not None:
+            self._write(key, digest.encode())
+        return ipynb
+
+    def _read(self, name: str):
+        # Renvoie le contenu d'une entrée (None si elle n'existe pas), en la marquant comme récemment utilisée.
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def _get(self, digest: str):
+        data = self._read(digest + ".marshal")
+        if data is None:
+            return None
+        try:
+            return marshal.loads(data)
+        except (EOFError, ValueError, TypeError): # Entrée corrompue ou écrite par une autre version de Python.
+            return None
+
+    def _write(self, name: str, data: bytes):
+        # On écrit dans un fichier temporaire que l'on renomme ensuite : les lecteurs ne voient jamais d'entrée incomplète.
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory, prefix=".")
+            try:
+                with os.fdopen(descriptor, "wb") as f:
+                    f.write(data)
+                os.replace(temporary, os.path.join(self.directory, name))
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.remove(temporary)
+                raise
+        except OSError: # Le cache est facultatif : un répertoire inaccessible ou un disque plein n'empêche pas le chargement.
+            return
+        # On ne parcourt le répertoire que lorsque l'estimation dépasse la taille maximale (ou au premier appel).
+        # L'estimation peut être trop grande (entrée remplacée, écrite par un autre processus) : elle est alors
+        # recalée sur la taille réelle, mesurée par `_evict`.
+        if self._size is not None:
+            self._size += len(data)
+        if self._size is None or self._size > self.max_size:
+            self._evict()
+
+    def _evict(self):
+        # On supprime les entrées les moins récemment utilisées jusqu'à repasser sous la taille maximale.
+        entries = []
+        try:
+            for entry in os.scandir(self.directory):
+                if not entry.name.startswith(".") and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError: # Répertoire illisible, ou entrée supprimée entre-temps : on réessaiera à la prochaine écriture.
+            return
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass # Déjà supprimée par un autre processus.
+            size -= entry_size
+        self._size = size
+
+
+_default_caches = {}
+
+
+def get_default_cache():
+    r"""
+    Return the default parse cache (see `ParseCache`), or None if there is none.
+
+    The persistent cache is opt-in: it is stored in the directory named by
+    the NOTEBOOK_CACHE_DIR environment variable, read at each call, and
+    there is no default cache if this variable is not set (or empty).
+
+    Usage:
+
+        >>> os.environ["NOTEBOOK_CACHE_DIR"] = directory = tempfile.mkdtemp()
+        >>> get_default_cache().directory == directory
+        True
+        >>> os.environ["NOTEBOOK_CACHE_DIR"] = ""
+        >>> print(get_default_cache())
+        None
+    """
+    directory = os.environ.get("NOTEBOOK_CACHE_DIR")
+    if not directory:
+        return None
+    if directory not in _default_caches:
+        _default_caches[directory] = ParseCache(directory)
+    return _default_caches[directory]
+
+
+@contextlib.contextmanager
+def atomic_write(filename: str, mode: str = "w", **kwargs):
+    r"""
+    Open a temporary file, which replaces `filename` once it is fully written.
+
+    If an exception is raised (or the process dies) before the end of the
+    `with` block, `filename` is left untouched. The keyword arguments are
+    passed to `open`.
+
+    Usage:
+
+        >>> with atomic_write("samples/atomic-save-load.txt", encoding="utf-8") as f:
+        ...     print("Hello world!", file=f)
+        >>> with open("samples/atomic-save-load.txt") as f:
+        ...     print(f.read(), end="")
+        Hello world!
+        >>> os.remove("samples/atomic-save-load.txt")
+    """
+    # Le fichier temporaire est créé dans le même dossier, pour que le renommage soit atomique. Contrairement
+    # à mkstemp (0o600), on le crée avec les droits 0o666 : le système applique lui-même le masque (umask) du
+    # processus au moment de l'appel, sans qu'il faille le lire.
+    directory = os.path.dirname(os.path.abspath(filename))
+    while True:
+        temporary = os.path.join(directory, f".{os.path.basename(filename)}.{os.urandom(6).hex()}.tmp")
+        try:
+            descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with open(descriptor, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        try: # Un fichier remplacé garde ses droits.
+            os.chmod(temporary, os.stat(filename).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(temporary, filename)
+    except BaseException:
+        os.remove(temporary)
+        raise
 
 
 def save_ipynb(ipynb, filename: str):
     r"""
     Save a jupyter notebook (Python dict) as a .ipynb file (JSON)
 
+    The JSON text is the one of `json.dumps` (see `JsonBackend`).
+
+    The notebook is written cell by cell to a temporary file which then
+    replaces `filename` (see `atomic_write`), so that a crash never leaves a
+    partly written notebook. The cells may be any iterable, such as the one
+    returned by `iter_cells`: a notebook can then be transformed and saved
+    while holding a single cell in memory.
+
     Usage:
 
         >>> ipynb = load_ipynb("samples/minimal.ipynb")
@@ -75,16 +698,34 @@ def save_ipynb(ipynb, filename: str):
         >>> ipynb == load_ipynb("samples/hello-world-save-load.ipynb")
         True
 
+        >>> cells = (cell for cell in iter_cells("samples/hello-world.ipynb") if cell["cell_type"] == "code")
+        >>> save_ipynb({"cells": cells, **load_header("samples/hello-world.ipynb")}, "samples/hello-world-save-load.ipynb")
+        >>> [cell["id"] for cell in iter_cells("samples/hello-world-save-load.ipynb")]
+        ['b777420a']
     """
-    # Mettre 'a' en argument de open() permet de créer un nouveau fichier, dans lequel on écrit le code au format JSON avec la fonction json.dumps().
-    with open(filename, 'a') as f:
-        f.write(json.dumps(ipynb))
+    # On écrit exactement le texte de `json.dumps(ipynb)` (mêmes séparateurs), mais morceau par morceau.
+    dumps = json.dumps
+    with atomic_write(filename, encoding="utf-8") as f:
+        f.write("{")
+        for index, (key, value) in enumerate(ipynb.items()):
+            f.write((", " if index else "") + dumps(key) + ": ")
+            if key == "cells":
+                f.write("[")
+                for cell_index, cell in enumerate(value):
+                    f.write((", " if cell_index else "") + dumps(cell))
+                f.write("]")
+            else:
+                f.write(dumps(value))
+        f.write("}")
 
 
 def get_format_version(ipynb: dict) -> str:
     r"""
     Return the format version (str) of a jupyter notebook (dict).
 
+    The notebook may be loaded with `load_header` instead of `load_ipynb`
+    when its cells are not needed.
+
     Usage:
 
         >>> ipynb = load_ipynb("samples/minimal.ipynb")
@@ -94,6 +735,9 @@ def get_format_version(ipynb: dict) -> str:
         >>> ipynb = load_ipynb("samples/hello-world.ipynb")
         >>> get_format_version(ipynb)
         '4.5'
+
+        >>> get_format_version(load_header("samples/hello-world.ipynb"))
+        '4.5'
     """
     # La version et la sous-version sont stockées dans le dictionnaire `ipynb` représentant le notebook. Elles correspondent respectivement aux clefs 'nbformat' et 'nbformat_minor'.
     return f"{ipynb['nbformat']}.{ipynb['nbformat_minor']}"
@@ -103,6 +747,9 @@ def get_metadata(ipynb: dict) -> dict:
     r"""
     Return the global metadata of a notebook.
 
+    The notebook may be loaded with `load_header` instead of `load_ipynb`
+    when its cells are not needed.
+
     Usage:
 
         >>> ipynb = load_ipynb("samples/metadata.ipynb")
@@ -128,6 +775,10 @@ def get_cells(ipynb: dict) -> list:
     r"""
     Return the notebook cells.
 
+    The notebook may also be given as an iterable of cells, such as the one
+    returned by `iter_cells`; it is then returned unchanged, so that all the
+    functions built on `get_cells` work with streamed notebooks.
+
     Usage:
 
         >>> ipynb = load_ipynb("samples/minimal.ipynb")
@@ -154,15 +805,73 @@ def get_cells(ipynb: dict) -> list:
           'id': 'a23ab5ac',
           'metadata': {},
           'source': ['Goodbye! 👋']}]
+
+        >>> cells = get_cells(iter_cells("samples/hello-world.ipynb"))
+        >>> [cell["id"] for cell in cells]
+        ['a9541506', 'b777420a', 'a23ab5ac']
     """
     # Les cellules sont stockées dans le dictionnaire représentant le notebook. Elles correspondent à la clef `cells`. La fonction `get_cells()` renvoie une liste de cellules, donc une `list` de `dict`.
-    return ipynb['cells']
+    if isinstance(ipynb, dict):
+        return ipynb['cells']
+    return ipynb # Sinon, `ipynb` est déjà un itérable de cellules (par exemple `iter_cells(filename)`).
 
 
-def to_percent(ipynb: dict) -> str:
+def write_chunks(chunks, file=None):
+    r"""
+    Write the text chunks of an emitter (such as `iter_percent`) to the file-like object `file`,
+    or join them in a single string (returned) if `file` is None.
+    """
+    if file is None:
+        return "".join(chunks)
+    file.writelines(chunks)
+
+
+def iter_percent(ipynb: dict):
+    r"""
+    Iterate over the chunks of text of a ipynb notebook (dict) in the percent format (see `to_percent`).
+
+    The notebook may also be an iterable of cells, such as `iter_cells(filename)`:
+    the conversion then never holds the whole notebook, nor the whole text, in memory.
+
+    Usage:
+
+        >>> ipynb = load_ipynb("samples/hello-world.ipynb")
+        >>> list(iter_percent(ipynb))[:3]
+        ['# %% [markdown]\n', '# ', 'Hello world!\n']
+
+        >>> import sys
+        >>> write_chunks(iter_percent(iter_cells("samples/hello-world.ipynb")), sys.stdout)
+        # %% [markdown]
+        # Hello world!
+        # ============
+        # Print `Hello world!`:
+        <BLANKLINE>
+        # %%
+        print("Hello world!")
+        <BLANKLINE>
+        # %% [markdown]
+        # Goodbye! 👋
+    """
+    # En lisant les notebooks donnés en exemple, on comprend les règles d'écriture, que l'on reproduit  ici.
+    # On bâtit le texte cellule par cellule, mais au lieu de le stocker, on en renvoie les morceaux au fur et à mesure.
+    for index, cell in enumerate(get_cells(ipynb)):
+        if index:
+            yield '\n' # Saut de ligne qui sépare les cellules : le code doit se terminer par un unique saut de ligne.
+        markdown = cell['cell_type'] == 'markdown' # On cherche le type de la cellule, que l'on stocke dans un booléen.
+        yield '# %% [markdown]\n' if markdown else '# %%\n' # Chaque cellule possède un début, selon son type.
+        for line in cell['source']: # Puis on construit ligne par ligne, l'information étant stockée à la clef `source`.
+            if markdown:
+                yield '# ' # Début de la ligne suivant le type.
+            yield line
+        yield '\n' # Saut de ligne, caractéristique de la fin de cellule.
+
+
+def to_percent(ipynb: dict, file=None) -> str:
     r"""
     Convert a ipynb notebook (dict) to a Python code in the percent format (str).
 
+    If a file-like object `file` is given, the code is written to it (see `iter_percent`) instead of being returned.
+
     Usage:
 
         >>> ipynb = load_ipynb("samples/hello-world.ipynb")
@@ -183,19 +892,7 @@ def to_percent(ipynb: dict) -> str:
         ...     with open(notebook_file.with_suffix(".py"), "w", encoding="utf-8") as output:
         ...         print(percent_code, file=output)
     """
-    # En lisant les notebooks donnés en exemple, on comprend les règles d'écriture, que l'on reproduit  ici.
-    text = ""
-    cells = get_cells(ipynb)
-    # On bâtit le texte cellule par cellule. On le stocke dans `text`.
-    for cell in cells:
-        cell_type = cell['cell_type'] # On cherche le type de la cellule...
-        markdown = cell_type == 'markdown' # ... que l'on stocke dans un booléen.
-        text += '# %% [markdown]\n' if markdown else '# %%\n' # Chaque cellule possède un début, selon son type.
-        for line in cell['source']: # Puis on construit ligne par ligne, l'information étant stockée à la clef `source`.
-            text += '# ' if markdown else '' # Début de la ligne suivant le type.
-            text += line # Ajout de la ligne.
-        text += '\n\n' # Saut de ligne, caractéristique de la fin de cellule.
-    return text[:-1] # On coupe le dernier saut de la dernière cellule : le code doit se terminer par un unique saut de ligne.
+    return write_chunks(iter_percent(ipynb), file)
 
 
 def starboard_html(code):
@@ -220,11 +917,33 @@ def starboard_html(code):
 """
 
 
-def to_starboard(ipynb: dict, html=False):
+def iter_starboard(ipynb: dict):
+    r"""
+    Iterate over the chunks of text of a ipynb notebook (dict) as a Starboard notebook (see `to_starboard`).
+
+    Usage:
+
+        >>> ipynb = load_ipynb("samples/hello-world.ipynb")
+        >>> list(iter_starboard(ipynb))[:3]
+        ['# %% [markdown]\n', 'Hello world!\n', '============\n']
+    """
+    # D'après les indications, on comprend sur un exemple la structure du texte à implémenter dans le format demandé.
+    # La démarche est sensiblement la même que dans la fonction `iter_percent`, à des détails de mise en forme (retour à la ligne, début de cellule, début de ligne...) près.
+    for index, cell in enumerate(get_cells(ipynb)):
+        if index:
+            yield '\n'
+        yield '# %% [markdown]\n' if cell['cell_type'] == 'markdown' else '# %% [python]\n'
+        yield from cell["source"]
+
+
+def to_starboard(ipynb: dict, html=False, file=None):
     r"""
     Convert a ipynb notebook (dict) to a Starboard notebook (str)
     or to a Starboard HTML document (str) if html is True.
 
+    If a file-like object `file` is given, the document is written to it instead of being returned;
+    the notebook code is then streamed to the file (see `StarboardTemplate`).
+
     Usage:
 
         >>> ipynb = load_ipynb("samples/hello-world.ipynb")
@@ -252,17 +971,106 @@ def to_starboard(ipynb: dict, html=False):
         ...     with open(notebook_file.with_suffix(".html"), "w", encoding="utf-8") as output:
         ...         print(starboard_html, file=output)
     """
-    # D'après les indications, on comprend sur un exemple la structure du texte à implémenter dans le format demandé.
-    # La démarche est sensiblement la même que dans la fonction `to_percent`, à des détails de mise en forme (retour à la ligne, début de cellule, début de ligne...) près. On ne précisera pas dans le détail la démarche, qui reste quasiment identique.
-    text = ""
-    cells = get_cells(ipynb)
-    for cell in cells:
-        ismarkdown = cell['cell_type'] == 'markdown'
-        text += '# %% [markdown]\n' if ismarkdown else '# %% [python]\n'
-        for line in cell["source"]:
-            text += line
-        text += '\n'
-    return starboard_html(text[:-1]) if html else text[:-1]
+    if html:
+        return write_chunks(default_starboard_template.iter_html(ipynb), file)
+    return write_chunks(iter_starboard(ipynb), file)
+
+
+class StarboardTemplate:
+    r"""
+    A Starboard HTML document template, split once around the notebook code.
+
+    The notebook code is streamed between the static parts of the template,
+    quoted chunk by chunk as `repr` would quote it as a whole. One template
+    can render any number of notebooks (see `render_files`), which are then
+    read cell by cell: only the static parts and one cell are in memory.
+
+    Args:
+        render (function): the function rendering the template around a code (str).
+
+    Usage:
+
+        >>> template = StarboardTemplate()
+        >>> ipynb = load_ipynb("samples/hello-world.ipynb")
+        >>> template.render(ipynb) == starboard_html(to_starboard(ipynb))
+        True
+    """
+    _MARKER = "\x00code\x00" # Texte qui ne peut apparaître dans le gabarit.
+
+    def __init__(self, render=starboard_html):
+        self.head, self.tail = render(self._MARKER).split(repr(self._MARKER))
+
+    @staticmethod
+    def _quote(ipynb) -> str:
+        # `repr` n'utilise des guillemets doubles que si le texte contient des apostrophes mais pas de guillemets.
+        # On ne peut le savoir à l'avance que pour des cellules en mémoire : sinon, le texte est entre apostrophes.
+        cells = get_cells(ipynb)
+        if isinstance(cells, list):
+            lines = [line for cell in cells for line in cell["source"]]
+            if any("'" in line for line in lines) and not any('"' in line for line in lines):
+                return '"'
+        return "'"
+
+    def iter_html(self, ipynb, quote=None):
+        r"""Iterate over the chunks of the Starboard HTML document of a ipynb notebook (dict, or iterable of cells).
+
+        The code is quoted with `quote` if given, else as `repr` would quote it.
+        """
+        quote = quote or self._quote(ipynb)
+        # Le guillemet ajouté force `repr` à choisir les apostrophes (et à les échapper), quel que soit le morceau.
+        escape = (lambda text: repr(text + '"')[1:-2]) if quote == "'" else (lambda text: repr(text)[1:-1])
+        yield self.head + quote
+        # Les lignes sont regroupées en morceaux d'environ CHUNK_SIZE caractères, pour limiter le nombre d'appels.
+        chunks, size = [], 0
+        for chunk in iter_starboard(ipynb):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= CHUNK_SIZE:
+                yield escape("".join(chunks))
+                chunks, size = [], 0
+        yield escape("".join(chunks)) + quote + self.tail
+
+    def render(self, ipynb, file=None) -> str:
+        r"""Render the Starboard HTML document of a notebook, written to the file-like object `file` if given (see `write_chunks`)."""
+        return write_chunks(self.iter_html(ipynb), file)
+
+    def _render_stream(self, source: str, file):
+        # Les cellules sont lues une à une (voir `iter_cells`), en notant les guillemets rencontrés.
+        quotes = set()
+        def cells():
+            for cell in iter_cells(source):
+                quotes.update(char for line in cell["source"] for char in "'\"" if char in line)
+                yield cell
+        file.writelines(self.iter_html(cells(), "'"))
+        if quotes == {"'"}: # Cas (rare) où `repr` aurait choisi les guillemets doubles : on recommence.
+            file.seek(0)
+            file.truncate()
+            file.writelines(self.iter_html(iter_cells(source), '"'))
+
+    def render_files(self, jobs, stream=True) -> int:
+        r"""
+        Render the Starboard HTML documents of many notebook files with this template.
+
+        Args:
+            jobs (iterable): the (notebook, document) file names.
+            stream (bool): whether to read the notebooks cell by cell (see `iter_cells`),
+                which is slower than loading them (see `load_ipynb`) but keeps the memory bounded.
+
+        Returns:
+            int: the number of documents written.
+        """
+        count = 0
+        for source, destination in jobs:
+            with atomic_write(destination, encoding="utf-8") as f:
+                if stream:
+                    self._render_stream(source, f)
+                else:
+                    self.render(load_ipynb(source), f)
+            count += 1
+        return count
+
+
+default_starboard_template = StarboardTemplate()
 
 # Outputs
 # ------------------------------------------------------------------------------
@@ -324,10 +1132,316 @@ def clear_outputs(ipynb: dict):
             cell['outputs'] = []
 
 
-def get_stream(ipynb: dict, stdout=True, stderr=False) -> str:
+_CLEARED = {"outputs": b"[]", "execution_count": b"null"}
+
+
+def strip_outputs(filename: str, output=None) -> bool:
+    r"""
+    Remove the cell outputs and reset the execution counts of a notebook file, without parsing it (see `clear_outputs`).
+
+    The file is scanned (see `JsonScanner`) to find the `outputs` and
+    `execution_count` values of the code cells, which are skipped without
+    being decoded; all the other bytes are copied as they are, so the
+    formatting of the file is kept. The result is written to `output` (by
+    default, the file itself, atomically). A file which is already clean is
+    not written again, so its modification time does not change.
+
+    Returns:
+        bool: whether the notebook had outputs or execution counts to remove.
+
+    Usage:
+
+        >>> strip_outputs("samples/hello-world.ipynb", "samples/hello-world-save-load.ipynb")
+        True
+        >>> ipynb = load_ipynb("samples/hello-world.ipynb")
+        >>> clear_outputs(ipynb)
+        >>> ipynb == load_ipynb("samples/hello-world-save-load.ipynb", cache=False)
+        True
+        >>> strip_outputs("samples/hello-world-save-load.ipynb")
+        False
+        >>> os.remove("samples/hello-world-save-load.ipynb")
+    """
+    edits = [] # (début, fin, remplacement) des valeurs à remplacer, dans l'ordre du fichier.
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+        scanner = JsonScanner(content)
+        for key in scanner.iter_object():
+            if key != "cells":
+                scanner.skip_value()
+                continue
+            for _ in scanner.iter_array():
+                cell_type, values = None, []
+                for cell_key in scanner.iter_object():
+                    if cell_key == "cell_type":
+                        cell_type = scanner.read_value()
+                    elif cell_key in _CLEARED:
+                        scanner.peek()
+                        start = scanner.tell()
+                        scanner.skip_value()
+                        values.append((start, scanner.tell(), _CLEARED[cell_key]))
+                    else:
+                        scanner.skip_value()
+                if cell_type == "code":
+                    # Une valeur déjà vide (ou nulle) n'est pas une modification.
+                    edits += [(start, end, cleared) for start, end, cleared in values
+                              if end - start > 16 or content[start:end].translate(None, b" \t\r\n") != cleared]
+        if not edits and (output is None or os.path.abspath(output) == os.path.abspath(filename)):
+            return False
+        with atomic_write(output or filename, "wb") as f:
+            view, position = memoryview(content), 0
+            for start, end, cleared in edits:
+                f.write(view[position:start])
+                f.write(cleared)
+                position = end
+            f.write(view[position:])
+            view.release()
+    return bool(edits)
+
+
+class OutputTable:
+    r"""
+    Columnar table of the outputs of a notebook, extracted in one pass over its cells.
+
+    Each row is one payload of an output: the text of a stream, the `ename`,
+    `evalue` and `traceback` of an error (three rows, with these pseudo MIME
+    types), or one MIME type of the data of a display_data or execute_result
+    output. The payloads (as text; non-string data is JSON-encoded) are
+    concatenated in a single `buffer`, and the other columns are NumPy arrays,
+    so that `get_stream`, `get_exceptions` and `iter_png_data` are queries
+    over the columns. Build the table once to query a notebook repeatedly:
+    the table does not change, so the results of these queries are kept.
+
+    Args:
+        ipynb (dict): the notebook (or an iterable of cells, see `get_cells`).
+        mime_types (list): if given, only the payloads of these MIME types are
+            extracted (the other ones are neither copied nor JSON-encoded).
+
+    Attributes:
+        cell (np.ndarray): the index of the cell of each row.
+        output (np.ndarray): the index of the output of each row (in the notebook).
+        output_type (np.ndarray): the output type of each row, as an index in `output_types`.
+        name (np.ndarray): the stream name of each row, as an index in `names` (-1 if none).
+        mime (np.ndarray): the MIME type of each row, as an index in `mime_types`.
+        evalue (np.ndarray): for the `ename` rows, the row of the `evalue` of the same error (-1 if none).
+        start, end (np.ndarray): the offsets of the payload of each row in `buffer`.
+        buffer (str): the concatenated payloads.
+
+    Usage:
+
+        >>> table = OutputTable(load_ipynb("samples/errors.ipynb"))
+        >>> table
+        <OutputTable: 6 payloads of 2 outputs in 2 cells>
+        >>> table.mime_types
+        ['ename', 'evalue', 'traceback']
+        >>> table.payloads(table.select(mime="ename"))
+        ['TypeError', 'Warning']
+        >>> get_exceptions(table)
+        [TypeError("unsupported operand type(s) for +: 'int' and 'str'"), Warning('🌧️  light rain')]
+    """
+    def __init__(self, ipynb: dict, mime_types=None):
+        wanted = None if mime_types is None else set(mime_types)
+        self.output_types, self.names, self.mime_types = [], [], []
+        codes = {}, {}, {} # Pour chaque catégorie : valeur -> indice dans la liste correspondante.
+        cell_column, output_column, type_column, name_column, mime_column, lengths, parts = [], [], [], [], [], [], []
+        evalue_column = []
+        output_index = -1
+
+        def code(category: int, value: str) -> int:
+            index = codes[category].get(value)
+            if index is None:
+                values = (self.output_types, self.names, self.mime_types)[category]
+                index = codes[category][value] = len(values)
+                values.append(value)
+            return index
+
+        for cell_index, cell in enumerate(get_cells(ipynb)):
+            for output in cell.get("outputs", ()):
+                output_index += 1
+                output_type = code(0, output.get("output_type"))
+                name = code(1, output["name"]) if "name" in output else -1
+                if "text" in output:
+                    payloads = [("text", output["text"])]
+                elif output.get("output_type") == "error":
+                    payloads = [("ename", output["ename"]), ("evalue", output["evalue"]), ("traceback", "\n".join(output["traceback"]))]
+                else:
+                    payloads = output.get("data", {}).items()
+                ename_row = None
+                for mime, payload in payloads:
+                    if wanted is not None and mime not in wanted:
+                        continue
+                    if mime == "ename" and output.get("output_type") == "error":
+                        ename_row = len(cell_column)
+                    elif mime == "evalue" and ename_row is not None:
+                        evalue_column[ename_row] = len(cell_column)
+                    if not isinstance(payload, str):
+                        payload = "".join(payload) if isinstance(payload, list) else json.dumps(payload)
+                    cell_column.append(cell_index)
+                    output_column.append(output_index)
+                    type_column.append(output_type)
+                    name_column.append(name)
+                    mime_column.append(code(2, mime))
+                    evalue_column.append(-1)
+                    lengths.append(len(payload))
+                    parts.append(payload)
+
+        self.cell = np.array(cell_column, dtype=np.int32)
+        self.output = np.array(output_column, dtype=np.int32)
+        # Les codes sont des entiers de 32 bits : le nombre de valeurs distinctes d'une catégorie n'est pas borné.
+        self.output_type = np.array(type_column, dtype=np.int32)
+        self.name = np.array(name_column, dtype=np.int32)
+        self.mime = np.array(mime_column, dtype=np.int32)
+        self.evalue = np.array(evalue_column, dtype=np.int32)
+        self.end = np.cumsum(np.array(lengths, dtype=np.int64))
+        self.start = self.end - np.array(lengths, dtype=np.int64)
+        self.buffer = "".join(parts)
+        self._results = {} # Les résultats des requêtes déjà faites (la table ne change pas).
+
+    def _memoized(self, key, function):
+        result = self._results.get(key)
+        if result is None:
+            result = self._results[key] = function()
+        return result
+
+    def __len__(self):
+        return len(self.cell)
+
+    @staticmethod
+    def _codes(values: list, selected) -> list:
+        # Les indices des valeurs choisies (une valeur ou une liste de valeurs), ignorant celles qui n'apparaissent pas.
+        selected = [selected] if isinstance(selected, str) else selected
+        return [values.index(value) for value in selected if value in values]
+
+    def select(self, output_type=None, name=None, mime=None) -> np.ndarray:
+        r"""Return the indices of the rows of the given output type(s), stream name(s) and MIME type(s) (None for any)."""
+        mask = np.ones(len(self), dtype=bool)
+        for column, values, selected in [
+            (self.output_type, self.output_types, output_type),
+            (self.name, self.names, name),
+            (self.mime, self.mime_types, mime),
+        ]:
+            if selected is not None:
+                mask &= np.isin(column, self._codes(values, selected))
+        return np.flatnonzero(mask)
+
+    def payloads(self, rows) -> list:
+        r"""Return the payloads of the given rows (indices), as str."""
+        buffer = self.buffer
+        return [buffer[start:end] for start, end in zip(self.start[rows].tolist(), self.end[rows].tolist())]
+
+    def __repr__(self):
+        outputs = len(np.unique(self.output))
+        return f"<OutputTable: {len(self)} payloads of {outputs} outputs in {len(np.unique(self.cell))} cells>"
+
+
+def output_table(ipynb: dict, mime_types=None) -> OutputTable:
+    r"""
+    Return the output table of a notebook (see `OutputTable`), or the given table itself.
+
+    The functions which query the outputs (`get_stream`, `get_exceptions`,
+    `iter_png_data`) walk the cells of a notebook given as a dict (or as an
+    iterable of cells); given a table, built once, they select its rows and
+    memoize their result, which pays off for repeated queries.
+
+    Usage:
+
+        >>> table = output_table(load_ipynb("samples/streams.ipynb"))
+        >>> output_table(table) is table
+        True
+    """
+    return ipynb if isinstance(ipynb, OutputTable) else OutputTable(ipynb, mime_types)
+
+
+def iter_stream(ipynb: dict, stdout=True, stderr=False):
+    r"""
+    Iterate over the text written to the standard output and/or error stream, as (cell id, stream name, text) chunks.
+
+    The chunks are the pieces of text stored in the stream outputs, in the
+    order of the notebook; nothing is concatenated. With a streamed notebook
+    (see `iter_cells`), only the current cell is kept in memory. The cells
+    without an id (before nbformat 4.5) are named after their position.
+
+    Usage:
+
+        >>> for chunk in iter_stream(iter_cells("samples/streams.ipynb"), stderr=True):
+        ...     print(chunk)
+        ('00000000', 'stdout', '👋 Hello world! 🌍\n')
+        ('00000001', 'stderr', '🔥 This is fine. 🔥 (https://gunshowcomic.com/648)\n')
+    """
+    names = {name for name, selected in [("stdout", stdout), ("stderr", stderr)] if selected}
+    for index, cell in enumerate(get_cells(ipynb)):
+        for output in cell.get("outputs", ()):
+            name = output.get("name")
+            if name in names and "text" in output:
+                cell_id = cell.get("id") or f"{index:08x}"
+                text = output["text"]
+                for chunk in [text] if isinstance(text, str) else text:
+                    yield cell_id, name, chunk
+
+
+def _size(value) -> int:
+    # La taille (en octets, encodée en UTF-8) d'un texte, éventuellement découpé en lignes, ou d'une valeur JSON.
+    if isinstance(value, list) and all(isinstance(line, str) for line in value):
+        return sum(len(line) if line.isascii() else len(line.encode()) for line in value)
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False)
+    return len(value) if value.isascii() else len(value.encode())
+
+
+def iter_cell_sizes(ipynb: dict):
+    r"""
+    Iterate over the sizes of the contents of the cells, as (cell id, sizes) pairs.
+
+    The sizes (in UTF-8 bytes, once decoded from JSON) are those of the
+    source, of the stream outputs ("stream"), of the error tracebacks
+    ("traceback") and of the payloads of the other outputs, by MIME type;
+    the empty ones are left out. With a streamed notebook (see
+    `iter_cells`), only the current cell is kept in memory. The cells
+    without an id (before nbformat 4.5) are named after their position.
+
+    Usage:
+
+        >>> for cell_id, sizes in iter_cell_sizes(iter_cells("samples/images.ipynb")):
+        ...     print(cell_id, sizes)
+        00000000 {'source': 76}
+        00000001 {'source': 84}
+        00000002 {'source': 11, 'text/plain': 1015}
+        00000003 {'source': 34, 'image/png': 611120, 'text/plain': 63}
+        >>> dict(iter_cell_sizes(iter_cells("samples/errors.ipynb")))
+        {'00000000': {'source': 7, 'traceback': 413}, '00000001': {'source': 36, 'traceback': 428}}
+    """
+    for index, cell in enumerate(get_cells(ipynb)):
+        sizes = collections.Counter(source=_size(cell.get("source", "")))
+        for output in cell.get("outputs", ()):
+            if output.get("output_type") == "stream":
+                sizes["stream"] += _size(output.get("text", ""))
+            elif output.get("output_type") == "error":
+                sizes["traceback"] += _size(output.get("traceback", []))
+            for mime, payload in output.get("data", {}).items():
+                sizes[mime] += _size(payload)
+        yield cell.get("id") or f"{index:08x}", {key: size for key, size in sizes.items() if size}
+
+
+def _tail(chunks, lines: int) -> str:
+    # On ne garde que les `lines` dernières lignes (la dernière pouvant être incomplète) : la mémoire reste bornée.
+    kept, partial = collections.deque(maxlen=lines), ""
+    for chunk in chunks:
+        if not partial and chunk.endswith("\n") and chunk.find("\n") == len(chunk) - 1: # Le cas courant : un morceau par ligne.
+            kept.append(chunk)
+            continue
+        *complete, partial = (partial + chunk).split("\n")
+        kept.extend(line + "\n" for line in complete[-lines:] if lines)
+    if partial:
+        kept.append(partial)
+    return "".join(kept)
+
+
+def get_stream(ipynb: dict, stdout=True, stderr=False, tail=None) -> str:
     r"""
     Return the text written to the standard output and/or error stream.
 
+    If `tail` is given, only the last `tail` lines are returned; they are
+    found in bounded memory, without concatenating the whole text (see
+    `iter_stream`).
+
     Usage:
 
         >>> ipynb = load_ipynb("samples/streams.ipynb")
@@ -338,18 +1452,17 @@ def get_stream(ipynb: dict, stdout=True, stderr=False) -> str:
         >>> print(get_stream(ipynb, stdout=True, stderr=True)) # doctest: +NORMALIZE_WHITESPACE
         👋 Hello world! 🌍
         🔥 This is fine. 🔥 (https://gunshowcomic.com/648)
+        >>> get_stream(iter_cells("samples/streams.ipynb"), stderr=True, tail=1)
+        '🔥 This is fine. 🔥 (https://gunshowcomic.com/648)\n'
     """
-    # On parcourt les cellules à la recherche des différentes `outputs`.
-    text = ""
-    for cell in get_cells(ipynb):
-        if cell['cell_type'] == 'code': # Les outputs ne sont présentes que dans des cellules de code.
-            for output in cell['outputs']:
-                if stdout and output['name'] == 'stdout': # Ces deux tests (1) selectionnent le genre d'output voulu.
-                    text += ''.join(output['text'])
-                elif stderr and output['name'] == 'stderr': # (2)
-                    text += ''.join(output['text'])
-    return text
-            
+    if not isinstance(ipynb, OutputTable):
+        chunks = (chunk for _, _, chunk in iter_stream(ipynb, stdout, stderr))
+        return "".join(chunks) if tail is None else _tail(chunks, tail)
+    # On sélectionne, dans la table des sorties, les textes des flux voulus, dans l'ordre où ils apparaissent.
+    names = [name for name, selected in [("stdout", stdout), ("stderr", stderr)] if selected]
+    if tail is not None:
+        return _tail(ipynb.payloads(ipynb.select(name=names, mime="text")), tail)
+    return ipynb._memoized(("stream", *names), lambda: "".join(ipynb.payloads(ipynb.select(name=names, mime="text"))))
 
 
 def get_exceptions(ipynb: dict) -> list:
@@ -381,20 +1494,263 @@ def get_exceptions(ipynb: dict) -> list:
         def __repr__(self):
             return self.ename + "(" + repr(self.evalue) + ")" # On implémente ici la représentation exigée par l'énoncé.
 
-    # Parcourons désormais les cellules à la recherche des erreurs.
-    for cell in get_cells(ipynb):
-        if cell['cell_type'] == 'code': # Les erreurs ne concernent que les cellules de code.
-            for output in cell['outputs']:
-                if output['output_type'] == 'error': # Les erreurs sont un type d'output.
-                    errors.append(MyError(output['ename'], output['evalue'])) # Notre programme doit renvoyer une `list` de `Exception`. Passer par la sous-classse `MyError` permet de choisir la représentation.
+    if isinstance(ipynb, OutputTable):
+        # Cherchons les erreurs dans la table des sorties : chaque ligne `ename` donne la ligne de son `evalue`.
+        def payloads():
+            rows = ipynb.select(output_type="error", mime="ename")
+            evalues = ipynb.evalue[rows].tolist() # Une table construite sans les `evalue` (voir `mime_types`) n'en a pas.
+            return [(ename, ipynb.payloads([evalue])[0] if evalue >= 0 else "") for ename, evalue in zip(ipynb.payloads(rows), evalues)]
+        found = ipynb._memoized(("error",), payloads)
+    else:
+        # Sinon, parcourons les cellules à la recherche des erreurs, qui sont un type d'output.
+        found = (
+            (output["ename"], output.get("evalue", ""))
+            for cell in get_cells(ipynb) for output in cell.get("outputs", ()) if output.get("output_type") == "error"
+        )
+    for ename, evalue in found:
+        errors.append(MyError(ename, evalue)) # Notre programme doit renvoyer une `list` de `Exception`. Passer par la sous-classse `MyError` permet de choisir la représentation.
     return errors
 
 
-def get_images(ipynb: dict) -> list:
+def iter_png_data(ipynb: dict):
+    r"""
+    Iterate over the (base64-encoded) PNG images contained in a notebook cells outputs.
+
+    Usage:
+
+        >>> ipynb = load_ipynb("samples/images.ipynb")
+        >>> [data[:16] for data in iter_png_data(ipynb)]
+        ['iVBORw0KGgoAAAAN']
+    """
+    # La donnée des images est stockées dans la cellule qui affiche l'image, dans "outputs" puis "data" puis "image/png".
+    if isinstance(ipynb, OutputTable):
+        yield from ipynb._memoized(("image/png",), lambda: ipynb.payloads(ipynb.select(mime="image/png")))
+        return
+    # Sinon, les images sont données une à une, au fil des cellules : un notebook lu cellule par cellule (voir
+    # `iter_cells`) n'est jamais entièrement en mémoire.
+    for cell in get_cells(ipynb):
+        if cell["cell_type"] == "code":
+            for output in cell["outputs"]:
+                data = output.get("data", {}).get("image/png") # Les sorties de type "stream" ou "error" n'ont pas de "data".
+                if data is not None:
+                    yield "".join(data) if isinstance(data, list) else data
+
+
+def decode_png(data: str, size=None) -> np.ndarray:
+    r"""
+    Decode a base64-encoded PNG image as a NumPy array, downscaled to fit in the (width, height) `size` box if given.
+    """
+    # On décode le base64, puis le PNG avec le module PIL (qui libère le GIL pendant le décodage).
+    image = PIL.Image.open(io.BytesIO(base64.b64decode(data)))
+    if size is not None:
+        image.thumbnail(size)
+    return np.array(image, dtype=np.uint8)
+
+
+def payload_digest(data: str) -> str:
+    r"""
+    Return the content hash of an (encoded) output payload, such as a base64-encoded image.
+
+    Usage:
+
+        >>> payload_digest("iVBORw0KGgo=")[:16]
+        '929e08d597feae56'
+    """
+    # SHA-256 est accéléré par le processeur sur la plupart des machines, et hashlib libère le GIL pendant le calcul.
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+IMAGE_CACHE_MAX_SIZE = 1 << 28 # Taille maximale (en octets) des images décodées gardées en mémoire.
+
+
+class ImageCache:
+    r"""
+    Bounded in-memory cache of decoded images, indexed by the hash of their encoded payload.
+
+    The same figure displayed in several outputs is thus decoded only once,
+    and its (read-only) array is shared. When the decoded images exceed
+    `max_size` bytes, the least recently used ones are forgotten.
+
+    Args:
+        max_size (int): the maximum size of the decoded images, in bytes.
+
+    Attributes:
+        hits (int): the number of images found already decoded.
+        misses (int): the number of images that had to be decoded.
+
+    Usage:
+
+        >>> cache = ImageCache()
+        >>> data = next(iter_png_data(load_ipynb("samples/images.ipynb")))
+        >>> cache.get(data) is cache.get(data)
+        True
+        >>> cache
+        <ImageCache: 1 images decoded for 2 requests (dedup ratio 50%)>
+    """
+    def __init__(self, max_size: int = IMAGE_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries = collections.OrderedDict() # (hash, taille) -> Future du tableau décodé, du moins récent au plus récent.
+        self._lock = threading.Lock()
+
+    @property
+    def dedup_ratio(self) -> float:
+        r"""The fraction of the requested images which did not have to be decoded."""
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def get(self, data: str, size=None) -> np.ndarray:
+        r"""Return the decoded image of a base64-encoded PNG payload (see `decode_png`), decoding it only if needed."""
+        key = (payload_digest(data), size)
+        with self._lock:
+            future = self._entries.get(key)
+            decode = future is None
+            if decode:
+                self.misses += 1
+                future = self._entries[key] = concurrent.futures.Future()
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        if not decode:
+            # Si un autre thread est en train de décoder cette image, on attend son résultat plutôt que de la décoder à nouveau.
+            return future.result()
+        try:
+            array = decode_png(data, size)
+        except BaseException as error:
+            with self._lock:
+                if self._entries.get(key) is future:
+                    del self._entries[key]
+            future.set_exception(error)
+            raise
+        array.flags.writeable = False # Le tableau est partagé : personne ne doit le modifier.
+        future.set_result(array)
+        with self._lock:
+            if self._entries.get(key) is future: # L'entrée a pu être oubliée pendant le décodage.
+                self.size += array.nbytes
+                self._evict()
+        return array
+
+    def _evict(self):
+        # On oublie les images les moins récemment utilisées (les entrées en cours de décodage ne comptent pas encore).
+        for key in list(self._entries):
+            if self.size <= self.max_size or len(self._entries) <= 1:
+                break
+            future = self._entries[key]
+            if future.done():
+                del self._entries[key]
+                self.size -= future.result().nbytes
+
+    def clear(self):
+        r"""Forget all the decoded images (the statistics are kept)."""
+        with self._lock:
+            self._entries = collections.OrderedDict()
+            self.size = 0
+
+    def __repr__(self):
+        return f"<ImageCache: {self.misses} images decoded for {self.hits + self.misses} requests (dedup ratio {self.dedup_ratio:.0%})>"
+
+
+default_image_cache = ImageCache()
+
+
+class LazyImage:
+    r"""
+    A PNG image of a notebook output, decoded (as a NumPy array) on first access.
+
+    Args:
+        data (str): the base64-encoded PNG image.
+        size (tuple): if given, the image is downscaled at decoding time to
+            fit in this (width, height) box, keeping its aspect ratio.
+        cache (ImageCache): the cache shared by identical images;
+            True for `default_image_cache`, None (or False) to always decode.
+
+    Usage:
+
+        >>> image = get_lazy_images(load_ipynb("samples/images.ipynb"), size=(128, 128))[0]
+        >>> image
+        <LazyImage (not decoded)>
+        >>> image.array.shape
+        (128, 109, 3)
+        >>> image
+        <LazyImage (decoded)>
+    """
+    def __init__(self, data: str, size=None, cache=True):
+        self.data = data
+        self.size = size
+        self.cache = default_image_cache if cache is True else cache or None
+        self._array = None
+        self._lock = threading.Lock() # Une image peut être demandée par plusieurs threads à la fois.
+
+    def decode(self) -> np.ndarray:
+        r"""Decode the image (only once) and return it as a NumPy array."""
+        with self._lock:
+            if self._array is None:
+                self._array = decode_png(self.data, self.size) if self.cache is None else self.cache.get(self.data, self.size)
+            return self._array
+
+    array = property(decode)
+
+    def export(self, directory: str) -> str:
+        r"""Write the image to a PNG file in `directory`, without decoding it (see `export_png`), and return its name."""
+        return export_png(self.data, directory)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.decode() if dtype is None else self.decode().astype(dtype)
+
+    def __repr__(self):
+        return f"<LazyImage ({'not ' if self._array is None else ''}decoded)>"
+
+
+def get_lazy_images(ipynb: dict, size=None, cache=True) -> list:
+    r"""
+    Return the PNG images contained in a notebook cells outputs
+    (as a list of LazyImage, which are only decoded when accessed).
+
+    Usage:
+
+        >>> images = get_lazy_images(load_ipynb("samples/images.ipynb"))
+        >>> images
+        [<LazyImage (not decoded)>]
+        >>> np.shape(images[0])
+        (600, 512, 3)
+    """
+    return [LazyImage(data, size, cache) for data in iter_png_data(ipynb)]
+
+
+def prefetch_images(images: list, workers=None) -> list:
+    r"""
+    Start decoding the given LazyImage instances in a pool of threads, and return them.
+
+    PIL releases the GIL while decoding, so the images are decoded in
+    parallel; accessing an image which is still being decoded waits for it.
+
+    Usage:
+
+        >>> images = prefetch_images(get_lazy_images(load_ipynb("samples/images.ipynb")))
+        >>> images[0].array.shape
+        (600, 512, 3)
+    """
+    executor = concurrent.futures.ThreadPoolExecutor(workers)
+    for image in images:
+        executor.submit(image.decode) # En cas d'erreur, elle sera levée à nouveau lors de l'accès à l'image.
+    executor.shutdown(wait=False) # Les décodages en attente sont tout de même effectués.
+    return images
+
+
+def get_images(ipynb: dict, size=None, workers=None, cache=None) -> list:
     r"""
     Return the PNG images contained in a notebook cells outputs
     (as a list of NumPy arrays).
 
+    The images are decoded in parallel by `workers` threads, and downscaled
+    to fit in the (width, height) `size` box if given. Identical images are
+    decoded once; each array belongs to the caller, unless an ImageCache is
+    given as `cache` (True for `default_image_cache`): the arrays are then
+    shared, read-only, with the other users of the cache (see `LazyImage`).
+    Use `get_lazy_images` when only some of the images are needed.
+
     Usage:
 
         >>> ipynb = load_ipynb("samples/images.ipynb")
@@ -411,15 +1767,87 @@ def get_images(ipynb: dict) -> list:
                 ...,
                 [ 14,  13,  19]]], dtype=uint8)
     """
-    # La donnée des images est stockées dans la cellule qui affiche l'image, dans "outputs" puis "data" puis "image/png". Elle est encodée en hexadécimal. Il s'agit donc de récupérer cette `string` d'hexadécimal et de la convertir. On se sert du module base64.
-    images = []
-    for cell in get_cells(ipynb):
-        if cell["cell_type"] == "code" :
-            for output in cell["outputs"]:
-                if "image/png" in output["data"]:
-                    # On a trouvé un image.
-                    imagestr = output["data"]["image/png"] # On la sauvegarde au format héxadécimal.
-                    image_PIL = PIL.Image.open(io.BytesIO(base64.b64decode(imagestr))) # Puis on crée l'image, avec le module PIL, en prenant soin de décoder l'hexadécimal (par le module base64).
-                    image_array = np.array(image_PIL, dtype=np.uint8) # On convertit notre PIL en array numpy.
-                    images.append(image_array) # Finalement on ajoute notre array à la liste.
-    return images
+    if cache:
+        images = prefetch_images(get_lazy_images(ipynb, size, cache), workers)
+        return [image.decode() for image in images]
+    # Sans cache, chaque image distincte est décodée une fois ; ses autres occurrences en sont des copies.
+    payloads = list(iter_png_data(ipynb))
+    images = {data: LazyImage(data, size, cache=None) for data in payloads}
+    prefetch_images(list(images.values()), workers)
+    arrays, seen = [], set()
+    for data in payloads:
+        array = images[data].decode()
+        arrays.append(array.copy() if data in seen else array)
+        seen.add(data)
+    return arrays
+
+
+def export_png(data: str, directory: str) -> str:
+    r"""
+    Write a base64-encoded PNG image to a file of `directory` named after its content, and return the file name.
+
+    The PNG file is the decoded base64 data: the image itself is neither
+    decoded nor encoded again. The name is the hash of the data (see
+    `payload_digest`), so a file which already exists holds the same image
+    and is not written again.
+
+    Usage:
+
+        >>> data = next(iter_png_data(load_ipynb("samples/images.ipynb")))
+        >>> with tempfile.TemporaryDirectory() as directory:
+        ...     filename = export_png(data, directory)
+        ...     os.path.basename(filename)[:16], PIL.Image.open(filename).size
+        ('8282eda51a935ae2', (512, 600))
+    """
+    filename = os.path.join(directory, payload_digest(data) + ".png")
+    _write_png(data, filename)
+    return filename
+
+
+def _write_png(data: str, filename: str):
+    if not os.path.exists(filename):
+        png = base64.b64decode(data)
+        with atomic_write(filename, "wb") as f: # Un fichier interrompu ne doit pas passer pour l'image complète.
+            f.write(png)
+
+
+def export_images(ipynb: dict, directory: str, workers=None) -> list:
+    r"""
+    Write the PNG images contained in a notebook cells outputs to files of `directory` (see `export_png`).
+
+    The images are written in parallel by `workers` threads, each one once
+    even if it is displayed several times; NumPy and PIL are not used (see
+    `get_lazy_images` to decode some images as arrays as well).
+
+    Returns:
+        list: the names of the PNG files, in the order of the images in the notebook.
+
+    Usage:
+
+        >>> ipynb = load_ipynb("samples/images.ipynb")
+        >>> ipynb["cells"] = ipynb["cells"] * 2
+        >>> with tempfile.TemporaryDirectory() as directory:
+        ...     filenames = export_images(ipynb, directory)
+        ...     len(filenames), len(os.listdir(directory))
+        (2, 1)
+    """
+    os.makedirs(directory, exist_ok=True)
+    filenames, seen, pending = [], set(), set()
+    limit = 2 * (workers or os.cpu_count() or 1) # Au plus deux images en attente d'écriture par thread.
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        # Les données sont parcourues au fil de l'eau : seuls les noms des fichiers sont conservés.
+        for data in iter_png_data(ipynb):
+            digest = payload_digest(data)
+            filename = os.path.join(directory, digest + ".png")
+            filenames.append(filename)
+            if digest in seen: # Les images identiques ne sont écrites qu'une fois.
+                continue
+            seen.add(digest)
+            if len(pending) >= limit:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    future.result() # Propage les erreurs d'écriture.
+            pending.add(executor.submit(_write_png, data, filename))
+        for future in concurrent.futures.as_completed(pending):
+            future.result()
+    return filenames
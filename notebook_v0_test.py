@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import json
 import os
+import tempfile
 import unittest
+from unittest.mock import patch
 import numpy as np
 
 from notebook_v0 import *
@@ -308,6 +311,436 @@ class Question8(unittest.TestCase):
         self.assertEqual((600, 512, 3), grace_hopper_image.shape)
         self.assertEqual(np.uint8, grace_hopper_image.dtype)
 
+class IterCells(unittest.TestCase):
+    def test_iter_cells_hello_world(self):
+        ipynb = load_ipynb("samples/hello-world.ipynb")
+        self.assertEqual(get_cells(ipynb), list(iter_cells("samples/hello-world.ipynb")))
+
+    def test_iter_cells_minimal(self):
+        self.assertEqual([], list(iter_cells("samples/minimal.ipynb")))
+
+    def test_iter_cells_small_chunks(self):
+        ipynb = load_ipynb("samples/errors.ipynb")
+        with open("samples/errors.ipynb", "rb") as f:
+            self.assertEqual(ipynb, JsonScanner(f, chunk_size=3).read_value())
+
+    def test_streamed_outputs(self):
+        self.assertEqual(
+            get_stream(load_ipynb("samples/streams.ipynb"), stderr=True),
+            get_stream(iter_cells("samples/streams.ipynb"), stderr=True),
+        )
+        errors = get_exceptions(iter_cells("samples/errors.ipynb"))
+        self.assertEqual(["TypeError", "Warning"], [error.ename for error in errors])
+        images = get_images(iter_cells("samples/images.ipynb"))
+        self.assertEqual((600, 512, 3), images[0].shape)
+
+class LoadHeader(unittest.TestCase):
+    def test_load_header_samples(self):
+        for filename in ["minimal", "hello-world", "metadata", "errors", "images"]:
+            ipynb = load_ipynb(f"samples/{filename}.ipynb")
+            del ipynb["cells"]
+            self.assertEqual(ipynb, load_header(f"samples/{filename}.ipynb"))
+
+    def test_load_header_unusual_layout(self):
+        ipynb = {
+            "metadata": {"tags": [["a", "]"], "b"], "x": {"y": []}},
+            "nbformat": 4,
+            "cells": load_ipynb("samples/hello-world.ipynb")["cells"],
+            "nbformat_minor": 5,
+        }
+        with open("samples/unusual-layout.ipynb", "w") as f:
+            json.dump(ipynb, f)
+        try:
+            header = load_header("samples/unusual-layout.ipynb")
+            self.assertEqual("4.5", get_format_version(header))
+            self.assertEqual(ipynb["metadata"], get_metadata(header))
+            self.assertNotIn("cells", header)
+        finally:
+            os.remove("samples/unusual-layout.ipynb")
+
+class ParseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_hits_and_misses(self):
+        ipynb = load_ipynb("samples/hello-world.ipynb", cache=False)
+        self.assertEqual(ipynb, load_ipynb("samples/hello-world.ipynb", cache=self.cache))
+        self.assertEqual(ipynb, load_ipynb("samples/hello-world.ipynb", cache=self.cache))
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_cached_copies_are_independent(self):
+        ipynb = load_ipynb("samples/hello-world.ipynb", cache=self.cache)
+        clear_outputs(ipynb)
+        ipynb = load_ipynb("samples/hello-world.ipynb", cache=self.cache)
+        self.assertEqual(1, ipynb["cells"][1]["execution_count"])
+
+    def test_modified_file(self):
+        ipynb = load_ipynb("samples/minimal.ipynb")
+        save_ipynb(ipynb, "samples/minimal-save-load.ipynb")
+        try:
+            self.assertEqual({}, load_ipynb("samples/minimal-save-load.ipynb", cache=self.cache)["metadata"])
+            os.remove("samples/minimal-save-load.ipynb")
+            ipynb["metadata"]["clone"] = True
+            save_ipynb(ipynb, "samples/minimal-save-load.ipynb")
+            self.assertEqual({"clone": True}, load_ipynb("samples/minimal-save-load.ipynb", cache=self.cache)["metadata"])
+            self.assertEqual(2, self.cache.misses)
+        finally:
+            os.remove("samples/minimal-save-load.ipynb")
+
+    def test_eviction(self):
+        cache = ParseCache(self.directory.name, max_size=1024)
+        for filename in ["minimal", "hello-world", "errors", "streams"]:
+            load_ipynb(f"samples/{filename}.ipynb", cache=cache)
+        size = sum(entry.stat().st_size for entry in os.scandir(self.directory.name))
+        self.assertLessEqual(size, 1024)
+        load_ipynb("samples/streams.ipynb", cache=cache)
+        self.assertEqual(1, cache.hits)
+
+    def test_directory_is_scanned_only_when_full(self):
+        with patch("os.scandir", wraps=os.scandir) as scandir:
+            for filename in ["minimal", "hello-world", "errors", "streams"]:
+                load_ipynb(f"samples/{filename}.ipynb", cache=self.cache)
+        self.assertEqual(1, scandir.call_count)
+        cache = ParseCache(os.path.join(self.directory.name, "small"), max_size=1024)
+        with patch("os.scandir", wraps=os.scandir) as scandir:
+            for filename in ["minimal", "hello-world", "errors", "streams"]:
+                load_ipynb(f"samples/{filename}.ipynb", cache=cache)
+        self.assertLess(1, scandir.call_count)
+
+    def test_unusable_directory(self):
+        cache = ParseCache("/dev/null/cache")
+        self.assertEqual(load_ipynb("samples/hello-world.ipynb", cache=False), load_ipynb("samples/hello-world.ipynb", cache=cache))
+        self.assertEqual(1, cache.misses)
+
+    def test_default_cache(self):
+        with patch.dict(os.environ, {"NOTEBOOK_CACHE_DIR": self.directory.name}):
+            self.assertEqual(self.directory.name, get_default_cache().directory)
+            load_ipynb("samples/hello-world.ipynb")
+            self.assertEqual(1, get_default_cache().misses)
+        with patch.dict(os.environ, {"NOTEBOOK_CACHE_DIR": "/dev/null/cache"}):
+            self.assertEqual(load_ipynb("samples/hello-world.ipynb", cache=False), load_ipynb("samples/hello-world.ipynb"))
+        with patch.dict(os.environ):
+            os.environ.pop("NOTEBOOK_CACHE_DIR", None)
+            self.assertIsNone(get_default_cache())
+
+class JsonBackends(unittest.TestCase):
+    def test_backend_selection(self):
+        self.assertEqual("json", get_json_backend("json").name)
+        with patch.dict(os.environ, {"NOTEBOOK_JSON_BACKEND": "json"}):
+            self.assertEqual("json", get_json_backend().name)
+        with self.assertRaises(ValueError):
+            get_json_backend("no-such-backend")
+
+    def test_standard_library_by_default(self):
+        with patch.dict(os.environ, {"NOTEBOOK_JSON_BACKEND": ""}):
+            self.assertEqual("json", get_json_backend().name)
+
+    def test_backends_load(self):
+        expected = load_ipynb("samples/errors.ipynb", cache=False, backend="json")
+        for name in JSON_BACKENDS:
+            self.assertEqual(expected, load_ipynb("samples/errors.ipynb", cache=False, backend=name))
+
+    def test_backends_accept_what_json_accepts(self):
+        text = b'{"cells": [], "metadata": {"loss": NaN, "seed": 123456789012345678901234567890}}'
+        for name in JSON_BACKENDS:
+            ipynb = get_json_backend(name).loads(text)
+            self.assertNotEqual(ipynb["metadata"]["loss"], ipynb["metadata"]["loss"])
+            self.assertEqual(123456789012345678901234567890, ipynb["metadata"]["seed"])
+        with self.assertRaises(ValueError):
+            get_json_backend("json").loads(b'{"cells": ')
+
+    def test_save(self):
+        expected = load_ipynb("samples/errors.ipynb", cache=False)
+        save_ipynb(expected, "samples/errors-save-load.ipynb")
+        try:
+            with open("samples/errors-save-load.ipynb", "rb") as f:
+                self.assertEqual(json.dumps(expected).encode(), f.read())
+        finally:
+            os.remove("samples/errors-save-load.ipynb")
+
+class StreamingSave(unittest.TestCase):
+    def test_save_cell_iterator(self):
+        def markdown_only():
+            for cell in iter_cells("samples/hello-world.ipynb"):
+                if cell["cell_type"] == "markdown":
+                    yield cell
+        ipynb = {"cells": markdown_only(), **load_header("samples/hello-world.ipynb")}
+        save_ipynb(ipynb, "samples/hello-world-save-load.ipynb")
+        try:
+            saved = load_ipynb("samples/hello-world-save-load.ipynb", cache=False)
+            self.assertEqual(["a9541506", "a23ab5ac"], [cell["id"] for cell in saved["cells"]])
+            self.assertEqual("4.5", get_format_version(saved))
+        finally:
+            os.remove("samples/hello-world-save-load.ipynb")
+
+    def test_save_is_atomic(self):
+        def failing_cells():
+            yield from iter_cells("samples/hello-world.ipynb")
+            raise RuntimeError("crash")
+        save_ipynb(load_ipynb("samples/minimal.ipynb"), "samples/minimal-save-load.ipynb")
+        try:
+            with self.assertRaises(RuntimeError):
+                save_ipynb({"cells": failing_cells(), "nbformat": 4}, "samples/minimal-save-load.ipynb")
+            self.assertEqual(load_ipynb("samples/minimal.ipynb"), load_ipynb("samples/minimal-save-load.ipynb", cache=False))
+            self.assertEqual([], [name for name in os.listdir("samples") if name.endswith(".tmp")])
+        finally:
+            os.remove("samples/minimal-save-load.ipynb")
+
+    def test_permissions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "minimal.ipynb")
+            umask = os.umask(0o027)
+            try:
+                save_ipynb(load_ipynb("samples/minimal.ipynb"), filename)
+            finally:
+                os.umask(umask)
+            self.assertEqual(0o640, os.stat(filename).st_mode & 0o777)
+            os.chmod(filename, 0o600)
+            save_ipynb(load_ipynb("samples/minimal.ipynb"), filename)
+            self.assertEqual(0o600, os.stat(filename).st_mode & 0o777)
+
+class LazyImages(unittest.TestCase):
+    def test_lazy_images(self):
+        ipynb = load_ipynb("samples/images.ipynb")
+        images = get_lazy_images(ipynb)
+        self.assertEqual(1, len(images))
+        self.assertIsNone(images[0]._array)
+        np.testing.assert_array_equal(get_images(ipynb)[0], images[0].array)
+        self.assertIs(images[0].array, images[0].decode())
+
+    def test_prefetch_and_thumbnail(self):
+        ipynb = load_ipynb("samples/images.ipynb")
+        images = prefetch_images(get_lazy_images(ipynb, size=(64, 64)), workers=2)
+        self.assertEqual((64, 55, 3), images[0].array.shape)
+        self.assertEqual((64, 55, 3), get_images(ipynb, size=(64, 64), workers=1)[0].shape)
+
+    def test_outputs_without_data(self):
+        self.assertEqual([], get_images(load_ipynb("samples/streams.ipynb")))
+
+
+class ImageDedup(unittest.TestCase):
+    def setUp(self):
+        self.ipynb = load_ipynb("samples/images.ipynb")
+        # Le même graphique affiché trois fois.
+        self.ipynb["cells"] = self.ipynb["cells"] * 3
+
+    def test_identical_images_are_decoded_once(self):
+        cache = ImageCache()
+        images = get_images(self.ipynb, workers=2, cache=cache)
+        self.assertEqual(3, len(images))
+        self.assertIs(images[0], images[1])
+        self.assertIs(images[0], images[2])
+        self.assertFalse(images[0].flags.writeable)
+        self.assertEqual((2, 1), (cache.hits, cache.misses))
+        self.assertAlmostEqual(2 / 3, cache.dedup_ratio)
+        self.assertEqual(images[0].nbytes, cache.size)
+
+    def test_sizes_are_cached_separately(self):
+        cache = ImageCache()
+        thumbnail = get_images(self.ipynb, size=(64, 64), cache=cache)[0]
+        self.assertEqual((64, 55, 3), thumbnail.shape)
+        self.assertEqual((600, 512, 3), get_images(self.ipynb, cache=cache)[0].shape)
+        self.assertEqual(2, cache.misses)
+
+    def test_bounded(self):
+        cache = ImageCache(max_size=1)
+        data = next(iter_png_data(self.ipynb))
+        cache.get(data, (64, 64))
+        cache.get(data, (32, 32))
+        self.assertEqual(1, len(cache._entries))
+        cache.get(data, (64, 64))
+        self.assertEqual(3, cache.misses)
+
+    def test_without_cache(self):
+        images = get_images(self.ipynb, cache=None)
+        self.assertIsNot(images[0], images[1])
+        np.testing.assert_array_equal(images[0], images[1])
+
+    def test_private_arrays_by_default(self):
+        requests = default_image_cache.hits + default_image_cache.misses
+        images = get_images(self.ipynb, workers=2)
+        images[0][0, 0] = 0
+        images[1][0, 0] = 255
+        self.assertEqual(0, images[0][0, 0, 0])
+        self.assertEqual(requests, default_image_cache.hits + default_image_cache.misses)
+        self.assertFalse(get_images(self.ipynb, cache=True)[0].flags.writeable)
+
+
+class ImageExport(unittest.TestCase):
+    def setUp(self):
+        self.ipynb = load_ipynb("samples/images.ipynb")
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_files_are_the_png_data(self):
+        with patch("PIL.Image.open", side_effect=AssertionError("decoded")):
+            filenames = export_images(self.ipynb, self.directory.name, workers=2)
+        data = next(iter_png_data(self.ipynb))
+        with open(filenames[0], "rb") as f:
+            self.assertEqual(base64.b64decode(data), f.read())
+        np.testing.assert_array_equal(get_images(self.ipynb)[0], np.array(PIL.Image.open(filenames[0])))
+        self.assertEqual(filenames[0], get_lazy_images(self.ipynb)[0].export(self.directory.name))
+
+    def test_identical_images_are_written_once(self):
+        self.ipynb["cells"] = self.ipynb["cells"] * 3
+        filenames = export_images(self.ipynb, self.directory.name)
+        self.assertEqual(3, len(filenames))
+        self.assertEqual([os.path.basename(filenames[0])], os.listdir(self.directory.name))
+        os.utime(filenames[0], (0, 0))
+        self.assertEqual(filenames, export_images(self.ipynb, self.directory.name))
+        self.assertEqual(0, os.stat(filenames[0]).st_mtime)
+
+    def test_many_distinct_images(self):
+        payloads = [base64.b64encode(f"image {index}".encode()).decode() for index in range(50)]
+        with patch("notebook_v0.iter_png_data", return_value=iter(payloads + payloads[:5])):
+            filenames = export_images(self.ipynb, self.directory.name, workers=2)
+        self.assertEqual(filenames[:5], filenames[50:])
+        self.assertEqual(50, len(os.listdir(self.directory.name)))
+        for index, filename in enumerate(filenames[:50]):
+            with open(filename, "rb") as f:
+                self.assertEqual(f"image {index}".encode(), f.read())
+
+    def test_notebooks_without_images(self):
+        self.assertEqual([], export_images(load_ipynb("samples/streams.ipynb"), self.directory.name))
+
+
+class Emitters(unittest.TestCase):
+    def test_write_to_file(self):
+        ipynb = load_ipynb("samples/hello-world.ipynb")
+        for convert in [to_percent, to_starboard]:
+            with tempfile.TemporaryFile("w+", encoding="utf-8") as f:
+                self.assertIsNone(convert(ipynb, file=f))
+                f.seek(0)
+                self.assertEqual(convert(ipynb), f.read())
+
+    def test_streamed_cells(self):
+        filename = "samples/hello-world-markdown.ipynb"
+        ipynb = load_ipynb(filename)
+        self.assertEqual(to_percent(ipynb), "".join(iter_percent(iter_cells(filename))))
+        self.assertEqual(to_starboard(ipynb), "".join(iter_starboard(iter_cells(filename))))
+
+    def test_empty_notebook(self):
+        ipynb = load_ipynb("samples/minimal.ipynb")
+        self.assertEqual("", to_percent(ipynb))
+        self.assertEqual([], list(iter_starboard(ipynb)))
+
+
+class StarboardHtml(unittest.TestCase):
+    def test_quotes_like_repr(self):
+        for text in ["print('Hello')", 'print("Hello")', "print('\"')", "\\ \t \x00 é 👋", ""]:
+            ipynb = {"cells": [{"cell_type": "code", "source": [text, "\n", "'"]}]}
+            self.assertEqual(starboard_html(to_starboard(ipynb)), to_starboard(ipynb, html=True))
+            ipynb["cells"][0]["source"].pop()
+            self.assertEqual(starboard_html(to_starboard(ipynb)), to_starboard(ipynb, html=True))
+
+    def test_stream_to_file(self):
+        ipynb = load_ipynb("samples/hello-world.ipynb")
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as f:
+            default_starboard_template.render(iter_cells("samples/hello-world.ipynb"), f)
+            f.seek(0)
+            self.assertEqual(to_starboard(ipynb, html=True), f.read())
+
+    def test_render_files(self):
+        template = StarboardTemplate(lambda code: f"<script>{code!r}</script>")
+        with tempfile.TemporaryDirectory() as directory:
+            jobs = [(f"samples/{name}.ipynb", os.path.join(directory, f"{name}.html")) for name in ["minimal", "hello-world"]]
+            self.assertEqual(2, template.render_files(jobs))
+            with open(jobs[0][1], encoding="utf-8") as f:
+                self.assertEqual("<script>''</script>", f.read())
+
+
+class OutputTables(unittest.TestCase):
+    def test_columns(self):
+        ipynb = {"cells": [
+            {"cell_type": "markdown", "source": []},
+            {"cell_type": "code", "outputs": [
+                {"output_type": "stream", "name": "stdout", "text": ["a\n", "b"]},
+                {"output_type": "execute_result", "data": {"text/plain": ["1"], "application/json": {"x": 1}}},
+            ]},
+            {"cell_type": "code", "outputs": [{"output_type": "error", "ename": "E", "evalue": "v", "traceback": ["t1", "t2"]}]},
+        ]}
+        table = OutputTable(ipynb)
+        self.assertEqual(6, len(table))
+        self.assertEqual([1, 1, 1, 2, 2, 2], table.cell.tolist())
+        self.assertEqual([0, 1, 1, 2, 2, 2], table.output.tolist())
+        self.assertEqual(["stream", "execute_result", "error"], table.output_types)
+        self.assertEqual([0, -1, -1, -1, -1, -1], table.name.tolist())
+        self.assertEqual(["a\nb", "1", '{"x": 1}', "E", "v", "t1\nt2"], table.payloads(np.arange(6)))
+        self.assertEqual([3], table.select(output_type="error", mime="ename").tolist())
+        self.assertEqual([], table.select(mime="image/png").tolist())
+        self.assertEqual([], table.select(name=[]).tolist())
+        self.assertEqual(["E", "v"], OutputTable(ipynb, ["ename", "evalue"]).payloads(np.arange(2)))
+        self.assertEqual([-1, -1, -1, 4, -1, -1], table.evalue.tolist())
+
+    def test_exceptions_without_evalues(self):
+        table = OutputTable(load_ipynb("samples/errors.ipynb"), ["traceback", "ename"])
+        self.assertEqual(["TypeError('')", "Warning('')"], [repr(error) for error in get_exceptions(table)])
+
+    def test_many_categories(self):
+        outputs = [{"output_type": f"type{index}", "name": f"name{index}", "data": {}} for index in range(300)]
+        outputs += [{"output_type": "stream", "name": "stdout", "text": "x"}]
+        table = OutputTable({"cells": [{"cell_type": "code", "outputs": outputs}]})
+        self.assertEqual([300], table.output_type.tolist())
+        self.assertEqual(["x"], table.payloads(table.select(output_type="stream", name="stdout")))
+
+    def test_png_data_is_streamed(self):
+        cells = load_ipynb("samples/images.ipynb")["cells"]
+        def streamed():
+            yield from cells
+            raise AssertionError("read past the first image")
+        self.assertEqual(next(iter_png_data(cells)), next(iter_png_data(streamed())))
+
+    def test_no_table_for_dicts(self):
+        ipynb = load_ipynb("samples/errors.ipynb")
+        with patch.object(OutputTable, "__init__", side_effect=AssertionError("table built")):
+            self.assertEqual(["TypeError", "Warning"], [error.ename for error in get_exceptions(ipynb)])
+            self.assertEqual("", get_stream(ipynb, stderr=True))
+            self.assertEqual([], list(iter_png_data(ipynb)))
+
+    def test_queries_on_samples(self):
+        for name in ["errors", "hello-world", "images", "metadata", "minimal", "streams"]:
+            ipynb = load_ipynb(f"samples/{name}.ipynb")
+            table = output_table(ipynb)
+            self.assertIs(table, output_table(table))
+            self.assertEqual(get_stream(ipynb, stderr=True), get_stream(table, stderr=True))
+            self.assertEqual(get_stream(iter_cells(f"samples/{name}.ipynb")), get_stream(table))
+            self.assertEqual([repr(error) for error in get_exceptions(ipynb)], [repr(error) for error in get_exceptions(table)])
+            self.assertEqual(list(iter_png_data(ipynb)), list(iter_png_data(table)))
+
+
+class StreamingStreams(unittest.TestCase):
+    def setUp(self):
+        outputs = [
+            {"output_type": "stream", "name": "stdout", "text": ["a\n", "b", "c\nd\n"]},
+            {"output_type": "stream", "name": "stderr", "text": "oops\n"},
+            {"output_type": "stream", "name": "stdout", "text": ["e\n", "", "f"]},
+        ]
+        self.ipynb = {"cells": [{"cell_type": "code", "id": "c0ffee00", "outputs": outputs[:2]}, {"cell_type": "code", "outputs": outputs[2:]}]}
+
+    def test_iter_stream(self):
+        self.assertEqual(
+            [("c0ffee00", "stdout", "a\n"), ("c0ffee00", "stdout", "b"), ("c0ffee00", "stdout", "c\nd\n"),
+             ("c0ffee00", "stderr", "oops\n"), ("00000001", "stdout", "e\n"), ("00000001", "stdout", ""), ("00000001", "stdout", "f")],
+            list(iter_stream(self.ipynb, stderr=True)),
+        )
+        for stdout, stderr in [(True, False), (False, True), (True, True), (False, False)]:
+            text = "".join(chunk for _, _, chunk in iter_stream(self.ipynb, stdout, stderr))
+            self.assertEqual(get_stream(self.ipynb, stdout, stderr), text)
+
+    def test_tail(self):
+        text = get_stream(self.ipynb, stderr=True)
+        for lines in range(8):
+            expected = "".join(text.splitlines(keepends=True)[-lines:] if lines else [])
+            self.assertEqual(expected, get_stream(self.ipynb, stderr=True, tail=lines))
+            self.assertEqual(expected, get_stream(OutputTable(self.ipynb), stderr=True, tail=lines))
+        self.assertEqual("👋 Hello world! 🌍\n", get_stream(iter_cells("samples/streams.ipynb"), tail=5))
+
 
 if __name__ == "__main__":
     unittest.main()
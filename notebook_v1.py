@@ -3,6 +3,9 @@
 
 import notebook_v0 as n0
 import json
+import weakref
+from array import array
+from bisect import bisect_left
 
 """
 an object-oriented version of the notebook toolbox
@@ -17,11 +20,33 @@ class Cell:
     Attributes:
         id (int): the cell's id.
         source (list): the cell's source code, as a list of str.
+        revision (int): the modification counter of the cell, incremented
+            each time one of its attributes is set (see `touch`).
     """
     # On suit les exigences de la docstring.
     def __init__(self, ipynb: dict):
         self.id = ipynb["id"]
         self.source = ipynb["source"]
+
+    def __setattr__(self, name, value):
+        # Toute affectation d'un attribut incrémente le compteur de modifications (utilisé par `Serializer`).
+        super().__setattr__(name, value)
+        if name != "revision":
+            super().__setattr__("revision", getattr(self, "revision", 0) + 1)
+
+    def touch(self):
+        r"""Marks the cell as modified, after an in-place change such as `cell.source.append(...)`.
+
+        Usage:
+
+            >>> cell = MarkdownCell({"id": "a9541506", "source": ["Hello world!"]})
+            >>> revision = cell.revision
+            >>> cell.source.append("Goodbye!")
+            >>> cell.touch()
+            >>> cell.revision == revision + 1
+            True
+        """
+        self.revision += 1
         
 
 class CodeCell(Cell): 
@@ -87,6 +112,216 @@ class MarkdownCell(Cell):
     def __init__(self, ipynb: dict):
         super().__init__(ipynb)
 
+class CellIndex:
+    r"""The indexes of a sequence of cells: by id, by type and by execution count.
+
+    A CellIndex is built once from the cells, which are neither copied nor
+    changed; it does not follow their later changes (see `IndexedCells`).
+
+    Usage:
+
+        >>> index = CellIndex(Notebook.from_file("samples/hello-world.ipynb"))
+        >>> index.by_id("a23ab5ac").source, index.positions(Cell)
+        (['Goodbye! 👋'], array('i', [0, 1, 2]))
+    """
+    def __init__(self, cells=()):
+        # Les index : identifiant -> cellule, type -> positions (triées), numéro d'exécution -> cellules.
+        self.ids, self.types, self.counts = {}, {}, {}
+        for position, cell in enumerate(cells): # Les positions sont ajoutées dans l'ordre : elles restent triées.
+            self.ids[cell.id] = cell
+            self.types.setdefault(type(cell), array("i")).append(position)
+            count = getattr(cell, "execution_count", None)
+            if count is not None:
+                self.counts.setdefault(count, []).append(cell)
+
+    def add(self, position: int, cell: Cell, shift: bool = True):
+        r"""Indexes a cell inserted at `position` (the following ones being shifted, if `shift`)."""
+        ids, types, counts = self.ids, self.types, self.counts
+        if shift: # Les cellules suivantes sont décalées d'une position.
+            for positions in types.values():
+                start = bisect_left(positions, position)
+                if start < len(positions):
+                    positions[start:] = array("i", [p + 1 for p in positions[start:]])
+        positions = types.setdefault(type(cell), array("i"))
+        positions.insert(bisect_left(positions, position), position)
+        ids[cell.id] = cell
+        count = getattr(cell, "execution_count", None)
+        if count is not None:
+            counts.setdefault(count, []).append(cell)
+
+    def discard(self, position: int, cell: Cell, shift: bool = True):
+        r"""Unindexes the cell removed from `position` (the following ones being shifted, if `shift`)."""
+        ids, types, counts = self.ids, self.types, self.counts
+        positions = types[type(cell)]
+        del positions[bisect_left(positions, position)]
+        if shift:
+            for positions in types.values():
+                start = bisect_left(positions, position)
+                if start < len(positions):
+                    positions[start:] = array("i", [p - 1 for p in positions[start:]])
+        if ids.get(cell.id) is cell:
+            del ids[cell.id]
+        cells = counts.get(getattr(cell, "execution_count", None))
+        if cells is not None:
+            cells.remove(cell)
+            if not cells:
+                del counts[cell.execution_count]
+
+    def by_id(self, cell_id: str) -> Cell:
+        r"""Returns the cell with the given id.
+
+        Raises:
+            KeyError: if there is no such cell.
+        """
+        return self.ids[cell_id]
+
+    def positions(self, cell_type: type) -> array:
+        r"""Returns the (sorted) positions of the cells of the given type (or of its subclasses)."""
+        if cell_type in self.types:
+            return array("i", self.types[cell_type])
+        return array("i", sorted(p for t, positions in self.types.items() if issubclass(t, cell_type) for p in positions))
+
+    def by_execution_count(self, execution_count: int) -> list:
+        r"""Returns the cells with the given execution count (in no particular order)."""
+        return list(self.counts.get(execution_count, ()))
+
+class IndexedCells(list):
+    r"""A list of cells, with indexes by id, by type and by execution count (see `CellIndex`).
+
+    The indexes are built on the first lookup, then updated on each insertion,
+    replacement or removal of a single cell (`append`, `insert`, `pop`, ...);
+    they are rebuilt on the next lookup after a bulk change (slice assignment,
+    `sort`, ...). Call `reindex` after changing the id or the execution count
+    of a cell in place.
+
+    Usage:
+
+        >>> cells = IndexedCells(Notebook.from_file("samples/hello-world.ipynb"))
+        >>> cells.by_id("b777420a").source
+        ['print("Hello world!")']
+        >>> cells.positions(MarkdownCell)
+        array('i', [0, 2])
+        >>> cells.insert(0, CodeCell({"id": "c0ffee00", "source": [], "execution_count": 1}))
+        >>> cells.positions(MarkdownCell), [cell.id for cell in cells.by_execution_count(1)]
+        (array('i', [1, 3]), ['b777420a', 'c0ffee00'])
+    """
+    _index = _views = None # Aussi pour les copies, dont les cellules sont ajoutées avant l'état (voir `pickle`).
+
+    def __getstate__(self):
+        return {"_index": None, "_views": None} # Les index et les vues ne suivent pas les copies.
+
+    def register_view(self, view):
+        r"""Registers a view of the cells (see `notebook_v2.Notebook.view`), whose `detach` method is called before the next modification."""
+        if self._views is None:
+            self._views = weakref.WeakSet()
+        self._views.add(view)
+
+    def _changing(self):
+        # Les vues qui désignent des cellules par leur position en font une copie avant que les positions ne changent.
+        if self._views:
+            views, self._views = list(self._views), None
+            for view in views:
+                view.detach()
+
+    def _indexes(self) -> "CellIndex":
+        if self._index is None:
+            self._index = CellIndex(self)
+        return self._index
+
+    def reindex(self):
+        r"""Drops the indexes, which are rebuilt on the next lookup."""
+        self._index = None
+
+    def by_id(self, cell_id: str) -> Cell:
+        r"""Returns the cell with the given id.
+
+        Raises:
+            KeyError: if there is no such cell.
+        """
+        return self._indexes().by_id(cell_id)
+
+    def positions(self, cell_type: type) -> array:
+        r"""Returns the (sorted) positions of the cells of the given type (or of its subclasses)."""
+        return self._indexes().positions(cell_type)
+
+    def by_execution_count(self, execution_count: int) -> list:
+        r"""Returns the cells with the given execution count (in no particular order)."""
+        return self._indexes().by_execution_count(execution_count)
+
+    def append(self, cell: Cell):
+        self._changing()
+        super().append(cell)
+        if self._index is not None:
+            self._index.add(len(self) - 1, cell, shift=False)
+
+    def extend(self, cells):
+        self._changing()
+        if self._index is None:
+            return super().extend(cells)
+        for cell in cells:
+            self.append(cell)
+
+    def __iadd__(self, cells):
+        self.extend(cells)
+        return self
+
+    def insert(self, index: int, cell: Cell):
+        self._changing()
+        position = min(max(index + len(self) if index < 0 else index, 0), len(self))
+        super().insert(position, cell)
+        if self._index is not None:
+            self._index.add(position, cell)
+
+    def pop(self, index: int = -1) -> Cell:
+        self._changing()
+        position = index + len(self) if index < 0 else index
+        cell = super().pop(index)
+        if self._index is not None:
+            self._index.discard(position, cell)
+        return cell
+
+    def remove(self, cell: Cell):
+        self.pop(self.index(cell))
+
+    def __setitem__(self, index, value):
+        self._changing()
+        if isinstance(index, slice) or self._index is None:
+            self._index = None
+            return super().__setitem__(index, value)
+        position = index + len(self) if index < 0 else index
+        cell = self[position]
+        super().__setitem__(position, value)
+        self._index.discard(position, cell, shift=False)
+        self._index.add(position, value, shift=False)
+
+    def __delitem__(self, index):
+        self._changing()
+        if isinstance(index, slice):
+            self._index = None
+            return super().__delitem__(index)
+        self.pop(index)
+
+    # Les autres modifications en bloc reconstruiront les index à la prochaine recherche.
+    def clear(self):
+        self._changing()
+        self._index = None
+        super().clear()
+
+    def sort(self, *args, **kwargs):
+        self._changing()
+        self._index = None
+        super().sort(*args, **kwargs)
+
+    def reverse(self):
+        self._changing()
+        self._index = None
+        super().reverse()
+
+    def __imul__(self, n):
+        self._changing()
+        self._index = None
+        return super().__imul__(n)
+
 class Notebook:
     r"""A Jupyter Notebook.
 
@@ -95,7 +330,7 @@ class Notebook:
 
     Attributes:
         version (str): the version of the notebook format.
-        cells (list): a list of cells (either CodeCell or MarkdownCell).
+        cells (IndexedCells): a list of cells (either CodeCell or MarkdownCell).
 
     Usage:
 
@@ -117,8 +352,8 @@ class Notebook:
     """
     def __init__(self, ipynb: dict):
         self.version = n0.get_format_version(ipynb) # On récupère la version à partir du `dict`, grâce à la fonction développée dans le notebook v0.
-        self.cells = [MarkdownCell(cell) if cell['cell_type'] == 'markdown' else CodeCell(cell) for cell in n0.get_cells(ipynb)]
-        # Il s'agit ici de créer une `list` de `Cell`.
+        self.cells = IndexedCells(MarkdownCell(cell) if cell['cell_type'] == 'markdown' else CodeCell(cell) for cell in n0.get_cells(ipynb))
+        # Il s'agit ici de créer une `list` de `Cell` (indexée, voir `IndexedCells`).
 
     @staticmethod
     def from_file(filename):
@@ -148,6 +383,24 @@ class Notebook:
         # On itère les cellules.
         return iter(self.cells)
 
+    def by_id(self, cell_id: str) -> Cell:
+        r"""Returns the cell with the given id (see `IndexedCells`).
+
+        Usage:
+
+            >>> Notebook.from_file("samples/hello-world.ipynb").by_id("a23ab5ac").source
+            ['Goodbye! 👋']
+        """
+        return self.cells.by_id(cell_id)
+
+    def positions(self, cell_type: type) -> array:
+        r"""Returns the positions of the cells of the given type (see `IndexedCells`)."""
+        return self.cells.positions(cell_type)
+
+    def by_execution_count(self, execution_count: int) -> list:
+        r"""Returns the code cells with the given execution count (see `IndexedCells`)."""
+        return self.cells.by_execution_count(execution_count)
+
 class PyPercentSerializer:
     r"""Prints a given Notebook in py-percent format.
 
@@ -172,21 +425,31 @@ class PyPercentSerializer:
     def __init__(self, notebook: Notebook):
         self.notebook = notebook
 
-    def to_py_percent(self) -> str:
-        r"""Converts the notebook to a string in py-percent format.
+    def iter_py_percent(self):
+        r"""Iterates the chunks of text of the notebook in py-percent format (see `to_py_percent`).
+
+        Usage:
+
+                >>> nb = Notebook.from_file("samples/hello-world.ipynb")
+                >>> list(PyPercentSerializer(nb).iter_py_percent())[:2]
+                ['# %% [markdown]\n# ', 'Hello world!\n']
         """
         # L'idée de cette fonction est la même que celle du notebook v0. La différence réside dans le fait qu'on ne va pas chercher les informations au même endroit.
-        text = ""
-        for cell in self.notebook:
+        for index, cell in enumerate(self.notebook):
+            if index:
+                yield "\n\n" # Les cellules sont séparées par deux sauts de ligne, qui ne terminent pas la dernière d'entre elles.
             if isinstance(cell, MarkdownCell): # Le type de cellule (code ou markdown) n'est plus dans le dictionnaire `ipynb`, mais est contenu dans le `type` de la cellule.
-                text += "# %% [markdown]\n# "
-                text += '# '.join(cell.source) # Le contenu de la cellule n'est plus non plus dans le dictionnaire, mais en argument de la `cell:Cell`.
-                text += "\n\n"
+                yield "# %% [markdown]\n# "
+                for line_index, line in enumerate(cell.source): # Le contenu de la cellule n'est plus non plus dans le dictionnaire, mais en argument de la `cell:Cell`.
+                    yield "# " + line if line_index else line
             if isinstance(cell, CodeCell):
-                text += "# %%\n"
-                text += ''.join(cell.source) 
-                text += "\n\n"
-        return text[:-2] # On supprime les deux derniers sauts de ligne pour satisfaire la convention.
+                yield "# %%\n"
+                yield from cell.source
+
+    def to_py_percent(self) -> str:
+        r"""Converts the notebook to a string in py-percent format.
+        """
+        return "".join(self.iter_py_percent())
 
     def to_file(self, filename):
         r"""Serializes the notebook to a file
@@ -200,9 +463,9 @@ class PyPercentSerializer:
                 >>> s = PyPercentSerializer(nb)
                 >>> s.to_file("samples/hello-world-serialized-py-percent.py")
         """
-        # Il s'agit de l'écriture classique d'un fichier.
+        # Il s'agit de l'écriture classique d'un fichier, morceau par morceau.
         with open(filename, 'a') as f:
-            f.write(self.to_py_percent())
+            f.writelines(self.iter_py_percent())
 
 class Serializer:
     r"""Serializes a Jupyter Notebook to a file.
@@ -235,14 +498,55 @@ class Serializer:
             'nbformat': 4,
             'nbformat_minor': 5}
         >>> s.to_file("samples/hello-world-serialized.ipynb")
+
+    The serialized cells are cached: serializing the notebook again only
+    rebuilds the cells which were modified since (see `Cell.revision`), and
+    `reused` and `rebuilt` report which cells were in each case.
+
+        >>> nb.cells[1].execution_count = 2
+        >>> text = s.dumps()
+        >>> s.reused, s.rebuilt
+        (['a9541506', 'a23ab5ac'], ['b777420a'])
+        >>> text == json.dumps(s.serialize())
+        True
     """
 
     def __init__(self, notebook: Notebook):
         self.notebook = notebook
+        self.reused = [] # Identifiants des cellules reprises du cache lors de la dernière sérialisation.
+        self.rebuilt = [] # Identifiants des cellules (re)construites lors de la dernière sérialisation.
+        self._fragments = {} # id(cellule) -> [cellule, révision, dict, texte JSON ou None]
+
+    def _fragment(self, cell: Cell, fragments: dict) -> list:
+        # On reprend la cellule sérialisée si elle n'a pas été modifiée depuis (et n'a pas été remplacée par une autre au même id()).
+        fragment = self._fragments.get(id(cell))
+        if fragment is not None and fragment[0] is cell and fragment[1] == cell.revision:
+            self.reused.append(cell.id)
+        else:
+            cell_notebook = {} # Cellule vide à ajouter.
+            cell_notebook['cell_type'] = 'code' if isinstance(cell, CodeCell) else 'markdown' # On récupère le type de la cellule.
+            if isinstance(cell, CodeCell):
+                cell_notebook['execution_count'] = cell.execution_count # On rajoute la spécificité des cellules de code.
+            cell_notebook['id'] = cell.id # Puis l'indice, stocké comme argument de la `Cell`.
+            cell_notebook['metadata'] = {} # On ajoute des metadata vides.
+            cell_notebook['source'] = cell.source # On récupère la source, stockée en argument.
+            fragment = [cell, cell.revision, cell_notebook, None]
+            self.rebuilt.append(cell.id)
+        fragments[id(cell)] = fragment
+        return fragment
+
+    def _cells(self):
+        # Parcourt les cellules sérialisées, puis oublie celles qui ne sont plus dans le notebook.
+        self.reused, self.rebuilt, fragments = [], [], {}
+        for cell in self.notebook:
+            yield self._fragment(cell, fragments)
+        self._fragments = fragments
 
     def serialize(self) -> dict:
         r"""Serializes the notebook to a JSON object
 
+        The cell dictionaries are shared with the cache of the serializer: they should not be modified.
+
         Returns:
             dict: a dictionary representing the notebook.
         """
@@ -253,21 +557,27 @@ class Serializer:
             'nbformat' : None,
             'nbformat_minor' : None}
         # Remplissons la clef `cells` en parcourant les `Cells` du `Notebook`.
-        for cell in self.notebook:
-            cell_notebook = {} # Cellule vide à ajouter.
-            cell_notebook['cell_type'] = 'code' if isinstance(cell, CodeCell) else 'markdown' # On récupère le type de la cellule.
-            if isinstance(cell, CodeCell):
-                cell_notebook['execution_count'] = cell.execution_count # On rajoute la spécificité des cellules de code.
-            cell_notebook['id'] = cell.id # Puis l'indice, stocké comme argument de la `Cell`.
-            cell_notebook['metadata'] = {} # On ajoute des metadata vides.
-            cell_notebook['source'] = cell.source # On récupère la source, stockée en argument.
-            ipynb['cells'].append(cell_notebook) # Puis on ajoute la cellule à la liste de cellules.
+        ipynb['cells'] = [fragment[2] for fragment in self._cells()]
         # Reste à récupérer les versions.
         version = self.notebook.version.split('.')
         ipynb['nbformat'] = int(version[0])
         ipynb['nbformat_minor'] = int(version[1])
         return ipynb
 
+    def iter_json(self):
+        r"""Iterates the chunks of the JSON text of the notebook (the text of `json.dumps(self.serialize())`)."""
+        version = self.notebook.version.split('.')
+        yield '{"cells": ['
+        for index, fragment in enumerate(self._cells()):
+            if fragment[3] is None: # Le texte JSON de la cellule est lui aussi gardé.
+                fragment[3] = json.dumps(fragment[2])
+            yield (", " if index else "") + fragment[3]
+        yield f'], "metadata": {{}}, "nbformat": {int(version[0])}, "nbformat_minor": {int(version[1])}}}'
+
+    def dumps(self) -> str:
+        r"""Serializes the notebook to a JSON text (see `iter_json`)."""
+        return "".join(self.iter_json())
+
     def to_file(self, filename):
         r"""Serializes the notebook to a file
 
@@ -286,8 +596,9 @@ class Serializer:
                 b777420a
                 a23ab5ac
         """
-        with open(filename, 'a') as f:
-            f.write(self.serialize)
+        # Comme `n0.save_ipynb`, on écrit le JSON morceau par morceau dans un fichier temporaire qui remplace ensuite le fichier.
+        with n0.atomic_write(filename, encoding="utf-8") as f:
+            f.writelines(self.iter_json())
 
 class Outliner:
     r"""Quickly outlines the strucure of the notebook in a readable format.
@@ -309,28 +620,98 @@ class Outliner:
                     | print("Hello world!")
                 └─▶ Markdown cell #a23ab5ac
                     | Goodbye! 👋
+
+    For large notebooks, the outline can be limited to a window of cells
+    (`offset`, `limit`), to the first `max_lines` lines of each cell, or to
+    the cell titles (`collapsed`); its cost then depends on what is shown.
+
+            >>> print(o.outline(offset=1, limit=1, collapsed=True))
+            Jupyter Notebook v4.5 (cells 2-2 of 3)
+            └─▶ Code cell #b777420a (1): 1 line
+            >>> print(o.outline(limit=1, max_lines=2))
+            Jupyter Notebook v4.5 (cells 1-1 of 3)
+            └─▶ Markdown cell #a9541506
+                ┌  Hello world!
+                │  ============
+                └  … 1 more line
     """
     def __init__(self, notebook: Notebook):
         self.notebook = notebook
+        self._summaries = {} # id(cellule) -> (cellule, révision, résumé)
+
+    def summary(self, cell: Cell) -> tuple:
+        r"""Returns the summary of a cell: its title and its number of lines.
+
+        The summary is computed once, and again only when the cell is modified (see `Cell.revision`).
+
+        Usage:
+
+                >>> nb = Notebook.from_file("samples/hello-world.ipynb")
+                >>> Outliner(nb).summary(nb.cells[1])
+                ('Code cell #b777420a (1)', 1)
+        """
+        entry = self._summaries.get(id(cell))
+        if entry is None or entry[0] is not cell or entry[1] != cell.revision:
+            if len(self._summaries) > 2 * len(self.notebook.cells): # On oublie les cellules qui ont quitté le notebook.
+                self._summaries = {id(cell): entry for cell, entry in ((cell, self._summaries.get(id(cell))) for cell in self.notebook.cells) if entry is not None}
+            title = f"Markdown cell #{cell.id}" if isinstance(cell, MarkdownCell) else f"Code cell #{cell.id} ({cell.execution_count})"
+            entry = self._summaries[id(cell)] = (cell, cell.revision, (title, len(cell.source)))
+        return entry[2]
+
+    def iter_outline(self, offset: int = 0, limit=None, max_lines=None, collapsed: bool = False):
+        r"""Iterates the lines of the outline of the notebook (see `outline`).
+
+        Usage:
 
-    def outline(self) -> str:
+                >>> nb = Notebook.from_file("samples/hello-world.ipynb")
+                >>> list(Outliner(nb).iter_outline())[:2]
+                ['Jupyter Notebook v4.5', '\n└─▶ ']
+        """
+        # Comme pour les autres fonctions similaires développées plus haut, on construit pas à pas le texte, en suivant l'exemple, mais on en renvoie les morceaux au fur et à mesure.
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError(f"negative offset or limit: {offset}, {limit}")
+        cells = self.notebook.cells
+        offset = min(offset, len(cells)) # Au-delà de la dernière cellule, la fenêtre est vide.
+        stop = len(cells) if limit is None else min(len(cells), offset + limit)
+        yield f"Jupyter Notebook v{self.notebook.version}" # Début
+        if offset == stop and (offset or stop < len(cells)):
+            yield f" (cells: none of {len(cells)})"
+        elif offset or stop < len(cells):
+            yield f" (cells {offset + 1}-{stop} of {len(cells)})"
+        for cell in cells[offset:stop]: # On construit cellule par cellule, en ne parcourant que les cellules affichées.
+            title, lines = self.summary(cell)
+            yield "\n└─▶ " # Début de cellule
+            if collapsed:
+                yield f"{title}: {lines} line{'s' if lines != 1 else ''}"
+                continue
+            yield f"{title}\n" # Début  de la cellule, selon le type.
+            shown = lines if max_lines is None else min(lines, max_lines)
+            rows = cell.source[:shown]
+            if shown < lines:
+                rows.append(f"… {lines - shown} more line{'s' if lines - shown != 1 else ''}")
+            # On doit ajouter les signes |, ┌ et └. Pour cela, il faut discriminer les cellule selon leur longueur.
+            if len(rows) <= 1:
+                yield f"    | {''.join(rows)}"
+            else :
+                yield f"    ┌  {rows[0]}"
+                for middle_line in rows[1:-1]:
+                    yield f"    │  {middle_line}"
+                yield f"    └  {rows[-1]}"
+
+    def outline(self, offset: int = 0, limit=None, max_lines=None, collapsed: bool = False) -> str:
         r"""Outlines the notebook in a readable format.
 
+        Args:
+            offset (int): the index of the first cell to outline (none of them
+                are outlined if it is past the last cell).
+            limit (int): the maximum number of cells to outline (all of them if None).
+            max_lines (int): the maximum number of lines shown per cell (all of them if None).
+            collapsed (bool): whether to show only the cell titles and numbers of lines.
+
         Returns:
             str: a string representing the outline of the notebook.
+
+        Raises:
+            ValueError: if `offset` or `limit` is negative.
         """
-        # Comme pour les autres fonctions similaires développées plus haut, on construit pas à pas la chaîne de caractères, en suivant l'exemple.
-        text = f"Jupyter Notebook v{self.notebook.version}" # Début
-        for cell in self.notebook: # On construit cellule par cellule.
-            text += "\n└─▶ " # Début de cellule
-            text += f"Markdown cell #{cell.id}\n" if isinstance(cell, MarkdownCell) else f"Code cell #{cell.id} ({cell.execution_count})\n" # Début  de la cellule, selon le type.
-            # On doit ajouter les signes |, ┌ et └. Pour cela, il faut discriminer les cellule selon leur longueur.
-            if len(cell.source) == 1:
-                text += f"    | {cell.source[0]}"
-            else :
-                text += f"    ┌  {cell.source[0]}"
-                for middle_line in cell.source[1:-1]:
-                    text += f"    │  {middle_line}"
-                text += f"    └  {cell.source[-1]}"
-        return text
-        
\ No newline at end of file
+        return "".join(self.iter_outline(offset, limit, max_lines, collapsed))
@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import json
+import os
+import random
 import unittest
 
 from notebook_v1 import *
@@ -116,5 +119,171 @@ class Question14(unittest.TestCase):
             , o.outline()
             )
 
+class SerializerToFile(unittest.TestCase):
+    def test_to_file(self):
+        nb = Notebook.from_file("samples/hello-world.ipynb")
+        Serializer(nb).to_file("samples/hello-world-save-load.ipynb")
+        try:
+            nb2 = Notebook.from_file("samples/hello-world-save-load.ipynb")
+            self.assertEqual([cell.id for cell in nb], [cell.id for cell in nb2])
+        finally:
+            os.remove("samples/hello-world-save-load.ipynb")
+
+class Emitters(unittest.TestCase):
+    def test_iter_py_percent(self):
+        nb = Notebook.from_file("samples/hello-world-markdown.ipynb")
+        ppp = PyPercentSerializer(nb)
+        self.assertEqual(ppp.to_py_percent(), "".join(ppp.iter_py_percent()))
+        self.assertTrue(all(isinstance(chunk, str) for chunk in ppp.iter_py_percent()))
+
+    def test_iter_outline(self):
+        nb = Notebook.from_file("samples/hello-world.ipynb")
+        o = Outliner(nb)
+        self.assertEqual(o.outline(), "".join(o.iter_outline()))
+
+class IncrementalSerializer(unittest.TestCase):
+    def setUp(self):
+        self.nb = Notebook.from_file("samples/hello-world.ipynb")
+        self.s = Serializer(self.nb)
+
+    def test_reuse_unmodified_cells(self):
+        text = self.s.dumps()
+        self.assertEqual(["a9541506", "b777420a", "a23ab5ac"], self.s.rebuilt)
+        self.assertEqual(text, self.s.dumps())
+        self.assertEqual(["a9541506", "b777420a", "a23ab5ac"], self.s.reused)
+        self.assertEqual([], self.s.rebuilt)
+
+    def test_modified_cells(self):
+        self.s.dumps()
+        self.nb.cells[0].source = ["Bonjour !"]
+        self.nb.cells[2].source.append("À bientôt !")
+        revision = self.nb.cells[2].revision
+        self.nb.cells[2].touch()
+        self.assertEqual(revision + 1, self.nb.cells[2].revision)
+        self.assertFalse(hasattr(self.nb.cells[2], "version")) # Le numéro de version est celui du format du notebook.
+        text = self.s.dumps()
+        self.assertEqual(["a9541506", "a23ab5ac"], self.s.rebuilt)
+        self.assertEqual(json.dumps(Serializer(self.nb).serialize()), text)
+
+    def test_inserted_and_removed_cells(self):
+        self.s.serialize()
+        del self.nb.cells[0]
+        self.nb.cells.append(MarkdownCell({"id": "c0ffee00", "source": ["Encore !"]}))
+        ipynb = self.s.serialize()
+        self.assertEqual(["b777420a", "a23ab5ac", "c0ffee00"], [cell["id"] for cell in ipynb["cells"]])
+        self.assertEqual(["c0ffee00"], self.s.rebuilt)
+        self.assertEqual(3, len(self.s._fragments))
+
+    def test_to_file(self):
+        filename = "samples/hello-world-save-load.ipynb"
+        try:
+            self.s.to_file(filename)
+            with open(filename, encoding="utf-8") as f:
+                self.assertEqual(json.dumps(self.s.serialize()), f.read())
+        finally:
+            os.remove(filename)
+
+class WindowedOutliner(unittest.TestCase):
+    def setUp(self):
+        self.nb = Notebook.from_file("samples/hello-world.ipynb")
+        self.o = Outliner(self.nb)
+
+    def test_default_is_full_outline(self):
+        self.assertEqual(self.o.outline(), self.o.outline(offset=0, limit=3))
+        self.assertEqual(self.o.outline(), self.o.outline(max_lines=3))
+
+    def test_window(self):
+        self.assertEqual(
+            "Jupyter Notebook v4.5 (cells 2-3 of 3)\n└─▶ Code cell #b777420a (1)\n    | print(\"Hello world!\")"
+            "\n└─▶ Markdown cell #a23ab5ac\n    | Goodbye! 👋",
+            self.o.outline(offset=1, limit=10),
+        )
+        self.assertEqual("Jupyter Notebook v4.5 (cells: none of 3)", self.o.outline(offset=3))
+        self.assertEqual("Jupyter Notebook v4.5 (cells: none of 3)", self.o.outline(offset=10, limit=2))
+        self.assertEqual("Jupyter Notebook v4.5 (cells: none of 3)", self.o.outline(limit=0))
+        for window in [dict(offset=-1), dict(limit=-1)]:
+            with self.assertRaises(ValueError):
+                self.o.outline(**window)
+
+    def test_truncated_and_collapsed(self):
+        self.assertEqual(
+            "Jupyter Notebook v4.5\n└─▶ Markdown cell #a9541506\n    | … 3 more lines"
+            "\n└─▶ Code cell #b777420a (1)\n    | … 1 more line"
+            "\n└─▶ Markdown cell #a23ab5ac\n    | … 1 more line",
+            self.o.outline(max_lines=0),
+        )
+        self.assertEqual(
+            "Jupyter Notebook v4.5\n└─▶ Markdown cell #a9541506: 3 lines"
+            "\n└─▶ Code cell #b777420a (1): 1 line\n└─▶ Markdown cell #a23ab5ac: 1 line",
+            self.o.outline(collapsed=True),
+        )
+
+    def test_summaries_follow_modifications(self):
+        self.assertEqual(("Code cell #b777420a (1)", 1), self.o.summary(self.nb.cells[1]))
+        self.nb.cells[1].execution_count = 2
+        self.nb.cells[1].source = ["x = 1\n", "print(x)"]
+        self.assertEqual(("Code cell #b777420a (2)", 2), self.o.summary(self.nb.cells[1]))
+
+class CellIndexes(unittest.TestCase):
+    def setUp(self):
+        self.nb = Notebook.from_file("samples/hello-world.ipynb")
+
+    def code_cell(self, id, execution_count):
+        return CodeCell({"id": id, "source": [], "execution_count": execution_count})
+
+    def assertIndexed(self, cells):
+        self.assertEqual({cell.id: cell for cell in cells}, cells._indexes().ids)
+        for cell_type in (Cell, CodeCell, MarkdownCell):
+            positions = [position for position, cell in enumerate(cells) if isinstance(cell, cell_type)]
+            self.assertEqual(positions, list(cells.positions(cell_type)))
+        for count in {getattr(cell, "execution_count", None) for cell in cells} - {None}:
+            expected = [cell for cell in cells if getattr(cell, "execution_count", None) == count]
+            self.assertCountEqual(expected, cells.by_execution_count(count))
+
+    def test_lookups(self):
+        self.assertIsInstance(self.nb.cells, list)
+        self.assertIs(self.nb.cells[2], self.nb.by_id("a23ab5ac"))
+        self.assertEqual([0, 2], list(self.nb.positions(MarkdownCell)))
+        self.assertEqual([self.nb.cells[1]], self.nb.by_execution_count(1))
+        self.assertEqual([], self.nb.by_execution_count(2))
+        with self.assertRaises(KeyError):
+            self.nb.by_id("c0ffee00")
+
+    def test_incremental_updates(self):
+        cells = self.nb.cells
+        self.assertIndexed(cells)
+        cells.insert(1, self.code_cell("c0ffee00", 1))
+        cells.append(MarkdownCell({"id": "c0ffee01", "source": []}))
+        cells[0] = self.code_cell("c0ffee02", 2)
+        del cells[2]
+        cells.remove(cells.by_id("c0ffee01"))
+        self.assertEqual(["c0ffee02", "c0ffee00", "a23ab5ac"], [cell.id for cell in cells])
+        self.assertIndexed(cells)
+        with self.assertRaises(KeyError):
+            cells.by_id("b777420a")
+
+    def test_random_updates(self):
+        generator = random.Random(0)
+        cells = self.nb.cells
+        for step in range(500):
+            action = generator.randrange(4) if cells else 0
+            if action == 0:
+                cell = self.code_cell(f"{step:08x}", generator.randrange(5)) if generator.random() < 0.5 else \
+                    MarkdownCell({"id": f"{step:08x}", "source": []})
+                cells.insert(generator.randrange(-len(cells) - 1, len(cells) + 1), cell)
+            elif action == 1:
+                cells.pop(generator.randrange(-len(cells), len(cells)))
+            elif action == 2:
+                cells[generator.randrange(len(cells))] = self.code_cell(f"{step:08x}", generator.randrange(5))
+            else:
+                cells[1:3] = [MarkdownCell({"id": f"{step:08x}", "source": []})]
+            self.assertIndexed(cells)
+
+    def test_reindex(self):
+        cell = self.nb.by_id("b777420a")
+        cell.execution_count = 3
+        self.nb.cells.reindex()
+        self.assertEqual([cell], self.nb.by_execution_count(3))
+
 if __name__ == "__main__":
     unittest.main()
@@ -5,6 +5,14 @@
 an object-oriented version of the notebook toolbox
 """
 
+import functools
+import json
+import mmap
+import os
+import re
+import weakref
+from array import array
+from collections.abc import MutableSequence, Sequence
 from typing import NoReturn
 import notebook_v0 as n0
 import notebook_v1 as n1
@@ -86,7 +94,8 @@ class Notebook:
 
     Attributes:
         version (str): The version of the notebook format.
-        cells (list): The cells of the notebook (either CodeCell or MarkdownCell).
+        cells (list): The cells of the notebook (either CodeCell or MarkdownCell); a plain
+            list is wrapped in a `n1.IndexedCells`, whose indexes follow its changes.
 
     Usage:
 
@@ -113,17 +122,226 @@ class Notebook:
     def __init__(self, version: str, cells: list): # cells est une list de Cells
         self.version = version
         self.cells = cells
+
+    @property
+    def cells(self):
+        return self._cells
+
+    @cells.setter
+    def cells(self, cells):
+        # Une liste est remplacée par une `n1.IndexedCells` (une sous-classe de list), comme le font les chargeurs :
+        # ses index sont tenus à jour à chaque modification, au lieu de devenir silencieusement faux.
+        self._cells = n1.IndexedCells(cells) if type(cells) is list else cells
     
     def __iter__(self):
         r"""Iterate the cells of the notebook.
         """
         return iter(self.cells)
 
+    _index = None # (cellules, n1.CellIndex) : l'index d'une séquence de cellules qui n'a pas le sien.
+
+    def _lookups(self):
+        # Les recherches passent par les index de la séquence des cellules, si elle en a (`n1.IndexedCells`, vues) ;
+        # sinon (un tuple par exemple), par un index construit à côté d'elle, sans la remplacer.
+        cells = self.cells
+        if hasattr(cells, "by_id"):
+            return cells
+        if self._index is None or self._index[0] is not cells:
+            self._index = (cells, n1.CellIndex(cells))
+        return self._index[1]
+
+    def by_id(self, cell_id: str) -> Cell:
+        r"""Returns the cell with the given id.
+
+        The lookups (`by_id`, `positions`, `by_execution_count`) go through
+        indexes kept up to date as cells are inserted or removed (see
+        `n1.IndexedCells`); call `reindex` after changing the id or the
+        execution count of a cell in place.
+
+        Raises:
+            KeyError: if there is no such cell.
+
+        Usage:
+
+            >>> nb = NotebookLoader("samples/hello-world.ipynb").load()
+            >>> nb.by_id("b777420a").source
+            ['print("Hello world!")']
+            >>> nb.cells.insert(0, CodeCell("c0ffee00", ["1 + 1"], 1))
+            >>> nb.positions(MarkdownCell), [cell.id for cell in nb.by_execution_count(1)]
+            (array('i', [1, 3]), ['b777420a', 'c0ffee00'])
+        """
+        return self._lookups().by_id(cell_id)
+
+    def positions(self, cell_type: type) -> array:
+        r"""Returns the (sorted) positions of the cells of the given type (CodeCell or MarkdownCell)."""
+        return self._lookups().positions(cell_type)
+
+    def by_execution_count(self, execution_count: int) -> list:
+        r"""Returns the code cells with the given execution count."""
+        return self._lookups().by_execution_count(execution_count)
+
+    def reindex(self):
+        r"""Rebuilds the indexes of the cells on the next lookup."""
+        if hasattr(self.cells, "reindex"):
+            self.cells.reindex()
+        self._index = None
+
+    def _view(self, indices) -> "Notebook":
+        # Une vue d'une vue pointe directement vers les cellules de base, tant que la première n'a pas été copiée.
+        # Les positions sont une tranche (slice) ou un tableau de positions dans les cellules de ce notebook.
+        cells = self.cells
+        if isinstance(cells, _ViewCells) and not cells.copied:
+            if isinstance(indices, slice):
+                indices = cells.indices[indices]
+            else:
+                indices = array("i", [cells.indices[index] for index in indices])
+            cells = cells.base
+        elif isinstance(indices, slice):
+            indices = range(len(cells))[indices]
+        return Notebook(self.version, _ViewCells(cells, indices))
+
+    def view(self, start=None, stop=None, step=None) -> "Notebook":
+        r"""Returns a view of a slice of the cells of the notebook.
+
+        A view is a Notebook sharing the cells of this one, without copying
+        them: its cells are only copied (as a list) when they are modified
+        (inserted, replaced or deleted), in the view or in this notebook. The
+        cells of a sequence which does not tell its views when it changes
+        (unlike `n1.IndexedCells`, which the lists of cells become) are copied
+        at once. The cells themselves are shared.
+
+        Usage:
+
+            >>> nb = NotebookLoader("samples/hello-world.ipynb").load()
+            >>> view = nb.view(1)
+            >>> [cell.id for cell in view]
+            ['b777420a', 'a23ab5ac']
+            >>> view.cells[0] is nb.cells[1]
+            True
+            >>> del view.cells[0]
+            >>> [cell.id for cell in view], len(nb.cells)
+            (['a23ab5ac'], 3)
+        """
+        return self._view(slice(start, stop, step))
+
+    def view_by_type(self, cell_type: type) -> "Notebook":
+        r"""Returns a view (see `view`) of the cells of the given type (CodeCell or MarkdownCell).
+
+        Usage:
+
+            >>> nb = NotebookLoader("samples/hello-world.ipynb").load()
+            >>> [cell.id for cell in nb.view_by_type(MarkdownCell)]
+            ['a9541506', 'a23ab5ac']
+        """
+        return self._view(self.positions(cell_type))
+
+    def view_by_ids(self, ids) -> "Notebook":
+        r"""Returns a view (see `view`) of the cells with the given ids, in the order of the notebook.
+
+        Usage:
+
+            >>> nb = NotebookLoader("samples/hello-world.ipynb").load()
+            >>> [cell.id for cell in nb.view_by_ids(["a23ab5ac", "b777420a"])]
+            ['b777420a', 'a23ab5ac']
+        """
+        ids = set(ids)
+        return self._view(array("i", [index for index, cell in enumerate(self.cells) if cell.id in ids]))
+
+
+class _ViewCells(MutableSequence):
+    # Les cellules d'une vue : les positions (range ou array) de ses cellules dans une séquence de base,
+    # jusqu'à la première modification de la vue ou de la base, qui en fait une liste propre à la vue
+    # (copie sur écriture). Une base qui ne prévient pas de ses modifications est copiée tout de suite,
+    # sauf si elle ne peut pas être modifiée (les cellules d'un MappedNotebook par exemple).
+    def __init__(self, base, indices):
+        self.base = base
+        self.indices = indices
+        self._cells = None
+        self._views = self._index = None
+        if hasattr(base, "register_view"):
+            base.register_view(self)
+        elif isinstance(base, MutableSequence):
+            self._copy()
+
+    @property
+    def copied(self) -> bool:
+        return self._cells is not None
+
+    def _copy(self) -> list:
+        if self._cells is None:
+            self._cells = [self.base[index] for index in self.indices]
+            self.base = self.indices = None
+        return self._cells
+
+    detach = _copy
+
+    def register_view(self, view):
+        if self._views is None:
+            self._views = weakref.WeakSet()
+        self._views.add(view)
+
+    def _changing(self) -> list:
+        # Comme pour `n1.IndexedCells` : les vues de cette vue (copiée) sont détachées avant sa modification.
+        if self._views:
+            views, self._views = list(self._views), None
+            for view in views:
+                view.detach()
+        self._index = None
+        return self._copy()
+
+    # Les recherches dans une vue passent par un index propre à la vue (voir `n1.CellIndex`), construit à la
+    # première recherche : les positions sont celles des cellules dans la vue, qui n'est pas copiée pour autant.
+    def _indexes(self) -> n1.CellIndex:
+        if self._index is None:
+            self._index = n1.CellIndex(self)
+        return self._index
+
+    def reindex(self):
+        self._index = None
+
+    def by_id(self, cell_id: str) -> Cell:
+        return self._indexes().by_id(cell_id)
+
+    def positions(self, cell_type: type) -> array:
+        return self._indexes().positions(cell_type)
+
+    def by_execution_count(self, execution_count: int) -> list:
+        return self._indexes().by_execution_count(execution_count)
+
+    def __len__(self):
+        return len(self._cells if self._cells is not None else self.indices)
+
+    def __getitem__(self, index):
+        if self._cells is not None:
+            return self._cells[index]
+        if isinstance(index, slice):
+            return [self.base[i] for i in self.indices[index]]
+        return self.base[self.indices[index]]
+
+    def __iter__(self):
+        if self._cells is not None:
+            return iter(self._cells)
+        base = self.base
+        return (base[index] for index in self.indices)
+
+    def __setitem__(self, index, value):
+        self._changing()[index] = value
+
+    def __delitem__(self, index):
+        del self._changing()[index]
+
+    def insert(self, index, value):
+        self._changing().insert(index, value)
+
+    def __repr__(self):
+        return repr(list(self))
+
 class NotebookLoader:
     r"""Loads a Jupyter Notebook from a file
 
     Args:
         filename (str): The name of the file to load.
+        cache (ParseCache or bool): The parse cache to go through (see `n0.load_ipynb`).
 
     Usage:
             >>> nbl = NotebookLoader("samples/hello-world.ipynb")
@@ -136,22 +354,223 @@ class NotebookLoader:
             b777420a
             a23ab5ac
     """
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, cache=True):
         self.filename = filename
+        self.cache = cache
 
     def load(self) -> Notebook:
         r"""Loads a Notebook instance from the file.
         """
         # Il faut construire un Notebook. On doit récupérer les deux argument suivants :
         # 1 : la version
-        ipynb = n0.load_ipynb(self.filename)
+        ipynb = n0.load_ipynb(self.filename, cache=self.cache)
         nb_version = n0.get_format_version(ipynb) #où l'on se ressert de fonctions développées dans le notebook 0.
         # 2 : la list cells des Cells du futur Notebook.
         # On construit donc une à une les Cell en parcourant la liste fournie par la fonction n0.get_cells.
         # Cela revient à convertir les cellules du format dict au format Cell.
-        nb_cells = [CodeCell(cell["id"], cell["source"], cell["execution_count"]) if cell["cell_type"] == "code" else MarkdownCell(cell["id"], cell["source"]) for cell in n0.get_cells(ipynb)]
+        nb_cells = n1.IndexedCells(to_cell(cell) for cell in n0.get_cells(ipynb))
         return Notebook(nb_version, nb_cells)
 
+    def __iter__(self):
+        r"""Iterates the cells of the file, decoded one at a time (see `n0.iter_cells`).
+
+        Usage:
+
+            >>> [cell.id for cell in NotebookLoader("samples/hello-world.ipynb")]
+            ['a9541506', 'b777420a', 'a23ab5ac']
+        """
+        for cell in n0.iter_cells(self.filename):
+            yield to_cell(cell)
+
+    def header(self) -> dict:
+        r"""Loads the top-level entries of the file, except the cells (see `n0.load_header`)."""
+        return n0.load_header(self.filename)
+
+    @property
+    def version(self) -> str:
+        r"""The version of the notebook format, read without loading the cells."""
+        return n0.get_format_version(self.header())
+
+    def map(self, index_filename=None):
+        r"""Maps the file in memory and returns a MappedNotebook, whose cells are decoded on demand.
+
+        Args:
+            index_filename (str): The name of the sidecar file where the cell index is stored (optional).
+        """
+        return MappedNotebook(self.filename, index_filename)
+
+
+def to_cell(cell: dict) -> Cell:
+    r"""Converts a cell (dict) of an ipynb notebook to a Cell instance.
+
+    Usage:
+
+        >>> cell = to_cell({"cell_type": "code", "id": "b777420a", "execution_count": 1, "source": ['print("Hello world!")']})
+        >>> isinstance(cell, CodeCell)
+        True
+    """
+    # Les notebooks au format antérieur à 4.5 n'ont pas d'identifiant de cellule.
+    if cell["cell_type"] == "code":
+        return CodeCell(cell.get("id"), cell["source"], cell["execution_count"])
+    return MarkdownCell(cell.get("id"), cell["source"])
+
+
+def to_dict(cell: Cell) -> dict:
+    r"""Converts a Cell instance to a cell (dict) of an ipynb notebook (the reverse of `to_cell`).
+
+    Usage:
+
+        >>> to_dict(CodeCell("b777420a", ['print("Hello world!")'], 1))
+        {'cell_type': 'code', 'execution_count': 1, 'id': 'b777420a', 'metadata': {}, 'outputs': [], 'source': ['print("Hello world!")']}
+    """
+    if isinstance(cell, CodeCell):
+        ipynb = {"cell_type": "code", "execution_count": cell.execution_count, "id": cell.id, "metadata": {}, "outputs": [], "source": cell.source}
+    else:
+        ipynb = {"cell_type": "markdown", "id": cell.id, "metadata": {}, "source": cell.source}
+    if cell.id is None:
+        del ipynb["id"]
+    return ipynb
+
+
+class _MappedCells(Sequence):
+    # Séquence paresseuse des cellules d'un fichier projeté en mémoire : une cellule n'est décodée que
+    # lorsqu'on y accède, à partir de ses positions (début, fin) dans le fichier.
+    def __init__(self, buffer, offsets: list):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start, end = self.offsets[index]
+        return to_cell(json.loads(self.buffer[start:end]))
+
+
+class MappedNotebook(Notebook):
+    r"""A Jupyter Notebook memory-mapped from an .ipynb file, whose cells are decoded on demand.
+
+    The byte offsets of the cells are found once, by scanning the file without
+    decoding the cells. This index may be stored in a sidecar file: it is then
+    reused as long as the notebook file is not modified. The index of a file
+    modified too recently to be trusted (see `n0.trusted_mtime`) is neither
+    stored nor reused; a corrupt sidecar file is rebuilt.
+
+    Args:
+        filename (str): The name of the file to map.
+        index_filename (str): The name of the sidecar file where the cell index is stored (optional).
+
+    Attributes:
+        version (str): The version of the notebook format.
+        cells (Sequence): The cells of the notebook (either CodeCell or MarkdownCell), decoded on access.
+
+    Usage:
+
+        >>> with MappedNotebook("samples/hello-world.ipynb") as nb:
+        ...     print(nb.version, len(nb))
+        ...     print(nb[1].source)
+        ...     print(nb.by_id("a23ab5ac").source)
+        4.5 3
+        ['print("Hello world!")']
+        ['Goodbye! 👋']
+    """
+
+    def __init__(self, filename: str, index_filename=None):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) # La projection reste valide après fermeture.
+            stat = os.fstat(f.fileno())
+        # Un fichier modifié à l'instant peut l'être à nouveau sans que sa date change : son index ne sera pas réutilisé.
+        mtime_ns = n0.trusted_mtime(stat)
+        index = None
+        if index_filename is not None and mtime_ns is not None:
+            try:
+                with open(index_filename, encoding="utf-8") as f:
+                    index = json.load(f)
+                if (index["size"], index["mtime_ns"]) != (stat.st_size, mtime_ns):
+                    index = None # Le notebook a changé depuis la création de l'index.
+                elif "version" not in index or any(len(entry) != 5 for entry in index["cells"]):
+                    index = None # Un index d'une version précédente, sans le type ni le numéro d'exécution des cellules.
+            except (OSError, ValueError, KeyError, TypeError): # Un index absent, tronqué ou corrompu est reconstruit.
+                index = None
+        if index is None:
+            index = self._build_index()
+            index["size"], index["mtime_ns"] = stat.st_size, mtime_ns
+            if index_filename is not None and mtime_ns is not None:
+                with n0.atomic_write(index_filename, encoding="utf-8") as f: # Un index interrompu ne doit pas être relu.
+                    json.dump(index, f)
+        self.version = index["version"]
+        self.cells = _MappedCells(self._map, [(start, end) for start, end, *_ in index["cells"]])
+        # Les recherches se font dans l'index du fichier : seules les cellules trouvées sont décodées.
+        self._ids, self._types, self._counts = {}, {}, {}
+        for position, (_, _, cell_id, cell_type, count) in enumerate(index["cells"]):
+            if cell_id is not None:
+                self._ids[cell_id] = position
+            self._types.setdefault(CodeCell if cell_type == "code" else MarkdownCell, array("i")).append(position)
+            if count is not None:
+                self._counts.setdefault(count, []).append(position)
+
+    def _build_index(self) -> dict:
+        # On parcourt le fichier une fois, en ne décodant que l'en-tête, puis l'identifiant, le type et le numéro d'exécution de chaque cellule.
+        scanner = n0.JsonScanner(self._map)
+        header, cells = {}, []
+        for key in scanner.iter_object():
+            if key != "cells":
+                header[key] = scanner.read_value()
+                continue
+            for _ in scanner.iter_array():
+                scanner.peek()
+                start, values = scanner.tell(), {}
+                for cell_key in scanner.iter_object():
+                    if cell_key in ("id", "cell_type", "execution_count"):
+                        values[cell_key] = scanner.read_value()
+                    else:
+                        scanner.skip_value()
+                cells.append([start, scanner.tell(), values.get("id"), values.get("cell_type"), values.get("execution_count")])
+        return {"version": n0.get_format_version(header), "cells": cells}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __getitem__(self, index):
+        r"""Returns the cell(s) at the given index (or slice), decoding only those."""
+        return self.cells[index]
+
+    def by_id(self, cell_id: str) -> Cell:
+        r"""Returns the cell with the given id.
+
+        Raises:
+            KeyError: if there is no such cell.
+        """
+        return self.cells[self._ids[cell_id]]
+
+    def positions(self, cell_type: type) -> array:
+        r"""Returns the (sorted) positions of the cells of the given type (CodeCell or MarkdownCell), without decoding them."""
+        return array("i", sorted(p for t, positions in self._types.items() if issubclass(t, cell_type) for p in positions))
+
+    def by_execution_count(self, execution_count: int) -> list:
+        r"""Returns the code cells with the given execution count (only those are decoded)."""
+        return [self.cells[position] for position in self._counts.get(execution_count, ())]
+
+    def reindex(self):
+        r"""Does nothing: the cells of a mapped notebook cannot be changed."""
+
+    def view_by_ids(self, ids) -> Notebook:
+        r"""Returns a view (see `Notebook.view`) of the cells with the given ids, in the order of the notebook, without decoding them."""
+        return self._view(array("i", sorted({self._ids[cell_id] for cell_id in ids if cell_id in self._ids})))
+
+    def close(self):
+        r"""Unmaps the file."""
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 class Markdownizer:
     r"""Transforms a notebook to a pure markdown notebook.
 
@@ -180,18 +599,8 @@ class Markdownizer:
     def markdownize(self) -> Notebook:
         r"""Transforms the notebook to a pure markdown notebook.
         """
-        # On va parcourir les cellules du notebook et changer celles du type CodeCell en MarkdownCell.
-        new_cells = []
-        for cell in self.notebook:
-            if isinstance(cell, CodeCell):
-                # Il faut encadrer le texte source, si la cellule est du code:
-                new_source = ["```python\n"] + cell.source + ["\n```"]
-                new_cell = MarkdownCell(cell.id, new_source)
-            else:
-                # Sinon, on ne change rien
-                new_cell = cell
-            new_cells.append(new_cell)
-        return Notebook(self.notebook.version, new_cells)
+        # On va parcourir les cellules du notebook et changer celles du type CodeCell en MarkdownCell (voir `markdownize_cell`).
+        return pipeline(self.notebook).markdownize().collect()
 
 class MarkdownLesser:
     r"""Removes markdown cells from a notebook.
@@ -218,20 +627,208 @@ class MarkdownLesser:
             Notebook: a Notebook instance with only code cells
         """
         # On procède de la même manière que pour Mardownizer.
-        new_cells = []
-        for cell in self.notebook:
-            if not isinstance(cell, MarkdownCell):
-                new_cells.append(cell)
-        return Notebook(self.notebook.version, new_cells)
+        return pipeline(self.notebook).remove_markdown().collect()
+
+
+def markdownize_cell(cell: Cell) -> Cell:
+    r"""Transforms a code cell to a markdown cell showing its code (other cells are returned unchanged)."""
+    if isinstance(cell, CodeCell):
+        # Il faut encadrer le texte source, si la cellule est du code:
+        return MarkdownCell(cell.id, ["```python\n"] + cell.source + ["\n```"])
+    return cell # Sinon, on ne change rien
+
+
+class Pipeline:
+    r"""A lazy sequence of transformations of the cells of a notebook.
+
+    The transformations are only recorded: they are applied all at once,
+    cell by cell, when the pipeline is iterated. No intermediate notebook
+    is built, so a pipeline can go from a streaming loader (such as a
+    `NotebookLoader` or a `PyPercentLoader`) to a file while holding a
+    single cell in memory. Each method returns a new pipeline.
+
+    Args:
+        source (iterable): the cells to transform (a Notebook, a loader...).
+        version (str): the version of the notebook format (defaults to the one of the source, or '4.5').
+
+    Usage:
+
+        >>> nb = NotebookLoader("samples/hello-world.ipynb").load()
+        >>> p = pipeline(nb).filter(lambda cell: cell.id != "a23ab5ac").markdownize()
+        >>> [(type(cell).__name__, cell.id) for cell in p]
+        [('MarkdownCell', 'a9541506'), ('MarkdownCell', 'b777420a')]
+        >>> pipeline(NotebookLoader("samples/hello-world.ipynb")).remove_markdown().to_percent()
+        '# %%\nprint("Hello world!")\n'
+    """
+    def __init__(self, source, version=None, stages=()):
+        self.source = source
+        self.version = version or getattr(source, "version", None) or "4.5"
+        self.stages = stages # Tuple de (fonction, est un filtre)
+
+    def _then(self, function, is_filter: bool):
+        return Pipeline(self.source, self.version, self.stages + ((function, is_filter),))
+
+    def filter(self, predicate):
+        r"""Keeps only the cells for which `predicate(cell)` is true."""
+        return self._then(predicate, True)
+
+    def map(self, function):
+        r"""Replaces each cell by `function(cell)`."""
+        return self._then(function, False)
+
+    def markdownize(self):
+        r"""Transforms the code cells to markdown cells (see `Markdownizer`)."""
+        return self.map(markdownize_cell)
+
+    def remove_markdown(self):
+        r"""Removes the markdown cells (see `MarkdownLesser`)."""
+        return self.filter(lambda cell: not isinstance(cell, MarkdownCell))
+
+    def _pairs(self):
+        # Les cellules transformées, chacune avec le dict dont elle provient quand la source est un fichier (sinon None).
+        if isinstance(self.source, NotebookLoader):
+            pairs = ((to_cell(cell), cell) for cell in n0.iter_cells(self.source.filename))
+        else:
+            pairs = ((cell, None) for cell in self.source)
+        stages = self.stages
+        for cell, ipynb in pairs:
+            for function, is_filter in stages:
+                if is_filter:
+                    if not function(cell):
+                        break
+                else:
+                    cell = function(cell)
+            else:
+                yield cell, ipynb
+
+    def __iter__(self):
+        for cell, _ in self._pairs():
+            yield cell
+
+    def collect(self) -> Notebook:
+        r"""Runs the pipeline into a new Notebook."""
+        return Notebook(self.version, n1.IndexedCells(self))
+
+    def to_percent(self, file=None) -> str:
+        r"""Runs the pipeline into a py-percent text, written to the file-like object `file` if given (see `n0.to_percent`)."""
+        return n0.to_percent(map(to_dict, self), file)
+
+    def to_file(self, filename: str):
+        r"""Runs the pipeline into an .ipynb file, written cell by cell (see `n0.save_ipynb`).
+
+        When the source is a NotebookLoader, the metadata of the notebook are
+        kept, and so are the outputs, metadata and attachments of the cells
+        which the stages leave with the same type and id. The Cell instances
+        of other sources do not hold them: their cells are written without
+        outputs nor metadata (see `to_dict`).
+        """
+        if isinstance(self.source, NotebookLoader):
+            header = self.source.header()
+        else:
+            major, minor = self.version.split(".")
+            header = {"metadata": {}, "nbformat": int(major), "nbformat_minor": int(minor)}
+        n0.save_ipynb({"cells": (_merge_dict(cell, ipynb) for cell, ipynb in self._pairs()), **header}, filename)
+
+
+def _merge_dict(cell: Cell, ipynb) -> dict:
+    # Le dict de la cellule (voir `to_dict`), qui reprend ce que la Cell ne contient pas du dict d'origine, si c'est la même cellule.
+    merged = to_dict(cell)
+    if ipynb is None or (ipynb.get("cell_type"), ipynb.get("id")) != (merged["cell_type"], merged.get("id")):
+        return merged
+    merged = {**ipynb, **merged}
+    for key in ("metadata", "outputs"):
+        if key in ipynb:
+            merged[key] = ipynb[key]
+    return merged
+
+
+def pipeline(source, version=None) -> Pipeline:
+    r"""Starts a pipeline of transformations of the cells of `source` (see `Pipeline`)."""
+    return Pipeline(source, version)
+
+
+_MARKER = re.compile(r"# %%(?:[ \t]+(?P<rest>.*?))?[ \t]*\n?")
+_MARKER_ATTRIBUTE = re.compile(r'(\w+)=("(?:[^"\\]|\\.)*"|\[[^\]]*\]|\{[^}]*\}|\S+)')
+_MARKER_TYPE = re.compile(r"\[(\w+)\]")
+
+
+@functools.lru_cache(maxsize=1024) # Les mêmes marqueurs (`# %%`, `# %% [markdown]`...) reviennent sans cesse.
+def _parse_marker(rest: str) -> tuple:
+    # Les attributs `clef=valeur` sont lus en JSON quand c'est possible ; le type est entre crochets et le reste est le titre.
+    attributes = {}
+    for name, value in _MARKER_ATTRIBUTE.findall(rest):
+        try:
+            attributes[name] = json.loads(value)
+        except ValueError:
+            attributes[name] = value
+    rest = _MARKER_ATTRIBUTE.sub("", rest)
+    match = _MARKER_TYPE.search(rest)
+    cell_type = "code"
+    if match is not None:
+        cell_type = "markdown" if match.group(1) in ("markdown", "md") else match.group(1)
+        rest = rest[:match.start()] + rest[match.end():]
+    if rest.strip():
+        attributes["title"] = rest.strip()
+    return cell_type, attributes
+
+
+def _cell_source(cell_type: str, lines: list) -> list:
+    # La ligne vide qui sépare une cellule de la suivante ne fait pas partie de la cellule.
+    if lines and lines[-1].strip() == "":
+        lines.pop()
+    if cell_type == "markdown": # Les lignes de markdown sont commentées.
+        lines = [line[2:] if line.startswith("# ") else line[1:] if line.startswith("#") else line for line in lines]
+    if lines and lines[-1].endswith("\n"): # Comme dans les notebooks, la dernière ligne n'a pas de saut de ligne.
+        lines[-1] = lines[-1][:-1]
+    return lines
+
+
+def tokenize_py_percent(file):
+    r"""Iterates the cells of a py-percent file, read line by line from any file handle (or iterable of lines).
+
+    Only the lines of the current cell are kept in memory.
+
+    Yields:
+        tuple: the type ("code", "markdown", ...), the attributes (dict) and the source (list of str) of each cell.
+
+    Usage:
+
+            >>> import io
+            >>> text = '# %% [markdown] id="a9541506"\n# Hello world!\n\n# %% Greetings tags=["hello"]\nprint("Hello world!")\n'
+            >>> for token in tokenize_py_percent(io.StringIO(text)):
+            ...     print(token)
+            ('markdown', {'id': 'a9541506'}, ['Hello world!'])
+            ('code', {'tags': ['hello'], 'title': 'Greetings'}, ['print("Hello world!")'])
+    """
+    cell_type, attributes, lines = "code", {}, []
+    first = True # Avant le premier marqueur, on ne crée une cellule que si le fichier contient du code.
+    for line in file:
+        match = _MARKER.fullmatch(line) if line.startswith("# %%") else None
+        if match is None:
+            lines.append(line)
+            continue
+        if not first or any(line.strip() for line in lines):
+            yield cell_type, attributes, _cell_source(cell_type, lines)
+        first = False
+        cell_type, attributes = _parse_marker(match.group("rest") or "")
+        attributes = dict(attributes) # Le résultat de `_parse_marker` est partagé (cache).
+        lines = []
+    if not first or any(line.strip() for line in lines):
+        yield cell_type, attributes, _cell_source(cell_type, lines)
 
 
 class PyPercentLoader:
     r"""Loads a Jupyter Notebook from a py-percent file.
 
     Args:
-        filename (str): The name of the file to load.
+        filename (str or file): The name of the file to load, or a file handle open in text mode.
         version (str): The version of the notebook format (defaults to '4.5').
 
+    The file is read line by line (see `tokenize_py_percent`): iterating the
+    loader yields its cells one at a time, so that large files can be
+    processed in bounded memory. The cells take their id from the `id`
+    attribute of their marker (`# %% id="b777420a"`), or from their index.
+
     Usage:
 
             >>> # Step 1 - Load the notebook and save it as a py-percent file
@@ -246,35 +843,37 @@ class PyPercentLoader:
             a9541506
             b777420a
             a23ab5ac
+
+            >>> import io
+            >>> for cell in PyPercentLoader(io.StringIO("# %% [markdown]\n# Hello world!\n\n# %%\nprint(1)\n")):
+            ...     print(type(cell).__name__, cell.id, cell.source)
+            MarkdownCell 00000000 ['Hello world!']
+            CodeCell 00000001 ['print(1)']
     """
 
-    def __init__(self, filename: str, version="4.5"):
+    def __init__(self, filename, version="4.5"):
         self.filename = filename
         self.version = version
 
+    def __iter__(self):
+        r"""Iterates the cells of the py-percent file, as they are read.
+        """
+        if isinstance(self.filename, (str, os.PathLike)):
+            with open(self.filename, encoding="utf-8") as f:
+                yield from self._cells(f)
+        else:
+            yield from self._cells(self.filename)
+
+    @staticmethod
+    def _cells(file):
+        for index, (cell_type, attributes, source) in enumerate(tokenize_py_percent(file)):
+            id = str(attributes.get("id", f"{index:08x}"))
+            if cell_type == "markdown":
+                yield MarkdownCell(id, source)
+            else: # Les cellules d'un autre type (raw...) sont gardées comme du code.
+                yield CodeCell(id, source, None) # Le code n'a pas été exécuté.
+
     def load(self) -> Notebook:
         r"""Loads a Notebook instance from the py-percent file.
         """
-        with open(self.filename) as f:
-            nb_py = f.read() # On lit le fichier au format py-percent, et on stocke la string correspondante.
-
-        nb_lines = nb_py.split('\n') # On sépare les lignes, pour obtenir une liste de lignes.
-
-        cells = []
-
-        # On va créer une cellule, qu'on va remplir successivement ligne après ligne, jusqu'à rencontrer le début d'une cellule suivante.
-        cell_source = []
-        execution_count = 0 # Il s'agit d'un conteur qu'on va augmenter à chaque ajout de cellule.
-
-        for line in nb_lines:
-            if line == '# [markdown]\n': # Ici, on rencontre le début d'une nouvelle cellule.
-                cells.append(MarkdownCell(0, cell_source)) # On ajoute la cellule qui vient de se terminer à la liste de cellule.
-                cell_source = [] # Puis, on la réinitialise.
-                execution_count += 1 # Et on incrémente le compteur d'execution.
-            elif line == '# [code]\n': # Et là, le début d'une cellule de code.
-                cells.append(CodeCell(0, cell_source, execution_count)) 
-                execution_count += 1
-                cell_source = []
-            else :
-                cell_source.append(line + '\n') # Si on ne rencontre pas le début d'une nouvelle cellule, on ajoute son contenu à la cellule en cours de remplissage.
-        return Notebook(self.version, cells) # On renvoie le Notebook.
+        return Notebook(self.version, n1.IndexedCells(self))
@@ -1,7 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import io
+import json
+import os
+import shutil
+import tempfile
 import unittest
+from unittest.mock import patch
 
 from notebook_v2 import *
 
@@ -75,6 +81,260 @@ class Question19(unittest.TestCase):
         self.assertEqual("b777420a", nb.cells[1].id)
         self.assertEqual("a23ab5ac", nb.cells[2].id)
 
+class StreamingPyPercentLoader(unittest.TestCase):
+    def test_markers_and_attributes(self):
+        text = (
+            "import os\n"
+            "\n"
+            "# %% [markdown] id=\"a9541506\"\n"
+            "# Hello world!\n"
+            "#\n"
+            "# Print `Hello world!`:\n"
+            "\n"
+            "# %% Greetings [python] tags=[\"hello\", \"world\"]\n"
+            "print(\"Hello world!\")\n"
+            "# %%%\n"
+        )
+        self.assertEqual([
+            ("code", {}, ["import os"]),
+            ("markdown", {"id": "a9541506"}, ["Hello world!\n", "\n", "Print `Hello world!`:"]),
+            ("python", {"tags": ["hello", "world"], "title": "Greetings"}, ["print(\"Hello world!\")\n", "# %%%"]),
+        ], list(tokenize_py_percent(io.StringIO(text))))
+
+    def test_iterator_is_lazy(self):
+        def lines():
+            yield "# %%\n"
+            yield "print(1)\n"
+            yield "# %% [markdown]\n"
+            raise AssertionError("read too far")
+        cell = next(iter(PyPercentLoader(lines())))
+        self.assertIsInstance(cell, CodeCell)
+        self.assertEqual(["print(1)"], cell.source)
+
+    def test_round_trip(self):
+        ipynb = n0.load_ipynb("samples/hello-world.ipynb")
+        nb = PyPercentLoader(io.StringIO(n0.to_percent(ipynb))).load()
+        self.assertEqual("4.5", nb.version)
+        self.assertEqual([cell["source"] for cell in ipynb["cells"]], [cell.source for cell in nb])
+        self.assertEqual([MarkdownCell, CodeCell, MarkdownCell], [type(cell) for cell in nb])
+
+    def test_empty_file(self):
+        self.assertEqual([], PyPercentLoader(io.StringIO("")).load().cells)
+
+class Pipelines(unittest.TestCase):
+    def test_stages_are_fused_and_lazy(self):
+        calls = []
+        def source():
+            for cell in NotebookLoader("samples/hello-world.ipynb"):
+                calls.append(("read", cell.id))
+                yield cell
+        def trace(cell):
+            calls.append(("map", cell.id))
+            return cell
+        cells = iter(pipeline(source(), "4.5").map(trace).remove_markdown().markdownize())
+        self.assertEqual([], calls)
+        cell = next(cells)
+        self.assertEqual([("read", "a9541506"), ("map", "a9541506"), ("read", "b777420a"), ("map", "b777420a")], calls)
+        self.assertIsInstance(cell, MarkdownCell)
+        self.assertEqual(["```python\n", 'print("Hello world!")', "\n```"], cell.source)
+
+    def test_pipelines_are_immutable(self):
+        nb = NotebookLoader("samples/hello-world.ipynb").load()
+        p = pipeline(nb)
+        self.assertEqual(1, len(p.remove_markdown().collect().cells))
+        self.assertEqual(3, len(p.collect().cells))
+
+    def test_same_as_markdownizer_and_markdown_lesser(self):
+        nb = NotebookLoader("samples/hello-world.ipynb").load()
+        for expected, p in [
+            (Markdownizer(nb).markdownize(), pipeline(nb).markdownize()),
+            (MarkdownLesser(nb).remove_markdown_cells(), pipeline(nb).remove_markdown()),
+        ]:
+            self.assertEqual([to_dict(cell) for cell in expected], [to_dict(cell) for cell in p])
+
+    def test_streaming_file_to_file(self):
+        filename = "samples/hello-world-save-load.ipynb"
+        try:
+            pipeline(NotebookLoader("samples/metadata.ipynb")).filter(lambda cell: cell.source).to_file(filename)
+            self.assertEqual(n0.load_header("samples/metadata.ipynb"), n0.load_header(filename))
+            text = io.StringIO()
+            pipeline(NotebookLoader(filename)).to_percent(text)
+            self.assertEqual(n0.to_percent(n0.load_ipynb(filename, cache=False)), text.getvalue())
+        finally:
+            os.remove(filename)
+
+    def test_outputs_and_metadata_are_kept(self):
+        source, filename = "samples/images-tags-save-load.ipynb", "samples/images-save-load.ipynb"
+        ipynb = n0.load_ipynb("samples/images.ipynb", cache=False)
+        for cell in ipynb["cells"]:
+            cell["metadata"]["tags"] = [cell["cell_type"]]
+        n0.save_ipynb(ipynb, source)
+        try:
+            pipeline(NotebookLoader(source)).to_file(filename)
+            self.assertEqual(ipynb, n0.load_ipynb(filename, cache=False))
+            pipeline(NotebookLoader(source)).markdownize().to_file(filename)
+            cells = n0.load_ipynb(filename, cache=False)["cells"]
+            self.assertEqual([{}] * 4, [cell["metadata"] for cell in cells])
+            self.assertNotIn("outputs", cells[3])
+            # Les cellules d'un Notebook n'ont ni sorties ni métadonnées.
+            pipeline(NotebookLoader("samples/images.ipynb").load()).to_file(filename)
+            self.assertEqual([], n0.load_ipynb(filename, cache=False)["cells"][3]["outputs"])
+        finally:
+            os.remove(source)
+            os.remove(filename)
+
+class NotebookViews(unittest.TestCase):
+    def setUp(self):
+        self.nb = NotebookLoader("samples/hello-world.ipynb").load()
+
+    def test_views_share_cells(self):
+        views = [self.nb.view(), self.nb.view(None, None, -1), self.nb.view_by_type(CodeCell), self.nb.view_by_ids(["b777420a"])]
+        self.assertEqual([3, 3, 1, 1], [len(view.cells) for view in views])
+        self.assertIs(self.nb.cells[2], views[1].cells[0])
+        self.assertIs(self.nb.cells[1], views[2].cells[0])
+        self.assertIs(self.nb.cells[1], views[3].cells[0])
+        self.assertEqual("4.5", views[0].version)
+
+    def test_views_of_views(self):
+        view = self.nb.view_by_type(MarkdownCell).view(1)
+        self.assertEqual(["a23ab5ac"], [cell.id for cell in view])
+        self.assertIs(self.nb.cells, view.cells.base)
+
+    def test_copy_on_write(self):
+        view = self.nb.view_by_type(MarkdownCell)
+        view.cells.append(CodeCell("c0ffee00", ["1 + 1"], None))
+        view.cells[0] = MarkdownCell("a9541506", ["Bonjour !"])
+        self.assertTrue(view.cells.copied)
+        self.assertEqual(["a9541506", "a23ab5ac", "c0ffee00"], [cell.id for cell in view])
+        self.assertEqual(["a9541506", "b777420a", "a23ab5ac"], [cell.id for cell in self.nb])
+        self.assertEqual(["Hello world!\n", "============\n", "Print `Hello world!`:"], self.nb.cells[0].source)
+        self.assertEqual(["a23ab5ac", "c0ffee00"], [cell.id for cell in view.view(1)])
+
+    def test_base_changes(self):
+        view = self.nb.view_by_type(CodeCell)
+        nested = self.nb.view().view(1)
+        self.nb.cells.insert(0, MarkdownCell("c0ffee00", ["# Title"]))
+        self.assertEqual(["b777420a"], [cell.id for cell in view])
+        self.assertEqual(["b777420a", "a23ab5ac"], [cell.id for cell in nested])
+        self.assertTrue(view.cells.copied)
+
+        copied = self.nb.view_by_type(MarkdownCell)
+        copied.cells.append(CodeCell("c0ffee01", [], None))
+        nested = copied.view(1)
+        del copied.cells[0]
+        self.assertEqual(["a9541506", "a23ab5ac", "c0ffee01"], [cell.id for cell in nested])
+
+    def test_views_of_lists(self):
+        nb = Notebook("4.5", list(self.nb.cells))
+        view = nb.view(1)
+        nb.cells.insert(0, MarkdownCell("c0ffee00", ["# Title"]))
+        self.assertEqual(["b777420a", "a23ab5ac"], [cell.id for cell in view])
+
+    def test_mapped_notebook_views(self):
+        with MappedNotebook("samples/hello-world.ipynb") as nb:
+            self.assertEqual(["b777420a"], [cell.id for cell in nb.view_by_type(CodeCell)])
+
+class NotebookIndexes(unittest.TestCase):
+    def test_lookups(self):
+        nb = NotebookLoader("samples/hello-world.ipynb").load()
+        nb.cells.insert(0, CodeCell("c0ffee00", ["1 + 1"], 1))
+        self.assertIs(nb.cells[2], nb.by_id("b777420a"))
+        self.assertEqual([1, 3], list(nb.positions(MarkdownCell)))
+        self.assertCountEqual(["c0ffee00", "b777420a"], [cell.id for cell in nb.by_execution_count(1)])
+        self.assertEqual(["a9541506", "a23ab5ac"], [cell.id for cell in nb.view_by_type(MarkdownCell)])
+
+    def test_lookups_in_views(self):
+        nb = NotebookLoader("samples/hello-world.ipynb").load()
+        view = nb.view(1)
+        self.assertEqual([1], list(view.positions(MarkdownCell)))
+        self.assertIs(nb.cells[1], view.by_id("b777420a"))
+        with self.assertRaises(KeyError):
+            view.by_id("a9541506")
+        self.assertIsInstance(view.cells, type(nb.view().cells))
+        self.assertFalse(view.cells.copied)
+
+    def test_lookups_in_lists(self):
+        cells = list(NotebookLoader("samples/hello-world.ipynb"))
+        nb = Notebook("4.5", cells)
+        self.assertIs(cells[1], nb.by_id("b777420a"))
+        self.assertIsInstance(nb.cells, list)
+        nb.cells.append(CodeCell("c0ffee00", ["1 + 1"], 2))
+        self.assertEqual([1, 3], list(nb.positions(CodeCell)))
+        self.assertIs(nb.cells[3], nb.by_id("c0ffee00"))
+        nb.cells[0] = MarkdownCell("deadbeef", ["# Title"])
+        self.assertIs(nb.cells[0], nb.by_id("deadbeef"))
+        with self.assertRaises(KeyError):
+            nb.by_id("a9541506")
+        nb.cells = [nb.cells[1]]
+        self.assertIs(nb.cells[0], nb.by_id("b777420a"))
+
+    def test_lookups_in_other_sequences(self):
+        cells = tuple(NotebookLoader("samples/hello-world.ipynb"))
+        nb = Notebook("4.5", cells)
+        self.assertIs(cells, nb.cells)
+        self.assertIs(cells[1], nb.by_id("b777420a"))
+        self.assertEqual([1], list(nb.positions(CodeCell)))
+
+    def test_lookups_in_mapped_notebooks(self):
+        with MappedNotebook("samples/hello-world.ipynb") as nb:
+            with patch("notebook_v2.to_cell", side_effect=AssertionError("decoded")):
+                self.assertEqual([0, 2], list(nb.positions(MarkdownCell)))
+                self.assertEqual([], nb.by_execution_count(2))
+                view = nb.view_by_ids(["b777420a", "missing"])
+            self.assertEqual(["b777420a"], [cell.id for cell in view])
+            self.assertEqual(["b777420a"], [cell.id for cell in nb.by_execution_count(1)])
+            self.assertNotIsInstance(nb.cells, list)
+
+class MappedNotebookIndex(unittest.TestCase):
+    def test_random_access(self):
+        nb = NotebookLoader("samples/hello-world.ipynb").load()
+        with NotebookLoader("samples/hello-world.ipynb").map() as mapped:
+            self.assertEqual("4.5", mapped.version)
+            self.assertEqual(3, len(mapped))
+            self.assertEqual([cell.id for cell in nb], [cell.id for cell in mapped])
+            self.assertIsInstance(mapped[1], CodeCell)
+            self.assertEqual(nb.cells[2].source, mapped[-1].source)
+            self.assertEqual(nb.cells[0].source, mapped.by_id("a9541506").source)
+            with self.assertRaises(KeyError):
+                mapped.by_id("missing")
+
+    def test_sidecar_index(self):
+        try:
+            with MappedNotebook("samples/errors.ipynb", "samples/errors.ipynb.index") as mapped:
+                offsets = mapped.cells.offsets
+            self.assertTrue(os.path.exists("samples/errors.ipynb.index"))
+            with MappedNotebook("samples/errors.ipynb", "samples/errors.ipynb.index") as mapped:
+                self.assertEqual(offsets, mapped.cells.offsets)
+                self.assertEqual(['raise Warning("🌧️  light rain")'], mapped[1].source)
+        finally:
+            os.remove("samples/errors.ipynb.index")
+
+    def test_corrupt_sidecar_index(self):
+        with tempfile.TemporaryDirectory() as directory:
+            index_filename = os.path.join(directory, "errors.ipynb.index")
+            for content in ['{"version": "4.5", "cells": [[0, ', '{"version": "4.5"}', '{"size": 1, "mtime_ns": 2, "cells": [3]}']:
+                with open(index_filename, "w") as f:
+                    f.write(content)
+                with MappedNotebook("samples/errors.ipynb", index_filename) as mapped:
+                    self.assertEqual(['raise Warning("🌧️  light rain")'], mapped[1].source)
+                with open(index_filename) as f:
+                    self.assertEqual(2, len(json.load(f)["cells"]))
+
+    def test_recently_modified_notebook(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename, index_filename = os.path.join(directory, "minimal.ipynb"), os.path.join(directory, "minimal.ipynb.index")
+            shutil.copy("samples/hello-world.ipynb", filename)
+            mtime_ns = os.stat(filename).st_mtime_ns
+            with MappedNotebook(filename, index_filename) as mapped:
+                self.assertEqual(3, len(mapped))
+            self.assertFalse(os.path.exists(index_filename))
+            # Même taille, même date : seul le contenu permet de voir que le notebook a changé.
+            with open(filename, "r+b") as f:
+                f.write(b'{"cells": [], "metadata": {}, "nbformat": 4, "nbformat_minor": 5}'.ljust(os.path.getsize(filename)))
+            os.utime(filename, ns=(mtime_ns, mtime_ns))
+            with MappedNotebook(filename, index_filename) as mapped:
+                self.assertEqual(0, len(mapped))
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
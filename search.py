@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+full-text search of the cells of jupyter notebooks, through an on-disk inverted index
+
+Usage:
+
+    python search.py notebooks --update
+    python search.py notebooks "hello world" --index notebooks.index --limit 20
+"""
+
+# Python Standard Library
+import argparse
+import concurrent.futures
+import functools
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import convert
+import notebook_v0 as n0
+import sync
+
+INDEX_NAME = ".notebook-index.sqlite"
+
+_WORD = re.compile(r"\w+")
+_MAX_VARIABLES = 999 # Le nombre de paramètres d'une requête SQLite est limité.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notebooks (
+    id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, size INTEGER, mtime_ns INTEGER, hash TEXT
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL, notebook INTEGER NOT NULL, cells TEXT NOT NULL, PRIMARY KEY (term, notebook)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_notebook ON postings (notebook);
+"""
+
+
+def tokenize(text: str) -> set:
+    r"""Return the (lowercase) words of a text.
+
+    Usage:
+
+        >>> sorted(tokenize('print("Hello world!") # hello'))
+        ['hello', 'print', 'world']
+    """
+    return set(_WORD.findall(text.lower()))
+
+
+def cell_terms(cell: dict) -> set:
+    r"""Return the words of the source and of the stream outputs of a cell (dict)."""
+    terms = tokenize("".join(cell["source"]))
+    for output in cell.get("outputs", ()):
+        if output.get("output_type") == "stream":
+            terms |= tokenize("".join(output["text"]))
+    return terms
+
+
+def index_file(filename: str, cache: bool = True) -> tuple:
+    r"""Return the postings of a notebook file: each word with the ids of the cells where it appears.
+
+    The ids are separated by spaces (which they may not contain). The cells
+    without an id (before nbformat 4.5) are named after their position, as
+    the py-percent cells of `notebook_v2.PyPercentLoader`.
+
+    Returns:
+        tuple: the file name, the (word, cell ids) pairs and the error message (None on success).
+
+    Usage:
+
+        >>> sorted(index_file("samples/hello-world.ipynb", cache=False)[1])[:3]
+        [('goodbye', 'a23ab5ac'), ('hello', 'a9541506 b777420a'), ('print', 'a9541506 b777420a')]
+    """
+    postings = {}
+    try:
+        for index, cell in enumerate(n0.get_cells(n0.load_ipynb(filename, cache=cache))):
+            cell_id = cell.get("id") or f"{index:08x}"
+            for term in cell_terms(cell):
+                postings.setdefault(term, []).append(cell_id)
+    except Exception as error: # Une erreur ne doit pas interrompre l'indexation des autres notebooks.
+        return filename, [], f"{type(error).__name__}: {error}"
+    return filename, [(term, " ".join(cell_ids)) for term, cell_ids in postings.items()], None
+
+
+def _index_files(filenames: list, workers=None, cache=True):
+    # Les notebooks sont lus et découpés en mots en parallèle ; seule l'écriture de l'index reste séquentielle.
+    function = functools.partial(index_file, cache=cache)
+    if len(filenames) == 1 or workers == 1:
+        yield from map(function, filenames)
+        return
+    workers = workers or os.cpu_count()
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        yield from executor.map(function, filenames, chunksize=max(1, len(filenames) // (4 * workers)))
+
+
+class Index:
+    r"""An inverted index of the words of the cells of a corpus of notebooks, stored in an SQLite file.
+
+    The postings map each word and notebook to the ids of the cells where
+    the word appears, in their source or in their stream outputs. `update`
+    only reads again the notebooks which changed since the last update (see
+    `sync.sync`, which tracks changes the same way).
+
+    Args:
+        filename (str): the index file (created if needed).
+
+    Usage:
+
+        >>> with Index(":memory:") as index:
+        ...     _ = index.update(["samples/hello-world.ipynb"], workers=1, verbose=False)
+        ...     index.query("Hello WORLD")
+        [('samples/hello-world.ipynb', 'a9541506'), ('samples/hello-world.ipynb', 'b777420a')]
+    """
+
+    def __init__(self, filename: str = INDEX_NAME):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(_SCHEMA)
+
+    def update(self, paths: list, workers=None, cache=True, verbose=True) -> dict:
+        r"""Index the notebooks found in `paths` (see `convert.find_notebooks`) which changed since the last update.
+
+        The notebooks indexed before but no longer found are removed from the index.
+
+        Returns:
+            dict: the update statistics (indexed, unchanged, deleted, failures, duration).
+        """
+        start = time.perf_counter()
+        stats = {"indexed": 0, "unchanged": 0, "deleted": 0, "failures": 0}
+        entries = {path: (id, size, mtime_ns, hash) for id, path, size, mtime_ns, hash in self.connection.execute(
+            "SELECT id, path, size, mtime_ns, hash FROM notebooks"
+        )}
+        changed = {}
+        with self.connection:
+            for source in dict.fromkeys(source for source, _ in convert.find_notebooks(paths)):
+                entry = entries.pop(source, None)
+                stat = os.stat(source)
+                if entry is not None and (entry[1], entry[2]) == (stat.st_size, stat.st_mtime_ns):
+                    stats["unchanged"] += 1
+                    continue
+                digest = sync.file_digest(source)
+                if entry is not None and digest == entry[3]: # Le fichier a été touché, mais son contenu n'a pas changé.
+                    self.connection.execute(
+                        "UPDATE notebooks SET size = ?, mtime_ns = ? WHERE id = ?", (stat.st_size, n0.trusted_mtime(stat), entry[0])
+                    )
+                    stats["unchanged"] += 1
+                    continue
+                changed[source] = (None if entry is None else entry[0], stat.st_size, n0.trusted_mtime(stat), digest)
+
+            # Les notebooks qui restent dans l'index ont disparu : leurs postings aussi doivent disparaître.
+            for id, *_ in entries.values():
+                self._remove(id)
+                stats["deleted"] += 1
+
+            for source, postings, error in _index_files(list(changed), workers, cache):
+                id, size, mtime_ns, digest = changed[source]
+                if error is not None: # Le notebook sera de nouveau indexé à la prochaine mise à jour.
+                    if id is not None:
+                        self._remove(id)
+                    stats["failures"] += 1
+                    print(f"FAILED {source}: {error}", file=sys.stderr)
+                    continue
+                # Ni UPSERT ni RETURNING : ils demandent une version récente de SQLite (3.24 et 3.35).
+                if id is None:
+                    id = self.connection.execute(
+                        "INSERT INTO notebooks (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)", (source, size, mtime_ns, digest)
+                    ).lastrowid
+                else:
+                    self.connection.execute("DELETE FROM postings WHERE notebook = ?", (id,))
+                    self.connection.execute(
+                        "UPDATE notebooks SET size = ?, mtime_ns = ?, hash = ? WHERE id = ?", (size, mtime_ns, digest, id)
+                    )
+                self.connection.executemany(
+                    "INSERT INTO postings VALUES (?, ?, ?)", ((term, id, cell_ids) for term, cell_ids in postings)
+                )
+                stats["indexed"] += 1
+        stats["duration"] = time.perf_counter() - start
+        if verbose:
+            print(
+                f"{stats['indexed']} indexed, {stats['unchanged']} unchanged, {stats['deleted']} deleted, "
+                f"{stats['failures']} failures in {stats['duration']:.2f} s"
+            )
+        return stats
+
+    def _remove(self, id: int):
+        self.connection.execute("DELETE FROM postings WHERE notebook = ?", (id,))
+        self.connection.execute("DELETE FROM notebooks WHERE id = ?", (id,))
+
+    def query(self, text: str, limit=None) -> list:
+        r"""Return the (notebook, cell id) pairs of the cells containing all the words of `text`, sorted.
+
+        Usage:
+
+            >>> with Index(":memory:") as index:
+            ...     _ = index.update(["samples/hello-world.ipynb", "samples/minimal.ipynb"], workers=1, verbose=False)
+            ...     index.query("goodbye"), index.query("goodbye hello"), index.query("")
+            ([('samples/hello-world.ipynb', 'a23ab5ac')], [], [])
+        """
+        matches = None # notebook -> identifiants des cellules qui contiennent tous les mots vus jusqu'ici
+        # On commence par le mot le plus rare : les suivants ne sont cherchés que dans les notebooks qui restent.
+        for term in sorted(tokenize(text), key=self._frequency):
+            if matches is None or len(matches) > _MAX_VARIABLES:
+                rows = self.connection.execute("SELECT notebook, cells FROM postings WHERE term = ?", (term,))
+            else:
+                rows = self.connection.execute(
+                    f"SELECT notebook, cells FROM postings WHERE term = ? AND notebook IN ({', '.join('?' * len(matches))})",
+                    (term, *matches),
+                )
+            postings = {notebook: set(cells.split()) for notebook, cells in rows}
+            if matches is not None:
+                postings = {notebook: cells & matches[notebook] for notebook, cells in postings.items() if notebook in matches}
+            matches = {notebook: cells for notebook, cells in postings.items() if cells}
+            if not matches:
+                break
+        paths = {}
+        notebooks = list(matches or ())
+        for start in range(0, len(notebooks), _MAX_VARIABLES):
+            chunk = notebooks[start:start + _MAX_VARIABLES]
+            paths.update(self.connection.execute(f"SELECT id, path FROM notebooks WHERE id IN ({', '.join('?' * len(chunk))})", chunk))
+        results = sorted((paths[notebook], cell_id) for notebook, cells in (matches or {}).items() for cell_id in cells)
+        return results if limit is None else results[:limit]
+
+    def _frequency(self, term: str) -> int:
+        # Le nombre de notebooks qui contiennent le mot, compté jusqu'à une limite pour rester rapide.
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM postings WHERE term = ? LIMIT ?)", (term, _MAX_VARIABLES)
+        ).fetchone()[0]
+
+    def __len__(self):
+        r"""Return the number of indexed notebooks."""
+        return self.connection.execute("SELECT COUNT(*) FROM notebooks").fetchone()[0]
+
+    def close(self):
+        r"""Close the index file."""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="notebook files, directories or glob patterns, then the words to search")
+    parser.add_argument("--index", default=INDEX_NAME, help=f"the index file (default: {INDEX_NAME})")
+    parser.add_argument("--update", action="store_true", help="update the index with the given paths (no search)")
+    parser.add_argument("--limit", type=int, help="maximal number of cells to print")
+    parser.add_argument("--workers", type=int, help="number of processes (default: number of CPUs)")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="do not use the parse cache")
+    args = parser.parse_args(argv)
+    with Index(args.index) as index:
+        if args.update:
+            stats = index.update(args.paths, args.workers, args.cache)
+            return 1 if stats["failures"] else 0
+        *paths, text = args.paths
+        if paths:
+            index.update(paths, args.workers, args.cache, verbose=False)
+        start = time.perf_counter()
+        results = index.query(text, args.limit)
+        for path, cell_id in results:
+            print(f"{path}#{cell_id}")
+        print(f"{len(results)} cells in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
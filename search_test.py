@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from search import *
+
+
+class Search(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.environment = patch.dict(os.environ, {"NOTEBOOK_CACHE_DIR": os.path.join(self.directory.name, "cache")})
+        self.environment.start()
+        self.notebooks = os.path.join(self.directory.name, "notebooks")
+        shutil.copytree("samples", self.notebooks, ignore=shutil.ignore_patterns("*.py", "*.html", "hello-world-*"))
+        self.files = len([name for name in os.listdir(self.notebooks) if name.endswith(".ipynb")])
+        self.index = Index(os.path.join(self.directory.name, INDEX_NAME))
+
+    def tearDown(self):
+        self.index.close()
+        self.environment.stop()
+        self.directory.cleanup()
+
+    def update(self):
+        return self.index.update([self.notebooks], workers=1, verbose=False)
+
+    def path(self, name):
+        return os.path.join(self.notebooks, name)
+
+    def test_query(self):
+        self.assertEqual(self.files, self.update()["indexed"])
+        self.assertEqual([(self.path("hello-world.ipynb"), "a23ab5ac")], self.index.query("Goodbye"))
+        self.assertEqual(
+            [(self.path("hello-world.ipynb"), "a9541506"), (self.path("hello-world.ipynb"), "b777420a"), (self.path("streams.ipynb"), "00000000")],
+            self.index.query("print hello"),
+        )
+        self.assertIn((self.path("streams.ipynb"), self.index.query("fine")[0][1]), self.index.query("this is fine"))
+        self.assertEqual([], self.index.query("goodbye print"))
+        self.assertEqual(1, len(self.index.query("hello", limit=1)))
+
+    def test_incremental_update(self):
+        self.update()
+        self.assertEqual((0, self.files), (self.update()["indexed"], self.update()["unchanged"]))
+        filename = self.path("hello-world.ipynb")
+        ipynb = n0.load_ipynb(filename, cache=False)
+        ipynb["cells"][2]["source"] = ["Au revoir !"]
+        n0.save_ipynb(ipynb, filename)
+        stats = self.update()
+        self.assertEqual((1, self.files - 1), (stats["indexed"], stats["unchanged"]))
+        self.assertEqual([], self.index.query("goodbye"))
+        self.assertEqual([(filename, "a23ab5ac")], self.index.query("revoir"))
+
+    def test_touched_notebooks_are_not_indexed(self):
+        self.update()
+        os.utime(self.path("minimal.ipynb"), ns=(0, 0))
+        self.assertEqual(0, self.update()["indexed"])
+
+    def test_deletions_are_propagated(self):
+        self.update()
+        os.remove(self.path("hello-world.ipynb"))
+        self.assertEqual(1, self.update()["deleted"])
+        self.assertEqual([], self.index.query("goodbye"))
+        self.assertEqual(self.files - 1, len(self.index))
+
+    def test_broken_notebooks_are_removed(self):
+        self.update()
+        with open(self.path("hello-world.ipynb"), "w") as f:
+            f.write('{"cells": [')
+        with patch("sys.stderr"):
+            self.assertEqual(1, self.update()["failures"])
+        self.assertEqual([], self.index.query("goodbye"))
+        self.assertEqual(self.files - 1, len(self.index))
+
+    def test_persistence(self):
+        self.update()
+        self.index.close()
+        self.index = Index(self.index.filename)
+        self.assertEqual([(self.path("hello-world.ipynb"), "a23ab5ac")], self.index.query("goodbye"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+profile of the sizes of the cells of jupyter notebooks, to find the ones which bloat them
+
+Usage:
+
+    python sizes.py notebooks --top 10
+    python sizes.py "notebooks/**/*.ipynb" --corpus-only --workers 4
+"""
+
+# Python Standard Library
+import argparse
+import collections
+import concurrent.futures
+import functools
+import heapq
+import os
+import sys
+import time
+
+import convert
+import notebook_v0 as n0
+
+
+def profile_file(filename: str, top: int = 10) -> tuple:
+    r"""Profile the sizes of the cells of a notebook file (see `n0.iter_cell_sizes`), in one streamed pass.
+
+    Only the current cell and the `top` largest ones are kept in memory, so
+    that notebooks too large to be loaded can be profiled.
+
+    Returns:
+        tuple: the file name, the number of cells, the total sizes (by kind of
+        content), the `top` largest cells, as (size, cell id, sizes) triples
+        sorted by decreasing size, and the error message (None on success).
+
+    Usage:
+
+        >>> filename, cells, totals, largest, error = profile_file("samples/images.ipynb", top=2)
+        >>> cells, totals["image/png"], largest
+        (4, 611120, [(611217, '00000003', {'source': 34, 'image/png': 611120, 'text/plain': 63}), (1026, '00000002', {'source': 11, 'text/plain': 1015})])
+    """
+    totals, cells = collections.Counter(), 0
+    def profiles():
+        nonlocal cells
+        for cells, (cell_id, sizes) in enumerate(n0.iter_cell_sizes(n0.iter_cells(filename)), 1):
+            totals.update(sizes)
+            yield sum(sizes.values()), cell_id, sizes
+    try:
+        largest = heapq.nlargest(top, profiles(), key=lambda profile: profile[0])
+    except Exception as error: # Une erreur ne doit pas interrompre l'analyse des autres notebooks.
+        return filename, 0, {}, [], f"{type(error).__name__}: {error}"
+    return filename, cells, dict(totals), largest, None
+
+
+def _profile_files(notebooks: list, top: int, workers=None):
+    function = functools.partial(profile_file, top=top)
+    if len(notebooks) <= 1 or workers == 1:
+        yield from map(function, notebooks)
+        return
+    workers = workers or os.cpu_count()
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        yield from executor.map(function, notebooks, chunksize=max(1, len(notebooks) // (4 * workers)))
+
+
+def profile(paths: list, top: int = 10, workers=None) -> dict:
+    r"""Profile the sizes of the cells of the notebooks found in `paths` (see `convert.find_notebooks`), in parallel.
+
+    The largest cells of the corpus are among the largest of their
+    notebook: only those are sent back by the processes.
+
+    Returns:
+        dict: the notebooks, as (file name, cells, total sizes, largest cells)
+        tuples, the `top` largest cells of the corpus, as (size, notebook
+        index, cell id, sizes) tuples, the total sizes, the number of
+        failures and the duration.
+
+    Usage:
+
+        >>> report = profile(["samples/errors.ipynb", "samples/hello-world.ipynb"], top=2, workers=1)
+        >>> report["totals"]
+        {'source': 124, 'traceback': 841, 'stream': 13}
+        >>> [(size, report["notebooks"][notebook][0], cell_id) for size, notebook, cell_id, _ in report["largest"]]
+        [(464, 'samples/errors.ipynb', '00000001'), (420, 'samples/errors.ipynb', '00000000')]
+    """
+    start = time.perf_counter()
+    report = {"notebooks": [], "largest": [], "totals": collections.Counter(), "failures": 0}
+    for source, cells, totals, largest, error in _profile_files([source for source, _ in convert.find_notebooks(paths)], top, workers):
+        if error is not None:
+            report["failures"] += 1
+            print(f"FAILED {source}: {error}", file=sys.stderr)
+            continue
+        notebook = len(report["notebooks"])
+        report["notebooks"].append((source, cells, totals, largest))
+        report["totals"].update(totals)
+        # Un tas borné : la mémoire ne dépend pas du nombre de notebooks.
+        # À taille égale, les premiers notebooks (puis les premières cellules) passent devant.
+        for rank, (size, cell_id, sizes) in enumerate(largest):
+            heapq.heappush(report["largest"], (size, -notebook, -rank, cell_id, sizes))
+            if len(report["largest"]) > top:
+                heapq.heappop(report["largest"])
+    report["largest"] = [(size, -notebook, cell_id, sizes) for size, notebook, _, cell_id, sizes in sorted(report["largest"], reverse=True)]
+    report["totals"] = dict(report["totals"])
+    report["duration"] = time.perf_counter() - start
+    return report
+
+
+def format_size(size: int) -> str:
+    r"""Return a size in bytes in a human-readable form.
+
+    Usage:
+
+        >>> format_size(13), format_size(611120), format_size(3 * 2 ** 30)
+        ('13 B', '596.8 KiB', '3.0 GiB')
+    """
+    for unit in ["B", "KiB", "MiB"]:
+        if size < 1024:
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _breakdown(sizes: dict) -> str:
+    return ", ".join(f"{kind} {format_size(size)}" for kind, size in sorted(sizes.items(), key=lambda item: -item[1]))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="notebook files, directories or glob patterns")
+    parser.add_argument("--top", type=int, default=10, help="number of cells to print, per notebook and for the corpus (default: 10)")
+    parser.add_argument("--corpus-only", action="store_true", help="do not print the largest cells of each notebook")
+    parser.add_argument("--workers", type=int, help="number of processes (default: number of CPUs)")
+    args = parser.parse_args(argv)
+    report = profile(args.paths, args.top, args.workers)
+    if not args.corpus_only:
+        for source, cells, totals, largest in report["notebooks"]:
+            print(f"{source}: {cells} cells, {format_size(sum(totals.values()))} ({_breakdown(totals)})")
+            for size, cell_id, sizes in largest:
+                print(f"{format_size(size):>12} {cell_id} ({_breakdown(sizes)})")
+    cells = sum(cells for _, cells, _, _ in report["notebooks"])
+    print(
+        f"{len(report['notebooks'])} notebooks, {cells} cells, {format_size(sum(report['totals'].values()))} "
+        f"({_breakdown(report['totals'])}), {report['failures']} failures in {report['duration']:.2f} s"
+    )
+    for size, notebook, cell_id, sizes in report["largest"]:
+        print(f"{format_size(size):>12} {report['notebooks'][notebook][0]}#{cell_id} ({_breakdown(sizes)})")
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
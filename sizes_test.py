@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from sizes import *
+
+
+class Profiling(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.notebooks = os.path.join(self.directory.name, "notebooks")
+        shutil.copytree("samples", self.notebooks, ignore=shutil.ignore_patterns("*.py", "*.html", "hello-world-*", "__pycache__"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_sizes_of_a_loaded_notebook(self):
+        filename = os.path.join(self.notebooks, "images.ipynb")
+        _, cells, totals, largest, error = profile_file(filename, top=100)
+        ipynb = n0.load_ipynb(filename, cache=False)
+        self.assertIsNone(error)
+        self.assertEqual(len(ipynb["cells"]), cells)
+        self.assertEqual(len("".join(n0.iter_png_data(ipynb))), totals["image/png"])
+        self.assertEqual(sum(totals.values()), sum(size for size, _, _ in largest))
+        self.assertEqual(sorted(largest, key=lambda profile: -profile[0]), largest)
+
+    def test_notebooks_are_not_loaded(self):
+        with mock.patch.object(n0, "load_ipynb", side_effect=AssertionError("loaded")):
+            self.assertIsNone(profile_file(os.path.join(self.notebooks, "errors.ipynb"))[-1])
+
+    def test_corpus_top(self):
+        report = profile([self.notebooks], top=3, workers=2)
+        everything = sorted(
+            (size, notebook, cell_id)
+            for notebook, (_, _, _, largest) in enumerate(profile([self.notebooks], top=1000, workers=1)["notebooks"])
+            for size, cell_id, _ in largest
+        )
+        self.assertEqual(
+            [size for size, _, _ in everything[::-1][:3]],
+            [size for size, _, _, _ in report["largest"]],
+        )
+        self.assertEqual(
+            sum(report["totals"].values()),
+            sum(sum(totals.values()) for _, _, totals, _ in report["notebooks"]),
+        )
+
+    def test_failures(self):
+        with open(os.path.join(self.notebooks, "broken.ipynb"), "w") as f:
+            f.write('{"cells": [{"cell_type": "code", ')
+        with mock.patch("sys.stderr"):
+            report = profile([self.notebooks], workers=1)
+        self.assertEqual(1, report["failures"])
+        self.assertNotIn("broken.ipynb", [os.path.basename(source) for source, _, _, _ in report["notebooks"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+removal of the outputs and execution counts of jupyter notebook files, in place (e.g. as a pre-commit hook)
+
+Usage:
+
+    python strip.py notebooks
+    python strip.py "notebooks/**/*.ipynb" --workers 4
+"""
+
+# Python Standard Library
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+
+import convert
+import notebook_v0 as n0
+
+
+def strip_file(filename: str) -> tuple:
+    r"""Strip a notebook file in place (see `n0.strip_outputs`).
+
+    Returns:
+        tuple: the file name, its size, whether it was modified and the error message (None on success).
+    """
+    try:
+        size = os.path.getsize(filename)
+        return filename, size, n0.strip_outputs(filename), None
+    except Exception as error: # Une erreur ne doit pas interrompre le nettoyage des autres notebooks.
+        return filename, 0, False, f"{type(error).__name__}: {error}"
+
+
+def _strip_files(notebooks: list, workers=None):
+    if len(notebooks) <= 1 or workers == 1:
+        yield from map(strip_file, notebooks)
+        return
+    workers = workers or os.cpu_count()
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        yield from executor.map(strip_file, notebooks, chunksize=max(1, len(notebooks) // (4 * workers)))
+
+
+def strip(paths: list, workers=None, verbose=True) -> dict:
+    r"""Strip the notebooks found in `paths` (see `convert.find_notebooks`); the clean ones are left untouched.
+
+    Returns:
+        dict: the statistics (files, modified, failures, bytes, duration).
+    """
+    notebooks = [source for source, _ in convert.find_notebooks(paths)]
+    stats = {"files": len(notebooks), "modified": 0, "failures": 0, "bytes": 0}
+    start = time.perf_counter()
+    for source, size, modified, error in _strip_files(notebooks, workers):
+        stats["bytes"] += size
+        stats["modified"] += modified
+        if error is not None:
+            stats["failures"] += 1
+            print(f"FAILED {source}: {error}", file=sys.stderr)
+        elif modified and verbose:
+            print(f"stripped {source}")
+    stats["duration"] = time.perf_counter() - start
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="notebook files, directories or glob patterns")
+    parser.add_argument("--workers", type=int, help="number of processes (default: number of CPUs)")
+    args = parser.parse_args(argv)
+    stats = strip(args.paths, args.workers)
+    # Comme les autres crochets de pre-commit, on échoue si un fichier a été modifié.
+    return 1 if stats["modified"] or stats["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
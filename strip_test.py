@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from strip import *
+
+
+class Stripping(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.notebooks = os.path.join(self.directory.name, "notebooks")
+        shutil.copytree("samples", self.notebooks, ignore=shutil.ignore_patterns("*.py", "*.html", "__pycache__"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.notebooks, name)
+
+    def test_same_as_clear_outputs(self):
+        for name in [name for name in os.listdir(self.notebooks) if name.endswith(".ipynb")]:
+            ipynb = n0.load_ipynb(self.path(name), cache=False)
+            n0.clear_outputs(ipynb)
+            n0.strip_outputs(self.path(name))
+            self.assertEqual(ipynb, n0.load_ipynb(self.path(name), cache=False))
+
+    def test_formatting_is_kept(self):
+        with open(self.path("images.ipynb"), encoding="utf-8") as f:
+            text = f.read()
+        self.assertTrue(n0.strip_outputs(self.path("images.ipynb")))
+        with open(self.path("images.ipynb"), encoding="utf-8") as f:
+            stripped = f.read()
+        self.assertLess(len(stripped), len(text) // 10)
+        self.assertTrue(stripped.startswith('{\n "cells": [\n  {\n   "cell_type": "code",\n   "execution_count": null,\n'))
+        self.assertEqual(text[text.rindex(' "metadata": {}'):], stripped[stripped.rindex(' "metadata": {}'):])
+        self.assertEqual(json.dumps(n0.load_ipynb(self.path("images.ipynb"), cache=False), indent=1, ensure_ascii=False) + "\n", stripped)
+
+    def test_clean_files_are_untouched(self):
+        self.assertLess(0, strip([self.notebooks], workers=1, verbose=False)["modified"])
+        os.utime(self.path("hello-world.ipynb"), ns=(0, 0))
+        stats = strip([self.notebooks], workers=1, verbose=False)
+        self.assertEqual((0, 0), (stats["modified"], stats["failures"]))
+        self.assertEqual(0, os.stat(self.path("hello-world.ipynb")).st_mtime_ns)
+
+    def test_output_file(self):
+        output = os.path.join(self.directory.name, "minimal.ipynb")
+        self.assertFalse(n0.strip_outputs(self.path("minimal.ipynb"), output))
+        self.assertEqual(n0.load_ipynb(self.path("minimal.ipynb"), cache=False), n0.load_ipynb(output, cache=False))
+
+    def test_failures(self):
+        with open(self.path("broken.ipynb"), "w") as f:
+            f.write('{"cells": [{"cell_type": "code", "outputs": [')
+        with open(self.path("broken.ipynb"), "rb") as f:
+            content = f.read()
+        with patch("sys.stderr"):
+            self.assertEqual(1, strip([self.path("broken.ipynb")], verbose=False)["failures"])
+        with open(self.path("broken.ipynb"), "rb") as f:
+            self.assertEqual(content, f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+incremental synchronization of converted copies of jupyter notebooks
+
+Usage:
+
+    python sync.py notebooks percent --output-dir mirror
+    python sync.py notebooks py-percent --output-dir mirror --watch --interval 5
+"""
+
+# Python Standard Library
+import argparse
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import sys
+import time
+
+import convert
+import notebook_v0 as n0
+
+MANIFEST_NAME = ".notebook-sync.json"
+
+
+def file_digest(filename: str) -> str:
+    r"""Return the SHA-256 (hexadecimal) of the content of a file, read by chunks."""
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(n0.CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(filename: str) -> dict:
+    r"""Load a synchronization manifest; a missing or unreadable manifest is empty (everything is rebuilt)."""
+    try:
+        with open(filename, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"format": None, "notebooks": {}}
+    return manifest
+
+
+def save_manifest(manifest: dict, filename: str):
+    r"""Save a synchronization manifest (atomically, see `n0.atomic_write`)."""
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    with n0.atomic_write(filename, encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+def _remove(filename: str) -> bool:
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _convert(jobs: list, format: str, workers=None, cache=True) -> list:
+    # Les notebooks sont convertis en parallèle comme par `convert.convert`, sauf s'il n'y en a qu'un.
+    convert_file = functools.partial(convert.convert_file, format=format, cache=cache)
+    if len(jobs) == 1 or workers == 1:
+        return list(map(convert_file, jobs))
+    workers = workers or os.cpu_count()
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(convert_file, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+
+def sync(paths: list, format: str, output_dir=None, manifest=None, workers=None, cache=True, verbose=True) -> dict:
+    r"""Convert the notebooks found in `paths` (see `convert.find_notebooks`) which changed since the last synchronization.
+
+    The manifest (by default `.notebook-sync.json` in `output_dir`) records
+    the size, modification time and content hash of each notebook. A
+    notebook is only read again when its size or modification time changed,
+    and only converted again when its content changed (or its converted
+    file is missing). The converted files of the notebooks which no longer
+    exist are removed, and so are all the previous converted files when the
+    format changes.
+
+    Returns:
+        dict: the synchronization statistics (converted, unchanged, deleted, failures, duration).
+
+    Raises:
+        ValueError: if a notebook or a converted file would be overwritten (see `convert.check_jobs`).
+    """
+    start = time.perf_counter()
+    manifest_filename = manifest or os.path.join(output_dir or ".", MANIFEST_NAME)
+    manifest = load_manifest(manifest_filename)
+    stats = {"converted": 0, "unchanged": 0, "deleted": 0, "failures": 0}
+    new_entries, jobs, changed = {}, [], False
+    entries = manifest["notebooks"]
+    if manifest["format"] != format:
+        # Les copies dans l'ancien format ne seraient plus jamais mises à jour, ni supprimées : on les supprime.
+        for entry in entries.values():
+            _remove(entry["destination"])
+        entries, changed = {}, True
+
+    targets = convert.check_jobs([(source, convert.destination(source, root, format, output_dir)) for source, root in convert.find_notebooks(paths)])
+    for source, target in targets:
+        entry = entries.pop(source, None)
+        try:
+            stat = os.stat(source)
+            if entry is not None and entry["destination"] == target and os.path.exists(target):
+                if (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                    new_entries[source] = entry
+                    stats["unchanged"] += 1
+                    continue
+                digest = file_digest(source)
+                if digest == entry["hash"]: # Le fichier a été touché, mais son contenu n'a pas changé.
+                    new_entries[source] = {**entry, "size": stat.st_size, "mtime_ns": n0.trusted_mtime(stat)}
+                    stats["unchanged"] += 1
+                    changed = True
+                    continue
+            else:
+                digest = file_digest(source)
+                if entry is not None and entry["destination"] != target:
+                    _remove(entry["destination"])
+            new_entries[source] = {"destination": target, "hash": digest, "size": stat.st_size, "mtime_ns": n0.trusted_mtime(stat)}
+            jobs.append((source, target))
+        except FileNotFoundError: # Le notebook a été supprimé depuis sa découverte : c'est une suppression.
+            if entry is not None:
+                entries[source] = entry
+
+    # Les notebooks qui restent dans l'ancien manifeste ont disparu : leurs copies aussi doivent disparaître.
+    for source, entry in entries.items():
+        stats["deleted"] += _remove(entry["destination"])
+        changed = True
+
+    for source, size, error in _convert(jobs, format, workers, cache) if jobs else []:
+        changed = True
+        if error is None:
+            stats["converted"] += 1
+        else: # Le notebook sera de nouveau converti au prochain passage.
+            stats["failures"] += 1
+            del new_entries[source]
+            print(f"FAILED {source}: {error}", file=sys.stderr)
+
+    if changed:
+        save_manifest({"format": format, "notebooks": new_entries}, manifest_filename)
+    stats["duration"] = time.perf_counter() - start
+    if verbose:
+        print(
+            f"{stats['converted']} converted, {stats['unchanged']} unchanged, {stats['deleted']} deleted, "
+            f"{stats['failures']} failures in {stats['duration']:.2f} s"
+        )
+    return stats
+
+
+def watch(paths: list, format: str, output_dir=None, interval: float = 1.0, passes=None, **options):
+    r"""Synchronize (see `sync`) every `interval` seconds, `passes` times or until interrupted.
+
+    The notebooks are polled, which works the same on every OS and file system.
+    An error during a pass is reported, and the polling goes on.
+    """
+    count = 0
+    try:
+        while passes is None or count < passes:
+            if count:
+                time.sleep(interval)
+            count += 1
+            try:
+                stats = sync(paths, format, output_dir, verbose=False, **options)
+            except (OSError, ValueError) as error: # Par exemple un répertoire supprimé : on réessaiera au prochain passage.
+                print(f"{time.strftime('%H:%M:%S')} FAILED: {type(error).__name__}: {error}", file=sys.stderr)
+                continue
+            if stats["converted"] or stats["deleted"] or stats["failures"]:
+                print(
+                    f"{time.strftime('%H:%M:%S')} {stats['converted']} converted, "
+                    f"{stats['deleted']} deleted, {stats['failures']} failures"
+                )
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="notebook files, directories or glob patterns")
+    parser.add_argument("format", choices=convert.FORMATS)
+    parser.add_argument("--output-dir", help="where to write the converted files (default: next to the notebooks)")
+    parser.add_argument("--manifest", help=f"the manifest file (default: {MANIFEST_NAME} in the output directory)")
+    parser.add_argument("--workers", type=int, help="number of processes (default: number of CPUs)")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="do not use the parse cache")
+    parser.add_argument("--watch", action="store_true", help="synchronize again until interrupted")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between two synchronizations (default: 1)")
+    args = parser.parse_args(argv)
+    options = dict(manifest=args.manifest, workers=args.workers, cache=args.cache)
+    try:
+        if args.watch:
+            watch(args.paths, args.format, args.output_dir, args.interval, **options)
+            return 0
+        stats = sync(args.paths, args.format, args.output_dir, **options)
+    except ValueError as error:
+        parser.error(str(error))
+    return 1 if stats["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sync import *
+
+
+class Synchronization(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.environment = patch.dict(os.environ, {"NOTEBOOK_CACHE_DIR": os.path.join(self.directory.name, "cache")})
+        self.environment.start()
+        self.notebooks = os.path.join(self.directory.name, "notebooks")
+        self.mirror = os.path.join(self.directory.name, "mirror")
+        shutil.copytree("samples", self.notebooks, ignore=shutil.ignore_patterns("*.py", "*.html"))
+        self.files = len([name for name in os.listdir(self.notebooks) if name.endswith(".ipynb")])
+
+    def tearDown(self):
+        self.environment.stop()
+        self.directory.cleanup()
+
+    def sync(self):
+        return sync([self.notebooks], "percent", self.mirror, workers=1, verbose=False)
+
+    def test_only_changed_notebooks_are_converted(self):
+        self.assertEqual(self.files, self.sync()["converted"])
+        self.assertEqual((0, self.files), (self.sync()["converted"], self.sync()["unchanged"]))
+
+        filename = os.path.join(self.notebooks, "hello-world.ipynb")
+        ipynb = n0.load_ipynb(filename, cache=False)
+        ipynb["cells"] = ipynb["cells"][:1]
+        n0.save_ipynb(ipynb, filename)
+        stats = self.sync()
+        self.assertEqual((1, self.files - 1), (stats["converted"], stats["unchanged"]))
+        with open(os.path.join(self.mirror, "hello-world.py"), encoding="utf-8") as f:
+            self.assertEqual(n0.to_percent(ipynb), f.read())
+
+    def test_touched_notebooks_are_not_converted(self):
+        self.sync()
+        os.utime(os.path.join(self.notebooks, "minimal.ipynb"), ns=(0, 0))
+        self.assertEqual(0, self.sync()["converted"])
+
+    def test_deletions_are_propagated(self):
+        self.sync()
+        os.remove(os.path.join(self.notebooks, "minimal.ipynb"))
+        self.assertEqual(1, self.sync()["deleted"])
+        self.assertFalse(os.path.exists(os.path.join(self.mirror, "minimal.py")))
+        self.assertNotIn(
+            os.path.join(self.notebooks, "minimal.ipynb"),
+            load_manifest(os.path.join(self.mirror, MANIFEST_NAME))["notebooks"],
+        )
+
+    def test_missing_copies_are_rebuilt(self):
+        self.sync()
+        os.remove(os.path.join(self.mirror, "minimal.py"))
+        self.assertEqual(1, self.sync()["converted"])
+        self.assertTrue(os.path.exists(os.path.join(self.mirror, "minimal.py")))
+
+    def test_notebooks_deleted_during_discovery(self):
+        self.sync()
+        filename = os.path.join(self.notebooks, "minimal.ipynb")
+        found = convert.find_notebooks([self.notebooks])
+        os.remove(filename)
+        with patch("convert.find_notebooks", return_value=found):
+            self.assertEqual(1, self.sync()["deleted"])
+        self.assertFalse(os.path.exists(os.path.join(self.mirror, "minimal.py")))
+        self.assertNotIn(filename, load_manifest(os.path.join(self.mirror, MANIFEST_NAME))["notebooks"])
+
+    def test_format_change(self):
+        self.sync()
+        sync([self.notebooks], "starboard", self.mirror, workers=1, verbose=False)
+        names = os.listdir(self.mirror)
+        self.assertEqual([], [name for name in names if name.endswith(".py")])
+        self.assertEqual(self.files, len([name for name in names if name.endswith(".starboard")]))
+
+    def test_watch(self):
+        watch([self.notebooks], "percent", self.mirror, interval=0, passes=2, workers=1)
+        self.assertEqual(self.files, len(load_manifest(os.path.join(self.mirror, MANIFEST_NAME))["notebooks"]))
+
+    def test_watch_survives_errors(self):
+        passes = []
+        def failing_sync(*args, **kwargs):
+            passes.append(args)
+            raise FileNotFoundError("gone")
+        with patch("sync.sync", side_effect=failing_sync), patch("sys.stderr") as stderr:
+            watch([self.notebooks], "percent", self.mirror, interval=0, passes=3, workers=1)
+        self.assertEqual(3, len(passes))
+        self.assertIn("gone", "".join(call.args[0] for call in stderr.write.call_args_list))
+
+
+if __name__ == "__main__":
+    unittest.main()